@@ -0,0 +1,85 @@
+"""
+Measures how long building the subject index and answering wk!lookup queries takes on a catalog the size of WaniKani's.
+The catalog is synthetic, so no API token or database is needed. Run from the repository root:
+
+    python -m benchmarks.bench_lookup
+"""
+from util.models.wanikani.Subject import Subject
+from util.subjectindex import KANA_ROMAJI, SubjectIndex
+from typing import Callable, List
+import random
+import statistics
+import string
+import time
+
+SUBJECTS: int = 9000
+QUERIES: int = 2000
+
+
+def random_word(rng: random.Random, length: int) -> str:
+    return ''.join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def synthetic_catalog(rng: random.Random) -> List[Subject]:
+    """
+    :return: Subjects with roughly the same amount of meanings, readings and characters as the real catalog.
+    """
+    kana: List[str] = list(KANA_ROMAJI)
+    subjects: List[Subject] = []
+    for i in range(SUBJECTS):
+        subject_type: str = 'radical' if i < 500 else 'kanji' if i < 2500 else 'vocabulary'
+        characters: str = ''.join(chr(0x4E00 + rng.randrange(20000)) for _ in range(1 if i < 2500 else 2))
+        meanings: List[str] = [' '.join(random_word(rng, rng.randint(3, 9)) for _ in range(rng.randint(1, 2)))
+                               for _ in range(rng.randint(1, 3))]
+        readings: List[str] = [] if subject_type == 'radical' else \
+            [''.join(rng.choice(kana) for _ in range(rng.randint(2, 5))) for _ in range(rng.randint(1, 3))]
+        subjects.append(Subject(subject_id=i + 1, subject_type=subject_type, last_update='2020-01-01T00:00:00.000000Z',
+                                level=rng.randint(1, 60), characters=characters, slug=meanings[0],
+                                meanings=meanings, readings=readings, document_url='', hidden=False))
+    return subjects
+
+
+def measure(name: str, queries: List[str], search: Callable[[str], object]) -> None:
+    durations: List[float] = []
+    for query in queries:
+        start: float = time.perf_counter()
+        search(query)
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    print(f'{name:<10} median {statistics.median(durations):7.3f}ms'
+          f' - p95 {durations[int(len(durations) * 0.95)]:7.3f}ms - max {durations[-1]:7.3f}ms')
+
+
+def main() -> None:
+    rng: random.Random = random.Random(42)
+    subjects: List[Subject] = synthetic_catalog(rng=rng)
+
+    start: float = time.perf_counter()
+    index: SubjectIndex = SubjectIndex()
+    index.update(subjects=subjects)
+    print(f'Built the index of {len(subjects)} subjects in {(time.perf_counter() - start) * 1000:.0f}ms: {index}')
+
+    start = time.perf_counter()
+    index.update(subjects=subjects[:100])
+    print(f'Re-indexed 100 changed subjects in {(time.perf_counter() - start) * 1000:.1f}ms')
+
+    samples: List[Subject] = [rng.choice(subjects) for _ in range(QUERIES)]
+    measure('character', [s.characters for s in samples], index.search)
+    measure('meaning', [s.meanings[0] for s in samples], index.search)
+    measure('prefix', [s.meanings[0][:3] for s in samples], index.search)
+    measure('reading', [s.readings[0] for s in samples if s.readings], index.search)
+
+    # Swap two neighbouring letters, the most common typo.
+    typos: List[str] = []
+    for s in samples:
+        word: str = s.meanings[0]
+        i: int = rng.randrange(len(word) - 1)
+        typos.append(word[:i] + word[i + 1] + word[i] + word[i + 2:])
+    measure('typo', typos, index.search)
+    found: int = sum(s.id in {result.id for result in index.search(typo)} for s, typo in zip(samples, typos))
+    print(f'{"":<10} found the subject for {100 * found / len(typos):.1f}% of the swapped letter typos')
+    measure('no match', [random_word(rng, 8) + 'qqq' for _ in samples], index.search)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Compares the memory and construction time of the slotted WaniKani models with the plain classes they replaced,
+for as many users as a large bot caches. Run from the repository root:
+
+    python -m benchmarks.bench_models
+"""
+from util.models.wanikani.Level_Progress import LevelProgress
+from util.models.wanikani.Summary import Summary
+from util.models.wanikani.User import User
+from typing import Any, Callable, Dict, List
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+USERS: int = 10000
+LEVELS: int = 30
+# Construction is timed this many times and the fastest pass counts, so a garbage collection or a cold cache
+# in a single pass does not decide the comparison.
+REPEAT: int = 5
+
+
+class LegacyUser:
+    def __init__(self, wk_id: str, username: str, profile_url: str, level: int, last_update: str, member_since: str,
+                 subscribed: bool, subscription_type: str, max_level: int, on_vacation_since: str):
+        self.id: str = wk_id
+        self.username: str = username
+        self.profile_url: str = profile_url
+        self.level: int = level
+        self.last_update: str = last_update
+        self.member_since: str = member_since
+        self.subscribed: bool = subscribed
+        self.subscription_type: str = subscription_type
+        self.max_level: int = max_level
+        self.on_vacation_since: str = on_vacation_since
+        self.level_progressions: List[LevelProgress] = []
+
+
+class LegacySummary:
+    def __init__(self, last_update: str, available_lessons: List[Any], available_reviews: List[Any],
+                 upcoming_reviews: List[Any]) -> None:
+        self.last_update: str = last_update
+        self.available_lessons: List[Any] = available_lessons
+        self.available_reviews: List[Any] = available_reviews
+        self.upcoming_reviews: List[Any] = upcoming_reviews
+
+
+class LegacyLevelProgress:
+    def __init__(self, progress_id: int, last_update: str, level: int, passed: bool, unlocked_at: str,
+                 started_at: str, passed_at: str, completed_at: str, abandoned_at: str) -> None:
+        self.id: int = progress_id
+        self.last_update: str = last_update
+        self.level: int = level
+        self.passed: bool = passed
+        self.unlocked_at: str = unlocked_at
+        self.started_at: str = started_at
+        self.passed_at: str = passed_at
+        self.completed_at: str = completed_at
+        self.abandoned_at: str = abandoned_at
+
+
+def timestamp(rng: random.Random) -> str:
+    return f'20{rng.randint(10, 20)}-{rng.randint(1, 12):02}-{rng.randint(1, 28):02}T' \
+        f'{rng.randint(0, 23):02}:{rng.randint(0, 59):02}:{rng.randint(0, 59):02}.{rng.randint(0, 999999):06}Z'
+
+
+def subject_ids(rng: random.Random, amount: int) -> List[int]:
+    return [rng.randint(1, 9000) for _ in range(amount)]
+
+
+def user_response(rng: random.Random, i: int) -> Dict[str, Any]:
+    return {'data_updated_at': timestamp(rng),
+            'data': {'id': f'user-{i}', 'username': f'crab{i}',
+                     'profile_url': f'https://www.wanikani.com/users/crab{i}', 'level': rng.randint(1, 60), 'started_at': timestamp(rng), 'current_vacation_started_at': None,
+                     'subscription': {'active': True, 'type': 'recurring', 'max_level_granted': 60}}}
+
+
+def summary_response(rng: random.Random) -> Dict[str, Any]:
+    updated_at: str = timestamp(rng)
+    return {'data_updated_at': updated_at,
+            'data': {'next_reviews_at': updated_at, 'lessons': [{'subject_ids': subject_ids(rng, 15)}],
+                     'reviews': [{'subject_ids': subject_ids(rng, rng.randint(0, 40))} for _ in range(25)]}}
+
+
+def progression_record(rng: random.Random, i: int, level: int) -> Dict[str, Any]:
+    return {'id': i, 'data_updated_at': timestamp(rng),
+            'data': {'level': level, 'unlocked_at': timestamp(rng), 'started_at': timestamp(rng),
+                     'passed_at': timestamp(rng), 'completed_at': None, 'abandoned_at': None}}
+
+
+def legacy_summary(summary_data: Dict[str, Any]) -> LegacySummary:
+    # The way DataFetcher used to build a Summary.
+    start: int = 0
+    available_reviews: List[int] = []
+    upcoming_reviews: List[int] = []
+    if summary_data['data_updated_at'] == summary_data['data']['next_reviews_at']:
+        start = 1
+        available_reviews = summary_data['data']['reviews'][0]['subject_ids']
+    for i in range(start, len(summary_data['data']['reviews'])):
+        upcoming_reviews.extend(summary_data['data']['reviews'][i]['subject_ids'])
+    return LegacySummary(last_update=summary_data['data_updated_at'],
+                         available_lessons=summary_data['data']['lessons'][0]['subject_ids'],
+                         available_reviews=available_reviews, upcoming_reviews=upcoming_reviews)
+
+
+def legacy_user(user_data: Dict[str, Any]) -> LegacyUser:
+    data: Dict[str, Any] = user_data['data']
+    return LegacyUser(last_update=user_data['data_updated_at'], wk_id=data['id'], username=data['username'],
+                      profile_url=data['profile_url'], level=data['level'], member_since=data['started_at'],
+                      subscribed=data['subscription']['active'], subscription_type=data['subscription']['type'],
+                      max_level=data['subscription']['max_level_granted'],
+                      on_vacation_since=data['current_vacation_started_at'])
+
+
+def legacy_progress(entry: Dict[str, Any]) -> LegacyLevelProgress:
+    data: Dict[str, Any] = entry['data']
+    return LegacyLevelProgress(progress_id=entry['id'], last_update=entry['data_updated_at'], level=data['level'],
+                               passed=data['passed_at'] is not None, unlocked_at=data['unlocked_at'],
+                               started_at=data['started_at'], passed_at=data['passed_at'],
+                               completed_at=data['completed_at'], abandoned_at=data['abandoned_at'])
+
+
+def measure(name: str, responses: List[str], build: Callable[[Dict[str, Any]], Any]) -> int:
+    """
+    Times building a model from every parsed response in the fastest of a few passes, then measures what the models
+    keep alive once the parsed responses are gone, like in the DataFetcher.
+    :return: The amount of bytes the models keep alive once the parsed responses are gone.
+    """
+    parsed: List[Dict[str, Any]] = [json.loads(response) for response in responses]
+    durations: List[float] = []
+    for _ in range(REPEAT):
+        start: float = time.perf_counter()
+        for response in parsed:
+            build(response)
+        durations.append(time.perf_counter() - start)
+    duration: float = min(durations)
+    del parsed
+
+    # Tracing slows everything down, so the memory is measured in a separate pass.
+    gc.collect()
+    tracemalloc.start()
+    models: List[Any] = [build(json.loads(response)) for response in responses]
+    size: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f'{name:<24} {size / 1024 / 1024:8.2f}MiB - {size / len(models):8.0f}B each - {duration * 1000:6.0f}ms')
+    del models
+    return size
+
+
+def compare(name: str, responses: List[str], legacy: Callable[[Dict[str, Any]], Any],
+            slotted: Callable[[Dict[str, Any]], Any]) -> None:
+    legacy_size: int = measure(f'{name} (legacy)', responses, legacy)
+    slotted_size: int = measure(f'{name} (slotted)', responses, slotted)
+    print(f'{name}: {100 * (1 - slotted_size / legacy_size):.0f}% less memory\n')
+
+
+def main() -> None:
+    rng: random.Random = random.Random(42)
+    users: List[str] = [json.dumps(user_response(rng, i)) for i in range(USERS)]
+    summaries: List[str] = [json.dumps(summary_response(rng)) for _ in range(USERS)]
+    progressions: List[str] = [json.dumps(progression_record(rng, i, i % LEVELS + 1)) for i in range(USERS * 3)]
+
+    compare('User', users, legacy_user, lambda u: User.from_api(user_data=u))
+    compare('Summary', summaries, legacy_summary, lambda s: Summary.from_api(summary_data=s))
+    compare('LevelProgress', progressions, legacy_progress, lambda p: LevelProgress.from_api(entry=p))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,29 +1,110 @@
-from util.asynctimer import Scheduler
+from util.assets import AssetRegistry
+from util.asynctimer import Job, Scheduler
+from util.cache.rendercache import RenderCache
+from util.commands import Command, CommandRegistry
 from util.database.datastorage import DataStorage
 from util.datafetcher import DataFetcher
-from util.models.wanikani.Level_Progress import LevelProgress
-from util.models.wanikani.Summary import Summary
+from util.emojiindex import EmojiIndex
+from util.metrics import COMMAND_DURATION, COMMAND_ERRORS, CallbackMetric, MetricsServer, elapsed_since, log_event, \
+    metrics, monitor_event_loop_lag
+from util.models.wanikani.Subject import Subject
 from util.models.wanikani.User import User
-from datetime import datetime
-from PIL import Image, ImageFont, ImageDraw
-from typing import Any, Dict, List
+from util.rendering.sign import RENDER_VERSION, SignRenderer
+from util.subjectindex import SubjectIndex
+from util.subjects import SubjectCatalog
+from util.sync.bulk import BulkSync
+from util.sync.levels import LevelingStats
+from util.timing import StageTimer
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+import asyncio
 import discord
+import io
+import json
+import logging
+import os
 import random
+import time
 
+logger: logging.Logger = logging.getLogger(__name__)
 
-class WaniKaniBotClient(discord.Client):
-    command_count: int = 0
+
+class WaniKaniBotClient(discord.AutoShardedClient):
+    # Shown in embed fields whose data could not be fetched in time.
+    UNAVAILABLE: str = '_Unavailable_'
+    # Every set of keywords used to look up custom emoji.
+    HAPPY_EMOJI: List[str] = ['happy', 'yay', 'thumbsup', 'sugoi']
+    SAD_EMOJI: List[str] = ['sad', 'cry', 'thumbsdown', 'baka']
+    REJECTED_EMOJI: List[str] = ['baka', 'pout', 'sad', 'cry']
+    CONFUSED_EMOJI: List[str] = ['thinking', 'think', 'confused', 'shrug']
     descriptions: List[str] = None
     statuses: List[str] = None
+    _assets: AssetRegistry = None
+    _bulkSync: BulkSync = None
+    _commands: CommandRegistry = None
     _dataFetcher: DataFetcher = None
     _dataStorage: DataStorage = None
+    _emojiIndex: EmojiIndex = None
+    _help_embeds: Dict[str, discord.Embed] = None
+    _log_sample_rate: float = 1
+    _loop_lag_task: asyncio.Task = None
+    _metricsServer: MetricsServer = None
+    _owner_id: int = 209076181365030913
+    _primary: bool = True
     _scheduler: Scheduler = None
-
-    def __init__(self) -> None:
-        super(WaniKaniBotClient, self).__init__()
-        self._dataFetcher = DataFetcher()
+    _shared_cache_poll_interval: float = 1
+    _signRenderer: SignRenderer = None
+    _subjectCatalog: SubjectCatalog = None
+    _subjectIndex: SubjectIndex = None
+    _subject_refresh_interval: float = 6 * 60 * 60
+
+    def __init__(self, shard_ids: List[int] = None, shard_count: int = None, process_index: int = 0,
+                 processes: int = 1) -> None:
+        """
+        Initializes the Crabigator, which runs every shard it is given in this process.
+        :param shard_ids: The shards this process runs, None to run every shard.
+        :param shard_count: The total amount of shards of the bot, None to use the amount Discord recommends.
+        :param process_index: The index of this process when the shards are spread over several processes on one host.
+        :param processes: The amount of processes on this host, which share the WaniKani rate limit of every user.
+        """
+        super(WaniKaniBotClient, self).__init__(shard_ids=shard_ids, shard_count=shard_count)
+        # Jobs that need to run once for the whole bot only run in the process of shard 0.
+        self._primary = shard_ids is None or 0 in shard_ids
+        # Share one DataStorage (and thus one MongoClient pool) between the client and the DataFetcher.
         self._dataStorage = DataStorage()
+        self._dataFetcher = DataFetcher(data_storage=self._dataStorage, processes=processes)
         self._scheduler = Scheduler()
+        self._subjectCatalog = SubjectCatalog(data_fetcher=self._dataFetcher, data_storage=self._dataStorage)
+        # Only the subjects that were loaded or changed are indexed again.
+        self._subjectIndex = SubjectIndex()
+        self._subjectCatalog.add_listener(self.index_subjects)
+        self._assets = AssetRegistry()
+        self._assets.load_images()
+        assets: Dict[str, int] = self._assets.memory_report()
+        log_event(logger, 'assets_loaded', assets=len(assets), bytes=sum(assets.values()))
+        with open('resources/settings.json') as json_data_file:
+            data: Dict[str, Any] = json.load(json_data_file)
+            render_cache: RenderCache = RenderCache(max_bytes=data.get('RENDER_CACHE_MAX_BYTES', 16 * 1024 * 1024),
+                                                    version=f'{RENDER_VERSION}-{self._assets.template_version()}',
+                                                    directory=data.get('RENDER_CACHE_DIRECTORY'))
+            render_cache.load_directory()
+            self._signRenderer = SignRenderer(workers=data.get('RENDER_WORKERS', 2), cache=render_cache)
+            self._owner_id = data.get('OWNER_ID', self._owner_id)
+            self._log_sample_rate = data.get('LOG_SAMPLE_RATE', self._log_sample_rate)
+            self._subject_refresh_interval = data.get('SUBJECT_REFRESH_INTERVAL', self._subject_refresh_interval)
+            self._bulkSync = BulkSync(data_fetcher=self._dataFetcher, data_storage=self._dataStorage,
+                                      workers=data.get('BULK_SYNC_WORKERS', 10),
+                                      batch_size=data.get('BULK_SYNC_BATCH_SIZE', 100))
+            self._shared_cache_poll_interval = data.get('SHARED_CACHE_POLL_INTERVAL', self._shared_cache_poll_interval)
+            if data.get('METRICS_PORT'):
+                # Every process serves its own metrics on the next port.
+                self._metricsServer = MetricsServer(registry=metrics, port=data['METRICS_PORT'] + process_index)
+        self._emojiIndex = EmojiIndex(keywords=self.HAPPY_EMOJI + self.SAD_EMOJI + self.REJECTED_EMOJI +
+                                      self.CONFUSED_EMOJI)
+        self._commands = self.build_command_registry()
+        self.register_metrics()
+        # Help menus are built once per prefix, as soon as they are first needed.
+        self._help_embeds = {}
         self.descriptions = self.load_text_from_file_to_array(filename='resources/descriptions.txt')
         self.statuses = self.load_text_from_file_to_array(filename='resources/statuses.txt')
 
@@ -36,8 +117,54 @@ class WaniKaniBotClient(discord.Client):
         print('#################################')
         print('# Logged on as {0}! #'.format(self.user))
         print('#################################')
-        await self.change_status()
-        await self._scheduler.run(coro=self.change_status, time=300)
+        print(f'Running shards {sorted(self.shards)} of {self.shard_count}.')
+        # Changes other processes publish while the prefixes and users load are applied afterwards.
+        await self._dataStorage.shared_cache.open()
+        await self._dataStorage.load_guild_prefixes()
+        print(f'Loaded {len(self._dataStorage.prefix_cache)} custom Guild prefixes.')
+        await self._dataStorage.load_api_users()
+        print(f'Loaded {len(self._dataStorage.user_registry)} registered WaniKani users.')
+        if not self._subjectCatalog.loaded:
+            await self._subjectCatalog.load()
+            print(f'Loaded {len(self._subjectCatalog)} WaniKani subjects.')
+        for guild in self.guilds:
+            self._emojiIndex.index_guild(guild_id=guild.id, emojis=guild.emojis)
+        print(f'Indexed the custom emoji of {len(self._emojiIndex)} Guilds.')
+        if self._loop_lag_task is None:
+            self._loop_lag_task = asyncio.ensure_future(monitor_event_loop_lag())
+        if self._metricsServer is not None:
+            await self._metricsServer.start()
+            print(f'Serving metrics on http://{self._metricsServer.host}:{self._metricsServer.port}/metrics')
+        # on_ready fires again after a reconnect; scheduling a job under the same name replaces the old one.
+        self._scheduler.every(name='change_status', coro=self.change_status, seconds=300, run_immediately=True)
+        if self._dataStorage.shared_cache.shared:
+            self._scheduler.every(name='shared_cache', coro=self._dataFetcher.sync_shared_caches,
+                                  seconds=self._shared_cache_poll_interval)
+        if self._primary:
+            # The first refresh completes the catalog, every following one only fetches the updated subjects.
+            self._scheduler.every(name='subject_catalog', coro=self._subjectCatalog.refresh,
+                                  seconds=self._subject_refresh_interval, run_immediately=True)
+            # Sync every registered user once a day at 00:00 UTC, but never catch up on a missed night during the day.
+            self._scheduler.cron(name='bulk_sync', coro=self._bulkSync.run, hour=0, minute=0, missed_policy=Job.SKIP)
+        else:
+            # Only the process of shard 0 syncs with WaniKani, the others pick up the subjects it stored.
+            self._scheduler.every(name='subject_catalog', coro=self._subjectCatalog.reload,
+                                  seconds=self._subject_refresh_interval)
+        self._scheduler.start()
+
+    async def close(self) -> None:
+        """
+        Closes the connection to Discord and releases the WaniKani HTTP and MongoDB connection pools.
+        """
+        self._scheduler.stop()
+        if self._loop_lag_task is not None:
+            self._loop_lag_task.cancel()
+        if self._metricsServer is not None:
+            await self._metricsServer.stop()
+        await self._dataFetcher.close()
+        self._dataStorage.close()
+        self._signRenderer.close()
+        await super(WaniKaniBotClient, self).close()
 
     async def on_message(self, message: discord.Message) -> None:
         """
@@ -51,9 +178,17 @@ class WaniKaniBotClient(discord.Client):
         # Find the appropriate prefix for a server.
         prefix: str = 'wk!'
         if message.guild:
-            found_guild = self._dataStorage.find_guild_prefix(guild_id=message.guild.id)
-            if found_guild:
-                prefix = found_guild['prefix']
+            if self._dataStorage.prefix_cache.loaded:
+                prefix = self._dataStorage.prefix_cache.get(guild_id=message.guild.id)
+            else:
+                # Only happens for messages received before on_ready finished loading the prefixes.
+                found_guild = await self._dataStorage.find_guild_prefix(guild_id=message.guild.id)
+                if found_guild:
+                    prefix = found_guild['prefix']
+
+        # Ignore anything that is not a command without doing any I/O.
+        if not message.content.startswith(prefix) and message.content != 'wk!help':
+            return
 
         #############################
         # UNCOMMENT FOR MAINTENANCE #
@@ -72,30 +207,32 @@ class WaniKaniBotClient(discord.Client):
             await self.get_help(words=['help'], channel=message.channel, prefix=prefix)
 
         if message.content.startswith(prefix):
-            print('\n{0}'.format(message))
-            print('Message in {0.guild} - #{0.channel} from {0.author}: {0.content}'.format(message))
+            # Arguments are never logged, they can contain secrets like the API token of wk!adduser.
+            words: List[str] = message.content[len(prefix):].split()
+            command: str = words[0].lower() if words else ''
+            log_event(logger, 'command', sample_rate=self._log_sample_rate, guild=message.guild,
+                      channel=message.channel, author=message.author, author_id=message.author.id,
+                      command=command, arguments=max(0, len(words) - 1))
             message.content = message.content[len(prefix):]
             # Prevent empty commands.
             if message.content:
-                self.command_count += 1
                 await message.channel.trigger_typing()
                 try:
                     await self.handle_command(message=message, prefix=prefix)
-                except Exception as ex:
-                    print(ex)
+                except Exception:
+                    logger.exception(f'event=command_failed command={command!r}')
                     await self.oopsie(channel=message.channel,
                                       attempted_command=message.content.split(' ')[0],
                                       prefix=prefix)
 
-    @staticmethod
-    async def send_image(channel: discord.TextChannel, image_name: str) -> None:
+    async def send_image(self, channel: discord.TextChannel, image_name: str) -> None:
         """
-        Send an image to a channel.
+        Send an image to a channel. The image is served from the preloaded assets instead of from disk.
         :param channel: A Discord.TextChannel object to send the image to.
         :param image_name: The local name of the image.
         """
-        with open(image_name, 'rb') as image:
-            await channel.send(file=discord.File(fp=image, filename=image_name))
+        await channel.send(file=discord.File(fp=self._assets.image(image_name=image_name),
+                                             filename=os.path.basename(image_name)))
 
     async def send_embed(self, channel: discord.TextChannel, embed: discord.Embed,
                          contains_description: bool = False, contains_footer: bool = False) -> None:
@@ -131,23 +268,51 @@ class WaniKaniBotClient(discord.Client):
 
         return out
 
-    @staticmethod
-    async def fetch_emoji(guild: discord.Guild, emoji_array: List[str]) -> str:
+    def fetch_emoji(self, guild: discord.Guild, emoji_array: List[str]) -> str:
         """
         Find a custom emoji from a Discord.Guild containing one of the words in the given array.
+        Uses the EmojiIndex, so no requests to Discord are made.
         :param guild: The Discord.Guild that should be searched. Can be None.
-        :param emoji_array: The array of words that should be searched for.
-        :return: The first hit from the emoji_array properly formatted to be sent. Empty string if nothing was found.
+        :param emoji_array: The array of words that should be searched for, like HAPPY_EMOJI or SAD_EMOJI.
+        :return: A random hit from the emoji_array properly formatted to be sent. Empty string if nothing was found.
         """
         if guild:
-            # Shuffle emoji array to mix up the potential results.
-            random.shuffle(emoji_array)
-            for em in await guild.fetch_emojis():
-                if any(e in em.name.lower() for e in emoji_array):
-                    return f'<:{em.name}:{em.id}>'
+            return self._emojiIndex.find(guild_id=guild.id, keywords=emoji_array)
 
         return ''
 
+    async def on_guild_join(self, guild: discord.Guild) -> None:
+        """
+        Event method that gets called when the Crabigator joins a Discord.Guild.
+        :param guild: The Discord.Guild that was joined.
+        """
+        self._emojiIndex.index_guild(guild_id=guild.id, emojis=guild.emojis)
+
+    async def on_guild_available(self, guild: discord.Guild) -> None:
+        """
+        Event method that gets called when a Discord.Guild becomes available, also after on_ready for shards that
+        connected late or Guilds that recovered from an outage. Emoji changes during an outage are missed otherwise.
+        :param guild: The Discord.Guild that became available.
+        """
+        self._emojiIndex.index_guild(guild_id=guild.id, emojis=guild.emojis)
+
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        """
+        Event method that gets called when the Crabigator leaves or is removed from a Discord.Guild.
+        :param guild: The Discord.Guild that was left.
+        """
+        self._emojiIndex.remove_guild(guild_id=guild.id)
+
+    async def on_guild_emojis_update(self, guild: discord.Guild, before: List[discord.Emoji],
+                                     after: List[discord.Emoji]) -> None:
+        """
+        Event method that gets called when a Discord.Guild adds or removes custom emoji.
+        :param guild: The Discord.Guild whose emoji changed.
+        :param before: The emoji before the update.
+        :param after: The emoji after the update.
+        """
+        self._emojiIndex.index_guild(guild_id=guild.id, emojis=after)
+
     async def change_status(self) -> None:
         """
         Changes the status of the Crabigator to a random sentence from resources.statuses.txt.
@@ -167,6 +332,17 @@ class WaniKaniBotClient(discord.Client):
             content=f'Crabigator does not know this person. '
             f'Please use `{prefix}adduser <WANIKANI_API_V2_TOKEN>` and try again.')
 
+    @staticmethod
+    async def unknown_command(channel: discord.TextChannel, prefix: str) -> None:
+        """
+        Sends an error message when a command does not exist.
+        :param channel: The Discord.TextChannel that the message should be sent to.
+        :param prefix: The prefix used for the Crabigator.
+        """
+        await channel.send(
+            content=f'Crabigator has yet to learn this ~~kanji~~ command. '
+            f'Refer to `{prefix}help` to see what I can do!')
+
     @staticmethod
     async def oopsie(channel: discord.TextChannel, attempted_command: str, prefix: str) -> None:
         """
@@ -179,202 +355,333 @@ class WaniKaniBotClient(discord.Client):
             content=f'Crabigator got too caught up studying and failed to handle `{prefix}{attempted_command}`. '
             f'Please notify my Overlord <@!209076181365030913>.')
 
-    @staticmethod
-    def split_text_into_lines(text: str, max_width: int, font: ImageFont) -> List[str]:
-        # Shoutout to StackOverflow for this one.
-        # https://stackoverflow.com/questions/43828154/breaking-a-string-along-whitespace-once-certain-width-is-exceeded-python
-        lines: List[str] = []
-        string: str = ''
-        line_width: int = 0
-        for c in text:
-            line_width += font.getsize(c)[0]
-            string += str(c)
-            if line_width > max_width:
-                line_width += font.getsize(c)[0]
-                if line_width > max_width:
-                    s = string.rsplit(" ", 1)
-                    string = s[0]
-                    lines.append(string)
-
-                    try:
-                        string = s[1]
-                        line_width = len(string) * 5
-                    except IndexError:
-                        string = ""
-                        line_width = 0
-        # Leftover characters string should also be appended.
-        if string:
-            lines.append(string)
-
-        return lines
-
-    async def draw_on_sign(self, message: discord.Message, command: str, channel: discord.TextChannel, prefix: str):
-        text: str = message.content.replace(f'{command} ', '', 1)
-        if message.content.strip() == command:
-            text = f'{prefix}draw <MESSAGE>'
+    async def index_subjects(self, subjects: List[Subject], complete: bool) -> None:
+        """
+        Keeps the subject index up to date with the catalog, in chunks so that the event loop stays responsive.
+        :param subjects: The loaded, added or changed Subjects.
+        :param complete: Whether the subjects are the whole catalog. Then a new index is built next to the current
+                         one and swapped in at once, so that lookups never search a half built index.
+        """
+        if complete:
+            index: SubjectIndex = SubjectIndex()
+            await index.update_in_chunks(subjects=subjects)
+            self._subjectIndex = index
+        else:
+            await self._subjectIndex.update_in_chunks(subjects=subjects)
 
-        bg_image: Image = Image.open('img/crabigator_sign.png')
-        text_image: Image = Image.open('img/to_draw_image.png')
-        draw: ImageDraw = ImageDraw.Draw(text_image)
-        font: ImageFont = ImageFont.truetype('/root/.fonts/TruetypewriterPolyglott-mELa.ttf', 40)
-        # Change to this font for Windows machines.
-        # font: ImageFont = ImageFont.truetype('arial.ttf', 40)
-        # Split the text into lines based on width.
-        lines = self.split_text_into_lines(text=text, max_width=200, font=font)
-        # Only 3 lines of text fit on the sign.
-        if len(lines) > 3:
-            lines = self.split_text_into_lines(text='Max length exceeded!', max_width=200, font=font)
-        y_spacing: int = 45
-        y_val: int = 0
-        # Determine where to start drawing based on the amount of lines.
-        if len(lines) == 1:
-            y_val = 70
-        elif len(lines) == 2:
-            y_val = 40
-        elif len(lines) == 3:
-            y_val = 10
-        # Draw each line on the sign.
-        for line in lines:
-            line_x, line_y = font.getsize(text=line)
-            draw.text(xy=(text_image.width - 235 - line_x / 2, y_val), text=line, font=font)
-            y_val += y_spacing
-
-        # Rotate text image before pasting it.
-        text_image = text_image.convert('RGBA')
-        text_image = text_image.rotate(angle=-12, resample=Image.NEAREST, expand=1, fillcolor='white')
-        # Replace all the white with transparent.
-        new_data = []
-        for item in text_image.getdata():
-            if item[0] == 255 and item[1] == 255 and item[2] == 255:
-                new_data.append((255, 255, 255, 0))
-            else:
-                new_data.append(item)
-        text_image.putdata(data=new_data)
+    async def lookup_subject(self, message: discord.Message, words: List[str], prefix: str) -> None:
+        """
+        Looks up subjects in the subject catalog and displays the best matches.
+        :param message: The Discord.Message that was received minus the prefix.
+        :param words: Array of arguments, everything after the command is the query.
+        :param prefix: The prefix used for the Crabigator.
+        """
+        query: str = ' '.join(words[1:])
+        if not query:
+            await message.channel.send(content=f'What should the Crabigator look for? Try `{prefix}lookup 大`.')
+            return
+        if not len(self._subjectIndex):
+            await message.channel.send(content='The Crabigator is still memorising every subject, try again later.')
+            return
 
-        bg_image.paste(text_image, (0, 0), text_image)
+        subjects: List[Subject] = self._subjectIndex.search(query=query, limit=5)
+        if not subjects:
+            emoji: str = self.fetch_emoji(guild=message.guild, emoji_array=self.CONFUSED_EMOJI)
+            await message.channel.send(content=f'The Crabigator has never heard of `{query}`. {emoji}')
+            return
 
-        bg_image.save(fp=f'img/drawnimage.png')
-        await self.send_image(channel=channel, image_name=f'img/drawnimage.png')
+        embed: discord.Embed = discord.Embed(title=f'Lookup: {query}', colour=message.author.colour,
+                                             timestamp=datetime.now())
+        for subject in subjects:
+            value: str = f"**Meaning:** {', '.join(subject.meanings)}"
+            if subject.readings:
+                value += f"\n**Reading:** {', '.join(subject.readings)}"
+            value += f'\n[Level {subject.level} {subject.subject_type}]({subject.document_url})'
+            embed.add_field(name=subject.characters or subject.slug, value=value, inline=False)
+        await self.send_embed(channel=message.channel, embed=embed)
 
-    async def handle_command(self, message: discord.Message, prefix: str) -> None:
+    async def draw_on_sign(self, message: discord.Message, words: List[str], prefix: str) -> None:
         """
-        Handle requests (commands) given to the Crabigator.
+        Draws the message on the Crabigator's sign.
         :param message: The Discord.Message that was received minus the prefix.
+        :param words: Array of arguments, everything after the command is drawn.
         :param prefix: The prefix used for the Crabigator.
         """
-        words: List[str] = message.content.split(' ')
-        command: str = words[0].lower()
+        text: str = message.content.replace(f'{words[0]} ', '', 1)
+        if message.content.strip() == words[0]:
+            text = f'{prefix}draw <MESSAGE>'
 
-        # Changes the prefix for the almighty Crabigator.
-        if command in ['prefix']:
-            # Only available in servers.
-            if not message.guild:
-                await message.channel.send(content="_Crabigator doesn't seem to listen to DM prefix requests..._")
-                return
+        image: io.BytesIO = await self._signRenderer.render(text=text)
+        await message.channel.send(file=discord.File(fp=image, filename='drawnimage.png'))
 
-            if len(words) == 1:
-                await message.channel.send(
-                    content=f"Don't treat the prefix like your Kanji and forget it! "
-                    f'Example usage: `{prefix}prefix <CHAR>`')
-            elif len(words) > 2:
-                await message.channel.send(
-                    content=f'The Crabigator does not allow spaces in the prefix!')
-            else:
-                # Only server administrators should be allowed to touch the prefix.
-                is_admin = False
-                for r in message.author.roles:
-                    # Bitwise AND operator can check that, for more information see the Discord API documentation at
-                    # https://discordapp.com/developers/docs/topics/permissions
-                    if (r.permissions.value & 0x00000008) == 0x00000008:
-                        is_admin = True
-
-                if is_admin:
-                    self._dataStorage.insert_guild_prefix(guild_id=message.guild.id, prefix=words[1])
-                    await message.channel.send(
-                        content=f'The Crabigator became more omnipotent by changing to `{words[1]}`!')
-                else:
-                    await message.channel.send(
-                        content=f'Only server administrators are allowed to change the prefix.')
+    def build_command_registry(self) -> CommandRegistry:
+        """
+        Registers every command of the Crabigator. The order of registration is the order of the help menu.
+        :return: The CommandRegistry.
+        """
+        def image_command(image_name: str) -> Callable[..., Awaitable[None]]:
+            async def send(message: discord.Message, words: List[str], prefix: str) -> None:
+                await self.send_image(channel=message.channel, image_name=image_name)
+            return send
+
+        registry: CommandRegistry = CommandRegistry()
+        # Provides help with this Bot's commands.
+        registry.register(Command(name='help', aliases=['h', 'commands'],
+                                  handler=lambda message, words, prefix: self.get_help(words=words,
+                                                                                       channel=message.channel,
+                                                                                       prefix=prefix),
+                                  help_entries=[('', 'Displays this embedded message.'),
+                                                ('`<COMMAND_NAME>`', 'Displays more info for the specified command.')]))
         # Registers a WaniKani User for API calls.
-        elif command in ['adduser', 'addme']:
-            if message.guild:
-                await message.channel.send(content="Let's do this in private, shall we? _(DM Crabigator instead)_")
-            else:
-                if len(words) == 1:
-                    await message.channel.send(
-                        content=f'Improper command usage. '
-                        f'Example usage: `{prefix}adduser <WANIKANI_API_V2_TOKEN>`')
-                elif len(words[1]) != 36 or '-' not in words[1]:
-                    await message.channel.send(
-                        content='API token is invalid! '
-                                'Make sure there are no dangling characters on either side!')
-                else:
-                    if self._dataStorage.find_api_user(user_id=message.author.id):
-                        await message.channel.send(
-                            content='Your API key is already registered, did you mean `removeuser`?')
-                        return
-                    self._dataStorage.register_api_user(user_id=message.author.id, api_key=words[1])
-                    # Initialize the key for future use.
-                    self._dataFetcher.wanikani_users[message.author.id] = {}
-                    await message.channel.send(
-                        content=f'Crabigator has started watching <@{message.author.id}> closely...')
+        registry.register(Command(name='adduser', aliases=['addme'], handler=self.add_user, dm_only=True,
+                                  help_entries=[('`<WANIKANI_API_V2_TOKEN>`',
+                                                 'Registers a WaniKani user to allow API usage. '
+                                                 '**ONLY WORKS IN DIRECT MESSAGES!**')]))
         # Deregisters a WaniKani User for API calls.
-        elif command in ['removeuser', 'removeme']:
-            if self._dataStorage.remove_api_user(user_id=message.author.id):
-                emoji: discord.Emoji = await self.fetch_emoji(guild=message.guild,
-                                                              emoji_array=['baka', 'pout', 'sad', 'cry'])
-                await message.channel.send(
-                    content=f"The Cult of the Crabigator didn't want you in the first place. {emoji}")
-            else:
-                emoji: discord.Emoji = await self.fetch_emoji(guild=message.guild,
-                                                              emoji_array=['thinking', 'think', 'confused', 'shrug'])
-                await message.channel.send(
-                    content=f'Crabigator does not know this person. I cannot delete what I do not know. {emoji}')
+        registry.register(Command(name='removeuser', aliases=['removeme'], handler=self.remove_user,
+                                  help_entries=[('', "Removes a user's data to no longer allow API usage.")]))
         # Fetch a WaniKani User's overall stats.
-        elif command in ['user', 'userstats']:
-            await self.get_user_stats(words=words, message=message, author=message.author, prefix=prefix)
-        # Fetch a WaniKani User's daily stats.
-        elif command in ['daily', 'dailyoverview', 'dailystatus', 'dailystats']:
-            await self.get_daily_stats(words=words, channel=message.channel, author=message.author, prefix=prefix)
+        registry.register(Command(name='user', aliases=['userstats'], handler=self.get_user_stats,
+                                  requires_user=True,
+                                  help_entries=[('', "Displays the WaniKani user's overall statistics."
+                                                     "Optionally you can target another user.")]))
         # Fetch a WaniKani User's leveling statistics.
-        elif command in ['levelstats', 'levelstats', 'leveling', 'levelingstatus', 'levelingstats']:
-            await self.get_leveling_stats(words=words, channel=message.channel, author=message.author, prefix=prefix)
-        elif command in ['draw', 'certify']:
-            await self.draw_on_sign(command=command, message=message, channel=message.channel, prefix=prefix)
+        registry.register(Command(name='levelstats', aliases=['leveling', 'levelingstatus', 'levelingstats'],
+                                  handler=self.get_leveling_stats, requires_user=True,
+                                  help_entries=[('', "Displays the WaniKani user's leveling statistics. "
+                                                     "Optionally you can target another user.")]))
+        # Look up a radical, kanji or vocabulary item.
+        registry.register(Command(name='lookup', aliases=['search', 'subject'], handler=self.lookup_subject,
+                                  help_entries=[('`<query>`', 'Looks up a radical, kanji or vocabulary item by its '
+                                                              'characters, meaning or reading.')]))
+        registry.register(Command(name='draw', aliases=['certify'], handler=self.draw_on_sign,
+                                  help_entries=[('', 'Draws your message on a sign.')]))
         # Congratulate someone.
-        elif command in ['congratulations', 'congrats', 'grats', 'gratz', 'gz', 'gj', 'goodjob']:
-            await self.send_image(channel=message.channel, image_name='img/concrabs.png')
+        registry.register(Command(name='congratulations', aliases=['congrats', 'grats', 'gratz', 'gz', 'gj', 'goodjob'],
+                                  handler=image_command(image_name='img/concrabs.png'),
+                                  help_entries=[('', ':tada:')], help_inline=True))
         # Rage at someone.
-        elif command in ['boo', 'anger', 'angry', 'bad', 'rage']:
-            await self.send_image(channel=message.channel, image_name='img/crabrage.png')
+        registry.register(Command(name='anger', aliases=['boo', 'angry', 'bad', 'rage'],
+                                  handler=image_command(image_name='img/crabrage.png'),
+                                  help_entries=[('', ':anger:')], help_inline=True))
         # Wish someone a Merry Crabmas™.
-        elif command in ['love', '<3', 'heart']:
-            await self.send_image(channel=message.channel, image_name='img/crablove.png')
+        registry.register(Command(name='love', aliases=['<3', 'heart'],
+                                  handler=image_command(image_name='img/crablove.png'),
+                                  help_entries=[('', ':heart:')], help_inline=True))
+        # Changes the prefix for the almighty Crabigator.
+        registry.register(Command(name='prefix', handler=self.change_prefix, guild_only=True, admin_only=True))
+        # Fetch a WaniKani User's daily stats.
+        registry.register(Command(name='daily', aliases=['dailyoverview', 'dailystatus', 'dailystats'],
+                                  handler=self.get_daily_stats, requires_user=True))
         # Eva.
-        elif command in ['eva']:
-            await self.send_image(channel=message.channel, image_name='img/eva.png')
+        registry.register(Command(name='eva', handler=image_command(image_name='img/eva.png')))
         # Clearly the case.
-        elif command in ['ballot_box_with_check', ':ballot_box_with_check:', '☑']:
-            await self.send_image(channel=message.channel, image_name='img/superior_checkmark.png')
-        # Provides help with this Bot's commands.
-        elif command in ['help', 'h', 'commands']:
-            await self.get_help(words=words, channel=message.channel, prefix=prefix)
+        registry.register(Command(name='ballot_box_with_check', aliases=[':ballot_box_with_check:', '☑'],
+                                  handler=image_command(image_name='img/superior_checkmark.png')))
+        # Shows what the Crabigator has been up to.
+        registry.register(Command(name='metrics', handler=self.show_metrics, owner_only=True))
+        return registry
+
+    async def show_metrics(self, message: discord.Message, words: List[str], prefix: str) -> None:
+        """
+        Sends the current metrics, without the histogram buckets.
+        :param message: The Discord.Message that was received minus the prefix.
+        :param words: Array of arguments, unused.
+        :param prefix: The prefix used for the Crabigator.
+        """
+        summary: str = metrics.summary()
+        # Discord messages are limited to 2000 characters.
+        if len(summary) > 1900:
+            summary = summary[:1900].rsplit('\n', 1)[0] + '\n...'
+        await message.channel.send(content=f'```\n{summary}\n```')
+
+    def register_metrics(self) -> None:
+        """
+        Exposes the counters that the caches and other components keep themselves as metrics.
+        """
+        def cache_counts(attribute: str) -> Callable[[], Dict[tuple, float]]:
+            caches: Dict[str, Any] = {'prefix': self._dataStorage.prefix_cache,
+                                      'user_registry': self._dataStorage.user_registry,
+                                      'response': self._dataFetcher.response_cache,
+                                      'user': self._dataFetcher.user_cache,
+                                      'render': self._signRenderer.cache}
+            return lambda: {(name, ): getattr(cache, attribute) for name, cache in caches.items()
+                            if cache is not None and hasattr(cache, attribute)}
+
+        metrics.register(CallbackMetric('crabigator_cache_hits_total', 'Cache lookups that were hits.',
+                                        'counter', ['cache'], cache_counts(attribute='hits')))
+        metrics.register(CallbackMetric('crabigator_cache_misses_total', 'Cache lookups that were misses.',
+                                        'counter', ['cache'], cache_counts(attribute='misses')))
+        metrics.register(CallbackMetric('crabigator_cache_evictions_total', 'Cache entries evicted to stay in bounds.',
+                                        'counter', ['cache'], cache_counts(attribute='evictions')))
+        metrics.register(CallbackMetric('crabigator_cache_bytes', 'Estimated size of the cached entries.',
+                                        'gauge', ['cache'], cache_counts(attribute='total_bytes')))
+        metrics.register(CallbackMetric('crabigator_commands_total', 'Commands that were invoked.',
+                                        'counter', ['command'],
+                                        lambda: {(c.name, ): c.invocations for c in self._commands.commands}))
+        metrics.register(CallbackMetric('crabigator_wanikani_queue_depth',
+                                        'WaniKani requests waiting for their rate limit.', 'gauge', [],
+                                        lambda: {(): self._dataFetcher.rate_limiter.queue_depth()}))
+        metrics.register(CallbackMetric('crabigator_wanikani_rate_limit_wait_seconds',
+                                        'Average time WaniKani requests waited for their rate limit.', 'gauge', [],
+                                        lambda: {(): self._dataFetcher.rate_limiter.average_wait()}))
+        metrics.register(CallbackMetric('crabigator_wanikani_coalesced_total',
+                                        'WaniKani requests that shared an identical request in flight.',
+                                        'counter', [], lambda: {(): self._dataFetcher.inflight.shared}))
+        metrics.register(CallbackMetric('crabigator_shared_cache_entries_total',
+                                        'Entries this process shared with or received from other processes.',
+                                        'counter', ['direction'],
+                                        lambda: {('published', ): self._dataStorage.shared_cache.published,
+                                                 ('received', ): self._dataStorage.shared_cache.received}))
+        metrics.register(CallbackMetric('crabigator_asset_bytes', 'Estimated memory of the loaded assets.', 'gauge',
+                                        ['asset'],
+                                        lambda: {(name, ): size
+                                                 for name, size in self._assets.memory_report().items()}))
+        metrics.register(CallbackMetric('crabigator_guilds', 'Guilds the Crabigator is in.', 'gauge', [],
+                                        lambda: {(): len(self.guilds)}))
+        metrics.register(CallbackMetric('crabigator_subjects', 'WaniKani subjects in the catalog.', 'gauge', [],
+                                        lambda: {(): len(self._subjectCatalog)}))
+        metrics.register(CallbackMetric('crabigator_job_runs_total', 'Scheduled job runs.', 'counter', ['job'],
+                                        lambda: {(j.name, ): j.runs for j in self._scheduler.jobs.values()}))
+        metrics.register(CallbackMetric('crabigator_job_failures_total', 'Scheduled job runs that failed.',
+                                        'counter', ['job'],
+                                        lambda: {(j.name, ): j.failures for j in self._scheduler.jobs.values()}))
+        metrics.register(CallbackMetric('crabigator_job_duration_seconds', 'Duration of the last scheduled job run.',
+                                        'gauge', ['job'],
+                                        lambda: {(j.name, ): j.last_duration for j in self._scheduler.jobs.values()}))
+
+    @staticmethod
+    def is_admin(member: discord.member.Member) -> bool:
+        """
+        Checks whether a Discord.Member is a server administrator.
+        :param member: The Discord.Member that should be checked.
+        :return: True if one of the member's roles has the administrator permission.
+        """
+        for r in getattr(member, 'roles', []):
+            # Bitwise AND operator can check that, for more information see the Discord API documentation at
+            # https://discordapp.com/developers/docs/topics/permissions
+            if (r.permissions.value & 0x00000008) == 0x00000008:
+                return True
+        return False
+
+    async def handle_command(self, message: discord.Message, prefix: str) -> None:
+        """
+        Handle requests (commands) given to the Crabigator.
+        :param message: The Discord.Message that was received minus the prefix.
+        :param prefix: The prefix used for the Crabigator.
+        """
+        words: List[str] = message.content.split(' ')
+        command: Command = self._commands.find(words[0].lower())
+
         # Unknown Command.
+        if command is None:
+            await self.unknown_command(channel=message.channel, prefix=prefix)
+            return
+
+        command.invocations += 1
+        if command.guild_only and not message.guild:
+            await message.channel.send(content=f"_Crabigator doesn't seem to listen to DM {command.name} requests..._")
+            return
+        if command.dm_only and message.guild:
+            await message.channel.send(content="Let's do this in private, shall we? _(DM Crabigator instead)_")
+            return
+        if command.owner_only and message.author.id != self._owner_id:
+            await self.unknown_command(channel=message.channel, prefix=prefix)
+            return
+        if command.admin_only and not self.is_admin(member=message.author):
+            await message.channel.send(
+                content=f'Only server administrators are allowed to use `{prefix}{command.name}`.')
+            return
+
+        kwargs: Dict[str, Any] = {}
+        if command.requires_user:
+            user_id = self.extract_user_id(words=words, author=message.author)
+            if user_id == -1:
+                await message.channel.send(content='Please tag **one** Discord User,'
+                                           ' or provide **one** Discord User ID with this command.')
+                return
+
+            if not await self._dataStorage.find_api_user(user_id=user_id):
+                await self.unknown_wanikani_user(channel=message.channel, prefix=prefix)
+                return
+            kwargs['user_id'] = user_id
+
+        start: float = time.perf_counter()
+        try:
+            await command.handler(message=message, words=words, prefix=prefix, **kwargs)
+        except Exception:
+            command.errors += 1
+            COMMAND_ERRORS.inc(command.name)
+            raise
+        finally:
+            COMMAND_DURATION.observe(command.name, value=elapsed_since(start=start))
+
+    async def change_prefix(self, message: discord.Message, words: List[str], prefix: str) -> None:
+        """
+        Changes the prefix for the almighty Crabigator in a server.
+        :param message: The Discord.Message that was received minus the prefix.
+        :param words: Array of arguments, the second one is the new prefix.
+        :param prefix: The prefix used for the Crabigator.
+        """
+        if len(words) == 1:
+            await message.channel.send(
+                content=f"Don't treat the prefix like your Kanji and forget it! "
+                f'Example usage: `{prefix}prefix <CHAR>`')
+        elif len(words) > 2:
+            await message.channel.send(
+                content='The Crabigator does not allow spaces in the prefix!')
         else:
+            await self._dataStorage.insert_guild_prefix(guild_id=message.guild.id, prefix=words[1])
             await message.channel.send(
-                content=f'Crabigator has yet to learn this ~~kanji~~ command. '
-                f'Refer to `{prefix}help` to see what I can do!')
+                content=f'The Crabigator became more omnipotent by changing to `{words[1]}`!')
+
+    async def add_user(self, message: discord.Message, words: List[str], prefix: str) -> None:
+        """
+        Registers a WaniKani User for API calls.
+        :param message: The Discord.Message that was received minus the prefix.
+        :param words: Array of arguments, the second one is the WaniKani API token.
+        :param prefix: The prefix used for the Crabigator.
+        """
+        if len(words) == 1:
+            await message.channel.send(
+                content=f'Improper command usage. '
+                f'Example usage: `{prefix}adduser <WANIKANI_API_V2_TOKEN>`')
+        elif len(words[1]) != 36 or '-' not in words[1]:
+            await message.channel.send(
+                content='API token is invalid! '
+                        'Make sure there are no dangling characters on either side!')
+        else:
+            if await self._dataStorage.find_api_user(user_id=message.author.id):
+                await message.channel.send(
+                    content='Your API key is already registered, did you mean `removeuser`?')
+                return
+            await self._dataStorage.register_api_user(user_id=message.author.id, api_key=words[1])
+            await message.channel.send(
+                content=f'Crabigator has started watching <@{message.author.id}> closely...')
+
+    async def remove_user(self, message: discord.Message, words: List[str], prefix: str) -> None:
+        """
+        Deregisters a WaniKani User for API calls.
+        :param message: The Discord.Message that was received minus the prefix.
+        :param words: Array of arguments, unused.
+        :param prefix: The prefix used for the Crabigator.
+        """
+        await self._dataFetcher.forget_user(user_id=message.author.id)
+        if await self._dataStorage.remove_api_user(user_id=message.author.id):
+            emoji: str = self.fetch_emoji(guild=message.guild, emoji_array=self.REJECTED_EMOJI)
+            await message.channel.send(
+                content=f"The Cult of the Crabigator didn't want you in the first place. {emoji}")
+        else:
+            emoji: str = self.fetch_emoji(guild=message.guild, emoji_array=self.CONFUSED_EMOJI)
+            await message.channel.send(
+                content=f'Crabigator does not know this person. I cannot delete what I do not know. {emoji}')
 
     async def get_user_data_model(self, user_id: int) -> User:
         """
         Get the user_data field from the DataFetcher as a User object.
         :param user_id: The Discord.User.id that was used to as the dictionary key.
         """
-        if user_id not in self._dataFetcher.wanikani_users.keys():
-            self._dataFetcher.wanikani_users[user_id] = {}
-        if 'USER_DATA' not in self._dataFetcher.wanikani_users[user_id]:
-            await self._dataFetcher.fetch_wanikani_user_data(user_id=user_id)
-        return self._dataFetcher.wanikani_users[user_id]['USER_DATA']
+        return await self._dataFetcher.get_wanikani_user_data(user_id=user_id)
 
     @staticmethod
     def extract_user_id(words: List[str], author: discord.member.Member) -> int:
@@ -397,152 +704,193 @@ class WaniKaniBotClient(discord.Client):
                     return -1
         return -1
 
-    async def get_user_stats(self, words: List[str], message: discord.Message,
-                             author: discord.member.Member, prefix: str) -> None:
+    async def get_user_stats(self, message: discord.Message, words: List[str], prefix: str, user_id: int) -> None:
         """
         Fetches and displays a WaniKani user.
-        :param words: Array of arguments, if there is a second one it is a specific Discord.User.
         :param message: The Discord.Message that was received minus the prefix.
-        :param author: The Discord.User that requested the statistics.
+        :param words: Array of arguments, if there is a second one it is a specific Discord.User.
         :param prefix: The prefix used for the Crabigator.
-        """
-        user_id = self.extract_user_id(words=words, author=author)
-        if user_id == -1:
-            await message.channel.send(content='Please tag **one** Discord User,'
-                                       ' or provide **one** Discord User ID with this command.')
-            return
-
-        if not self._dataStorage.find_api_user(user_id=user_id):
-            await self.unknown_wanikani_user(channel=message.channel, prefix=prefix)
+        :param user_id: The Discord.User.id of the registered WaniKani user.
+        """
+        author: discord.member.Member = message.author
+
+        # None of these depend on each other, so fetch them all at once.
+        timer: StageTimer = StageTimer(name=f'user {user_id}')
+        user, summary, item_counts = await asyncio.gather(
+            timer.run('user', self.get_user_data_model(user_id=user_id)),
+            timer.run('summary', self._dataFetcher.get_wanikani_user_summary(user_id=user_id)),
+            # Fetch counts of radicals, kanji and vocabulary learned and burned.
+            # A slow first sync keeps going in the background when this command gives up on it.
+            timer.run('item_counts', self._dataFetcher.fetch_wanikani_item_counts(user_id=user_id)))
+        log_event(logger, 'stages', sample_rate=self._log_sample_rate, timings=timer)
+        # Without the user itself there is nothing to show.
+        if user is None:
+            await self.oopsie(channel=message.channel, attempted_command=words[0], prefix=prefix)
             return
 
-        if user_id not in self._dataFetcher.wanikani_users.keys():
-            self._dataFetcher.wanikani_users[user_id] = {}
-
-        user: User = await self._dataFetcher.fetch_wanikani_user_data(user_id=user_id)
         embed: discord.Embed = discord.Embed(title=user.username, url=user.profile_url,
                                              colour=author.colour, timestamp=datetime.now())
         embed.set_thumbnail(url='https://cdn.wanikani.com/default-avatar-300x300-20121121.png')
-        summary: Summary = await self._dataFetcher.fetch_wanikani_user_summary(user_id=user_id)
         # Add all the custom embed fields.
         embed.add_field(name='Level', value=f'{user.level}/{user.max_level}', inline=False)
         # Get a good and bad emoji from the Guild.
-        happy_emoji: discord.Emoji = await self.fetch_emoji(message.guild, ['happy', 'yay', 'thumbsup', 'sugoi'])
+        happy_emoji: str = self.fetch_emoji(message.guild, self.HAPPY_EMOJI)
+        sad_emoji: str = self.fetch_emoji(message.guild, self.SAD_EMOJI)
         if not happy_emoji:
             happy_emoji = ':thumbsup:'
-        sad_emoji: discord.Emoji = await self.fetch_emoji(message.guild, ['sad', 'cry', 'thumbsdown', 'baka'])
         if not sad_emoji:
             sad_emoji = ':thumbsdown:'
         if user.subscribed:
             embed.add_field(name='Subscription Status',
                             value=f"**{user.subscription_type.capitalize()}** cultist member since"
-                            f" {user.member_since[0:user.member_since.index('T')]} {happy_emoji}",
+                            f" {user.member_since:%Y-%m-%d} {happy_emoji}",
                             inline=False)
         else:
             embed.add_field(name='Subscription Status', value=f"Wannabe cultist... {sad_emoji}", inline=False)
-        # Fetch counts of radicals, kanji and vocabulary learned and burned.
-        item_counts: List[int] = await self._dataFetcher.fetch_wanikani_item_counts(user_id=user_id)
+        if item_counts is None:
+            item_counts = [self.UNAVAILABLE] * 4
         embed.add_field(name='Radicals Learned:', value=str(item_counts[0]), inline=True)
         embed.add_field(name='Kanji Learned:', value=str(item_counts[1]), inline=True)
         embed.add_field(name='Vocabulary Learned:', value=str(item_counts[2]), inline=True)
         embed.add_field(name='Items Burned:', value=str(item_counts[3]), inline=False)
-        embed.add_field(name='Lessons available:', value=str(len(summary.available_lessons)), inline=True)
-        embed.add_field(name='Reviews available:', value=str(len(summary.available_reviews)), inline=True)
+        embed.add_field(name='Lessons available:',
+                        value=str(len(summary.available_lessons)) if summary else self.UNAVAILABLE, inline=True)
+        embed.add_field(name='Reviews available:',
+                        value=str(len(summary.available_reviews)) if summary else self.UNAVAILABLE, inline=True)
         await self.send_embed(channel=message.channel, embed=embed)
 
-    async def get_daily_stats(self, words: List[str], channel: discord.TextChannel,
-                              author: discord.member.Member, prefix: str) -> None:
+    async def get_daily_stats(self, message: discord.Message, words: List[str], prefix: str, user_id: int) -> None:
         """
         Fetches the user's daily statistics and returns them neatly formatted.
+        :param message: The Discord.Message that was received minus the prefix.
         :param words: Array of arguments, if there is a second one it is a specific Discord.User.
-        :param channel: The Discord.TextChannel that the message should be sent to.
-        :param author: The Discord.User that requested the statistics.
         :param prefix: The prefix used for the Crabigator.
+        :param user_id: The Discord.User.id of the registered WaniKani user.
         """
-        user_id = self.extract_user_id(words=words, author=author)
-        if user_id == -1:
-            await channel.send(content='Please tag **one** Discord User,'
-                                       ' or provide **one** Discord User ID with this command.')
-            return
+        channel: discord.TextChannel = message.channel
+        author: discord.member.Member = message.author
 
-        if not self._dataStorage.find_api_user(user_id=user_id):
-            await self.unknown_wanikani_user(channel=channel, prefix=prefix)
-            return
-
-        if user_id not in self._dataFetcher.wanikani_users.keys():
-            self._dataFetcher.wanikani_users[user_id] = {}
-
-        user: User = await self.get_user_data_model(user_id=user_id)
         date: str = datetime.today().strftime('%Y-%m-%d')
-        lesson_data: Dict[str, Any] = await self._dataFetcher.get_wanikani_data(user_id=user_id,
-                                                                                resource='assignments',
-                                                                                after_date=date)
-        review_data: Dict[str, Any] = await self._dataFetcher.get_wanikani_data(user_id=user_id,
-                                                                                resource='reviews',
-                                                                                after_date=date)
-        summary_data: Summary = await self._dataFetcher.fetch_wanikani_user_summary(user_id=user_id)
+        # None of these depend on each other, so fetch them all at once.
+        timer: StageTimer = StageTimer(name=f'daily {user_id}')
+        user, lesson_count, review_data, summary_data = await asyncio.gather(
+            timer.run('user', self.get_user_data_model(user_id=user_id)),
+            timer.run('assignments', self._dataFetcher.count_wanikani_started_lessons(user_id=user_id, date=date)),
+            timer.run('reviews', self._dataFetcher.get_wanikani_data(user_id=user_id, resource='reviews',
+                                                                     after_date=date)),
+            timer.run('summary', self._dataFetcher.get_wanikani_user_summary(user_id=user_id)))
+        log_event(logger, 'stages', sample_rate=self._log_sample_rate, timings=timer)
         embed: discord.Embed = discord.Embed(title='Daily Overview',
                                              colour=author.colour,
                                              timestamp=datetime.now())
         embed.set_thumbnail(url='https://cdn.wanikani.com/default-avatar-300x300-20121121.png')
-        embed.set_author(name='WaniKani Profile', icon_url='https://knowledge.wanikani.com/siteicon.png',
-                         url=user.profile_url)
+        if user is not None:
+            embed.set_author(name='WaniKani Profile', icon_url='https://knowledge.wanikani.com/siteicon.png',
+                             url=user.profile_url)
         # Add all the custom embed fields.
         embed.add_field(name='Completed Reviews',
-                        value=review_data['total_count'],
+                        value=review_data['total_count'] if review_data else self.UNAVAILABLE,
                         inline=False)
         """
         The total count for lessons in the /assignments resource is incorrect.
         Instead of only showing the newest lessons since the ?updated_after query,
         it shows 'lessons' that already have high srs_stages.
-        So to get the actual amount we need to loop through and parse the ones started after the current date.
+        So to get the actual amount we need to loop through every page and count the ones started on the current date.
         So for example started_at being 2019-05-24 for the completed lessons on may 24th 2019.
         """
-        completed_lessons: int = 0
-        for entry in lesson_data['data']:
-            # Parse the started_at date from the entry.
-            if entry['data']['started_at'] \
-                    and date == entry['data']['started_at'][0:entry['data']['started_at'].index('T')]:
-                completed_lessons += 1
         embed.add_field(name='Completed Lessons',
-                        value=str(completed_lessons),
+                        value=str(lesson_count) if lesson_count is not None else self.UNAVAILABLE,
                         inline=False)
         embed.add_field(name='Reviews available:',
-                        value=str(len(summary_data.available_reviews)),
+                        value=str(len(summary_data.available_reviews)) if summary_data else self.UNAVAILABLE,
                         inline=False)
         embed.add_field(name='Lessons available:',
-                        value=str(len(summary_data.available_lessons)),
+                        value=str(len(summary_data.available_lessons)) if summary_data else self.UNAVAILABLE,
                         inline=False)
         await self.send_embed(channel=channel, embed=embed)
 
-    async def get_leveling_stats(self, words: List[str], channel: discord.TextChannel,
-                                 author: discord.member.Member, prefix: str):
+    async def get_leveling_stats(self, message: discord.Message, words: List[str], prefix: str,
+                                 user_id: int) -> None:
         """
         Fetches the leveling statistics and returns them neatly formatted.
+        :param message: The Discord.Message that was received minus the prefix.
         :param words: Array of arguments, if there is a second one it is a specific Discord.User.
-        :param channel: The Discord.TextChannel that the message should be sent to.
-        :param author: The Discord.User that requested the statistics.
         :param prefix: The prefix used for the Crabigator.
-        """
-        user_id = self.extract_user_id(words=words, author=author)
-        if user_id == -1:
-            await channel.send(content='Please tag **one** Discord User,'
-                                       ' or provide **one** Discord User ID with this command.')
+        :param user_id: The Discord.User.id of the registered WaniKani user.
+        """
+        # None of these depend on each other, so fetch them all at once.
+        timer: StageTimer = StageTimer(name=f'levelstats {user_id}')
+        user, state = await asyncio.gather(
+            timer.run('user', self.get_user_data_model(user_id=user_id)),
+            timer.run('level_progressions', self._dataFetcher.fetch_wanikani_leveling_state(user_id=user_id)))
+        log_event(logger, 'stages', sample_rate=self._log_sample_rate, timings=timer)
+        if state is None:
+            await self.oopsie(channel=message.channel, attempted_command=words[0], prefix=prefix)
             return
 
-        if not self._dataStorage.find_api_user(user_id=user_id):
-            await self.unknown_wanikani_user(channel=channel, prefix=prefix)
+        stats: LevelingStats = state.statistics()
+        now: datetime = datetime.now(tz=timezone.utc)
+        embed: discord.Embed = discord.Embed(title='Leveling Statistics', colour=message.author.colour,
+                                             timestamp=datetime.now())
+        embed.set_thumbnail(url='https://cdn.wanikani.com/default-avatar-300x300-20121121.png')
+        if user is not None:
+            embed.set_author(name=user.username, icon_url='https://knowledge.wanikani.com/siteicon.png',
+                             url=user.profile_url)
+        if stats.current_level is None:
+            embed.description = 'No levels unlocked yet. The Crabigator is getting impatient...'
+            await self.send_embed(channel=message.channel, embed=embed, contains_description=True)
             return
 
-        user: User = await self.get_user_data_model(user_id=user_id)
-        progression: Dict[str, Any] = await self._dataFetcher.get_wanikani_data(user_id=user_id,
-                                                                                resource='level_progressions')
-        # Add found data to user object.
-        for level_progress in progression['data']:
-            user.level_progressions.append(level_progress)
-        await channel.send(
-            content=f"Compiling your data took forever, so I took a nap instead. "
-            f"Just use https://www.wkstats.com/ for now or bitch at <@!209076181365030913>.")
+        embed.add_field(name='Current Level',
+                        value=f'{stats.current_level} for {self.format_days(stats.time_on_current_level(now))}',
+                        inline=False)
+        embed.add_field(name='Median', value=self.format_days(stats.median), inline=True)
+        embed.add_field(name='Average', value=self.format_days(stats.average), inline=True)
+        if stats.fastest:
+            embed.add_field(name='Fastest', value=f'Level {stats.fastest[0]} in {self.format_days(stats.fastest[1])}',
+                            inline=False)
+            embed.add_field(name='Slowest', value=f'Level {stats.slowest[0]} in {self.format_days(stats.slowest[1])}',
+                            inline=True)
+        projected: datetime = stats.projected_max_level(now=now)
+        embed.add_field(name=f'Level {LevelingStats.MAX_LEVEL}',
+                        value=f'{projected:%Y-%m-%d}' if projected else self.UNAVAILABLE, inline=False)
+        # Embed field values are limited to 1024 characters, so only the most recent levels are listed.
+        recent: List[str] = [f'{level}: {self.format_days(duration)}'
+                             for level, duration in list(stats.durations.items())[-10:]]
+        if recent:
+            embed.add_field(name='Recent Levels', value='\n'.join(recent), inline=False)
+        await self.send_embed(channel=message.channel, embed=embed)
+
+    @staticmethod
+    def format_days(seconds: float) -> str:
+        """
+        Formats a duration as an amount of days.
+        :param seconds: The duration in seconds.
+        :return: The formatted amount of days, or the unavailable text if there is no duration.
+        """
+        if seconds is None:
+            return WaniKaniBotClient.UNAVAILABLE
+        return f'{seconds / 86400:.1f} days'
+
+    def build_help_embed(self, prefix: str) -> discord.Embed:
+        """
+        Builds the help menu from the help entries of every registered command.
+        :param prefix: The prefix used for the Crabigator.
+        :return: The Discord.Embed listing every command.
+        """
+        embed: discord.Embed = discord.Embed(title=f"{self.user.display_name} Commands Help",
+                                             colour=self.user.colour,
+                                             timestamp=datetime(year=2019, month=11, day=24))
+        embed.set_thumbnail(url='https://i.imgur.com/Fjk2Dv1.png')
+        embed.set_author(name=self.user.display_name, icon_url=self.user.avatar_url,
+                         url='https://github.com/AlexanderColen/WaniKaniDiscordBot')
+        # Add all the custom embed fields.
+        for command in self._commands.commands:
+            for usage, description in command.help_entries:
+                embed.add_field(name=f'{prefix}{command.name} {usage}'.rstrip(),
+                                value=description,
+                                inline=command.help_inline)
+        return embed
 
     async def get_help(self, words: List[str], channel: discord.TextChannel, prefix: str):
         """
@@ -552,46 +900,12 @@ class WaniKaniBotClient(discord.Client):
         :param prefix: The prefix used for the Crabigator.
         """
         if len(words) == 1:
-            embed: discord.Embed = discord.Embed(title=f"{self.user.display_name} Commands Help",
-                                                 colour=self.user.colour,
-                                                 timestamp=datetime(year=2019, month=11, day=24))
-            embed.set_thumbnail(url='https://i.imgur.com/Fjk2Dv1.png')
-            embed.set_author(name=self.user.display_name, icon_url=self.user.avatar_url,
-                             url='https://github.com/AlexanderColen/WaniKaniDiscordBot')
-            # Add all the custom embed fields.
-            embed.add_field(name=f'{prefix}help',
-                            value='Displays this embedded message.',
-                            inline=False)
-            embed.add_field(name=f'{prefix}help `<COMMAND_NAME>`',
-                            value='Displays more info for the specified command.',
-                            inline=False)
-            embed.add_field(name=f'{prefix}adduser `<WANIKANI_API_V2_TOKEN>`',
-                            value='Registers a WaniKani user to allow API usage. **ONLY WORKS IN DIRECT MESSAGES!**',
-                            inline=False)
-            embed.add_field(name=f'{prefix}removeuser',
-                            value="Removes a user's data to no longer allow API usage.",
-                            inline=False)
-            embed.add_field(name=f'{prefix}user',
-                            value="Displays the WaniKani user's overall statistics."
-                                  "Optionally you can target another user.",
-                            inline=False)
-            embed.add_field(name=f'{prefix}levelstats',
-                            value="Displays the WaniKani user's leveling statistics. "
-                                  "Optionally you can target another user.",
-                            inline=False)
-            embed.add_field(name=f'{prefix}draw',
-                            value="Draws your message on a sign.",
-                            inline=False)
-            embed.add_field(name=f'{prefix}congratulations',
-                            value=':tada:',
-                            inline=True)
-            embed.add_field(name=f'{prefix}anger',
-                            value=':anger:',
-                            inline=True)
-            embed.add_field(name=f'{prefix}love',
-                            value=':heart:',
-                            inline=True)
-            await self.send_embed(channel=channel, embed=embed)
+            embed: discord.Embed = self._help_embeds.get(prefix)
+            if embed is None:
+                embed = self.build_help_embed(prefix=prefix)
+                self._help_embeds[prefix] = embed
+            # Send a copy, since sending fills in a random description.
+            await self.send_embed(channel=channel, embed=embed.copy())
         else:
             if words[1] == 'help':
                 await self.send_image(channel=channel, image_name='img/yodawg.png')
@@ -1,12 +1,116 @@
 from client import WaniKaniBotClient
 from discord.errors import LoginFailure
-from typing import Any, Dict
+from typing import Any, Dict, List, Union
+import asyncio
+import discord
 import json
+import logging
+import multiprocessing
+
+
+def parse_shard_ids(value: Union[str, List[int]]) -> List[int]:
+    """
+    Parses the shards a host should run.
+    :param value: A list of shard IDs, or a string of IDs and inclusive ranges like '0-3,8'.
+    :return: The sorted shard IDs.
+    """
+    if not isinstance(value, str):
+        return sorted(value)
+    shard_ids: List[int] = []
+    for part in value.split(','):
+        start, _, end = part.strip().partition('-')
+        shard_ids.extend(range(int(start), int(end or start) + 1))
+    return sorted(set(shard_ids))
+
+
+def split_shards(shard_ids: List[int], processes: int) -> List[List[int]]:
+    """
+    Divides shards over processes in consecutive groups of (nearly) equal size.
+    :param shard_ids: The shard IDs.
+    :param processes: The amount of processes.
+    :return: The shard IDs per process, without empty groups.
+    """
+    size, remainder = divmod(len(shard_ids), processes)
+    groups: List[List[int]] = []
+    start: int = 0
+    for i in range(processes):
+        end: int = start + size + (1 if i < remainder else 0)
+        if end > start:
+            groups.append(shard_ids[start:end])
+        start = end
+    return groups
+
+
+async def recommended_shard_count(token: str) -> int:
+    """
+    Asks Discord how many shards the bot should have.
+    :param token: The Discord bot token.
+    :return: The recommended amount of shards.
+    """
+    http: discord.http.HTTPClient = discord.http.HTTPClient()
+    try:
+        await http.static_login(token, bot=True)
+        shard_count, _ = await http.get_bot_gateway()
+        return shard_count
+    finally:
+        await http.close()
+
+
+def run_shard_group(token: str, shard_ids: List[int], shard_count: int, process_index: int, processes: int) -> None:
+    """
+    Runs a group of shards, the entry point of every process that the launcher starts.
+    :param token: The Discord bot token.
+    :param shard_ids: The shards this process runs.
+    :param shard_count: The total amount of shards of the bot.
+    :param process_index: The index of this process.
+    :param processes: The amount of processes the launcher started.
+    """
+    logging.basicConfig(level=logging.INFO,
+                        format=f'%(asctime)s %(levelname)s [{process_index}] %(name)s %(message)s')
+    print(f'Starting WaniKaniClient for shards {shard_ids} of {shard_count}...')
+    client: WaniKaniBotClient = WaniKaniBotClient(shard_ids=shard_ids, shard_count=shard_count,
+                                                  process_index=process_index, processes=processes)
+    try:
+        client.run(token)
+    except LoginFailure:
+        print('Fetched token was invalid. Please make sure that you edited settings.json correctly.')
+
+
+def launch(token: str, shard_ids: List[int], shard_count: int, processes: int) -> None:
+    """
+    Runs the shards as groups in separate processes and waits until they all stopped.
+    Processes are spawned rather than forked, so that none of them inherits an event loop or connection pool.
+    :param token: The Discord bot token.
+    :param shard_ids: Every shard this host runs.
+    :param shard_count: The total amount of shards of the bot.
+    :param processes: The amount of processes.
+    """
+    context: Any = multiprocessing.get_context('spawn')
+    workers: List[multiprocessing.Process] = []
+    groups: List[List[int]] = split_shards(shard_ids=shard_ids, processes=processes)
+    for index, group in enumerate(groups):
+        worker: multiprocessing.Process = context.Process(target=run_shard_group, name=f'shards-{group[0]}',
+                                                          args=(token, group, shard_count, index, len(groups)))
+        worker.start()
+        workers.append(worker)
+    try:
+        for worker in workers:
+            worker.join()
+            print(f'Process {worker.name} stopped with exit code {worker.exitcode}.')
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s %(message)s')
     print('WaniKani Discord Bot - Copyright (C) 2019 - Alexander Colen')
     token: str = None
+    shard_count: int = None
+    shard_ids: List[int] = None
+    processes: int = 1
     print('Fetching settings.json...')
     with open('resources/settings.json') as json_data_file:
         data: Dict[str, Any] = json.load(json_data_file)
@@ -17,9 +121,35 @@ if __name__ == '__main__':
             token: str = data["DISCORD_BOT_TOKEN"]
         else:
             print("Settings.json is corrupt. Please redownload the original file to fix this.")
+        # Without a shard count Discord's recommendation is used, without shard IDs this host runs every shard.
+        shard_count = data.get('SHARD_COUNT')
+        if data.get('SHARD_IDS') is not None:
+            shard_ids = parse_shard_ids(value=data['SHARD_IDS'])
+        processes = data.get('SHARD_PROCESSES', processes)
+        shared_cache_path: str = data.get('SHARED_CACHE_PATH')
+
+    if processes > 1 and not shared_cache_path:
+        # Without a shared cache the processes would never learn about each other's new users and prefixes.
+        print('Running more than one process requires SHARED_CACHE_PATH in settings.json, '
+              'for example "resources/shared-cache.db".')
+        raise SystemExit(1)
+
+    # Running only some of the shards requires their total, which the client would otherwise only learn for all shards.
+    if (processes > 1 or shard_ids is not None) and shard_count is None and token != "EMPTY":
+        try:
+            shard_count = asyncio.get_event_loop().run_until_complete(recommended_shard_count(token=token))
+            print(f'Discord recommends {shard_count} shards.')
+        except LoginFailure:
+            print('Fetched token was invalid. Please make sure that you edited settings.json correctly.')
+            raise SystemExit(1)
+
+    if processes > 1 and token != "EMPTY":
+        launch(token=token, shard_ids=shard_ids or list(range(shard_count)), shard_count=shard_count,
+               processes=processes)
+        raise SystemExit
 
     print('Starting WaniKaniClient...')
-    client: WaniKaniBotClient = WaniKaniBotClient()
+    client: WaniKaniBotClient = WaniKaniBotClient(shard_ids=shard_ids, shard_count=shard_count)
     try:
         if token != "EMPTY":
             client.run(token)
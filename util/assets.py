@@ -0,0 +1,88 @@
+from PIL import Image, ImageFont
+from typing import Dict
+import hashlib
+import io
+import os
+
+
+class AssetRegistry:
+    IMAGE_DIRECTORY: str = 'img'
+    IMAGE_EXTENSIONS: tuple = ('.png', '.jpg', '.jpeg', '.gif')
+    SIGN_TEMPLATE: str = 'img/crabigator_sign.png'
+    TEXT_TEMPLATE: str = 'img/to_draw_image.png'
+    FONT: str = 'resources/fonts/TruetypewriterPolyglott-mELa.ttf'
+    # Change to this font for Windows machines.
+    # FONT: str = 'arial.ttf'
+    FONT_SIZE: int = 40
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty registry. Use load_images and/or load_templates to fill it.
+        """
+        self.images: Dict[str, bytes] = {}
+        self.sign_template: Image = None
+        self.text_template: Image = None
+        self.font: ImageFont = None
+        self._font_size: int = 0
+
+    def load_images(self) -> None:
+        """
+        Reads the encoded bytes of every image in the image directory, so they can be sent without disk I/O.
+        """
+        for filename in sorted(os.listdir(self.IMAGE_DIRECTORY)):
+            if filename.lower().endswith(self.IMAGE_EXTENSIONS):
+                path: str = f'{self.IMAGE_DIRECTORY}/{filename}'
+                with open(path, 'rb') as image:
+                    self.images[path] = image.read()
+
+    def load_templates(self) -> None:
+        """
+        Decodes the sign templates and loads the font used to draw on them.
+        """
+        self.sign_template = Image.open(self.SIGN_TEMPLATE)
+        self.sign_template.load()
+        self.text_template = Image.open(self.TEXT_TEMPLATE)
+        self.text_template.load()
+        self.font = ImageFont.truetype(self.FONT, self.FONT_SIZE)
+        self._font_size = os.path.getsize(self.FONT)
+
+    def template_version(self) -> str:
+        """
+        Fingerprints the sign templates and font, so that rendered images can be cached across restarts.
+        :return: A hash of the template images, the font file and the font size.
+        """
+        digest = hashlib.sha1(str(self.FONT_SIZE).encode('utf-8'))
+        for path in [self.SIGN_TEMPLATE, self.TEXT_TEMPLATE, self.FONT]:
+            with open(path, 'rb') as asset:
+                digest.update(asset.read())
+        return digest.hexdigest()
+
+    def image(self, image_name: str) -> io.BytesIO:
+        """
+        Get an image as an in-memory file. Images that were not preloaded are read from disk and cached.
+        :param image_name: The local name of the image, for example 'img/concrabs.png'.
+        :return: A new buffer containing the encoded image, ready to be wrapped in a Discord.File.
+        """
+        content: bytes = self.images.get(image_name)
+        if content is None:
+            with open(image_name, 'rb') as image:
+                content = image.read()
+            self.images[image_name] = content
+        return io.BytesIO(content)
+
+    def memory_report(self) -> Dict[str, int]:
+        """
+        Estimates how many bytes every loaded asset takes up in memory.
+        :return: Dictionary mapping the name of every asset to its size in bytes.
+        """
+        report: Dict[str, int] = {name: len(content) for name, content in self.images.items()}
+        for name, template in [(self.SIGN_TEMPLATE, self.sign_template), (self.TEXT_TEMPLATE, self.text_template)]:
+            if template is not None:
+                report[f'{name} (decoded)'] = template.width * template.height * len(template.getbands())
+        if self.font is not None:
+            report[self.FONT] = self._font_size
+        return report
+
+    def __str__(self) -> str:
+        report: Dict[str, int] = self.memory_report()
+        return f'Assets loaded: {len(report)} - Memory: {sum(report.values()) / 1024:.0f} KiB'
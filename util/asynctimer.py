@@ -1,71 +1,232 @@
-from typing import Any, Callable
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
 import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
 
+logger: logging.Logger = logging.getLogger(__name__)
 
-class Timer:
-    def __init__(self, timeout: int, callback: Callable[[Any], Any]) -> None:
+
+class Job:
+    # What to do with a run that is due for longer than the misfire grace period, for example after the
+    # event loop was blocked: run it once anyway, or skip it and wait for the next run time.
+    RUN_ONCE: str = 'run_once'
+    SKIP: str = 'skip'
+
+    def __init__(self, name: str, coro: Callable[[], Awaitable[Any]], interval: float = None, hour: int = None,
+                 minute: int = None, jitter: float = 0, missed_policy: str = RUN_ONCE, misfire_grace: float = 60,
+                 allow_overlap: bool = False) -> None:
         """
-        Initializes the Timer.
-        :param timeout: How long needs to be between each callback.
-        :param callback: The callback that needs to happen per iteration.
+        Initializes a job. Either an interval, or a minute (and optionally an hour) in UTC should be given.
+        :param name: The unique name of the job.
+        :param coro: The co-routine function that needs to be executed.
+        :param interval: Seconds between every run.
+        :param hour: The UTC hour to run at every day. None to run every hour at the given minute.
+        :param minute: The UTC minute to run at.
+        :param jitter: Maximum amount of random seconds added to every run time.
+        :param missed_policy: Either Job.RUN_ONCE or Job.SKIP.
+        :param misfire_grace: How many seconds a run may be late before it counts as missed.
+        :param allow_overlap: Whether a run may start while the previous run is still going.
         """
-        self._timeout = timeout
-        self._callback = callback
-        self._task = asyncio.ensure_future(self._job())
+        if interval is None and minute is None:
+            raise ValueError(f'Job {name} needs either an interval or a minute to run at.')
+        self.name: str = name
+        self.coro: Callable[[], Awaitable[Any]] = coro
+        self.interval: float = interval
+        self.hour: int = hour
+        self.minute: int = minute
+        self.jitter: float = jitter
+        self.missed_policy: str = missed_policy
+        self.misfire_grace: float = misfire_grace
+        self.allow_overlap: bool = allow_overlap
+        self.next_run: float = 0
+        self.cancelled: bool = False
+        self.running: int = 0
+        self.runs: int = 0
+        self.failures: int = 0
+        self.missed: int = 0
+        self.overlaps: int = 0
+        self.last_duration: float = 0
+        self.max_duration: float = 0
+        self.total_duration: float = 0
 
-    async def _job(self) -> None:
+    def schedule_next(self, now: float) -> float:
         """
-        Executes the callback after a timeout.
+        Determines the next run time after now.
+        :param now: The current UNIX timestamp.
+        :return: The UNIX timestamp of the next run.
         """
-        await asyncio.sleep(self._timeout)
-        await self._callback()
+        if self.interval is not None:
+            next_run: float = now + self.interval
+        else:
+            current: datetime = datetime.fromtimestamp(now, tz=timezone.utc)
+            candidate: datetime = current.replace(minute=self.minute, second=0, microsecond=0)
+            step: timedelta = timedelta(hours=1)
+            if self.hour is not None:
+                candidate = candidate.replace(hour=self.hour)
+                step = timedelta(days=1)
+            while candidate.timestamp() <= now:
+                candidate += step
+            next_run = candidate.timestamp()
+        self.next_run = next_run + random.uniform(0, self.jitter)
+        return self.next_run
 
-    def cancel(self) -> None:
+    def average_duration(self) -> float:
         """
-        Cancels the existing task.
+        :return: The average amount of seconds a run took.
         """
-        self._task.cancel()
+        return self.total_duration / self.runs if self.runs else 0
+
+    def __str__(self) -> str:
+        next_run: datetime = datetime.fromtimestamp(self.next_run, tz=timezone.utc)
+        return f'Job: {self.name} - Next run: {next_run:%Y-%m-%d %H:%M:%S} UTC - Runs: {self.runs}' \
+            f' - Failures: {self.failures} - Missed: {self.missed} - Overlaps: {self.overlaps}' \
+            f' - Average: {self.average_duration():.2f}s - Max: {self.max_duration:.2f}s'
 
 
 class Scheduler:
-    async def main(self,
-                   coro: Callable[[Any], Any],
-                   time: int,
-                   loop: asyncio.AbstractEventLoop) -> None:
-        """
-        Main execution of the Scheduler.
-        :param coro: The co-routine that needs to be executed.
-        :param time: Integer indicating how many seconds before it runs again.
-        :param loop: The Asyncio EventLoop that the task should run in.
-        """
-        Timer(time, coro)
-        await asyncio.sleep(time)
-        await self.create_task(coro=coro, time=time, loop=loop)
-
-    async def run(self,
-                  coro: Callable[[Any], Any],
-                  time: int) -> None:
-        """
-        Selects the event loop and schedules the running of the co-routine.
-        :param coro: The co-routine that needs to be executed.
-        :param time: Integer indicating how many seconds before it runs again.
-        """
-        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
-        if not loop:
-            loop = asyncio.new_event_loop()
-            loop.run_forever()
-            asyncio.set_event_loop(loop)
-
-        await self.create_task(coro=coro, time=time, loop=loop)
-
-    async def create_task(self,
-                          coro: Callable[[Any], Any],
-                          time: int,
-                          loop: asyncio.AbstractEventLoop) -> None:
-        """
-        Creates a task and adds it to the loop.
-        :param coro: The co-routine that needs to be executed.
-        :param time: Integer indicating how many seconds before it runs again.
-        :param loop: The Asyncio EventLoop that the task should run in.
-        """
-        await loop.create_task(coro=self.main(coro=coro, time=time, loop=loop))
+    def __init__(self) -> None:
+        """
+        Initializes a scheduler that runs every job from a single task, driven by a heap of next run times.
+        """
+        self.jobs: Dict[str, Job] = {}
+        self._queue: List[Tuple[float, int, Job]] = []
+        self._counter: itertools.count = itertools.count()
+        self._task: asyncio.Task = None
+        # The event loop only keeps weak references to tasks, so running jobs are kept alive here.
+        self._running: Set[asyncio.Task] = set()
+        self._wakeup: asyncio.Event = None
+
+    def every(self, name: str, coro: Callable[[], Awaitable[Any]], seconds: float,
+              run_immediately: bool = False, **kwargs) -> Job:
+        """
+        Schedules a co-routine to run at an interval. Replaces any job with the same name.
+        :param name: The unique name of the job.
+        :param coro: The co-routine function that needs to be executed.
+        :param seconds: Seconds between every run.
+        :param run_immediately: Whether the first run should happen right away instead of after one interval.
+        :param kwargs: Any of the other arguments of Job.
+        :return: The scheduled Job.
+        """
+        job: Job = Job(name=name, coro=coro, interval=seconds, **kwargs)
+        first_run: float = time.time() if run_immediately else job.schedule_next(now=time.time())
+        return self._add(job=job, first_run=first_run)
+
+    def cron(self, name: str, coro: Callable[[], Awaitable[Any]], minute: int = 0, hour: int = None,
+             **kwargs) -> Job:
+        """
+        Schedules a co-routine to run at a fixed time in UTC. Replaces any job with the same name.
+        :param name: The unique name of the job.
+        :param coro: The co-routine function that needs to be executed.
+        :param minute: The UTC minute to run at.
+        :param hour: The UTC hour to run at every day. None to run every hour.
+        :param kwargs: Any of the other arguments of Job.
+        :return: The scheduled Job.
+        """
+        job: Job = Job(name=name, coro=coro, hour=hour, minute=minute, **kwargs)
+        return self._add(job=job, first_run=job.schedule_next(now=time.time()))
+
+    def _add(self, job: Job, first_run: float) -> Job:
+        self.cancel(name=job.name)
+        job.next_run = first_run
+        self.jobs[job.name] = job
+        self._push(job=job)
+        return job
+
+    def _push(self, job: Job) -> None:
+        heapq.heappush(self._queue, (job.next_run, next(self._counter), job))
+        # Wake up the scheduler in case this job is due before the one it is sleeping for.
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def cancel(self, name: str) -> None:
+        """
+        Cancels a job. A run that is already going is allowed to finish.
+        :param name: The name of the job.
+        """
+        job: Job = self.jobs.pop(name, None)
+        if job is not None:
+            # Cancelled jobs are dropped lazily once they reach the top of the heap.
+            job.cancelled = True
+
+    def start(self) -> None:
+        """
+        Starts the scheduler task, unless it is already running.
+        """
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._main())
+
+    def stop(self) -> None:
+        """
+        Stops the scheduler task and cancels the runs that are still going.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in self._running:
+            task.cancel()
+        self._running.clear()
+
+    async def _main(self) -> None:
+        """
+        Main execution of the Scheduler. Sleeps until the earliest job is due and starts it.
+        """
+        while True:
+            self._wakeup.clear()
+            if not self._queue:
+                await self._wakeup.wait()
+                continue
+
+            next_run, _, job = self._queue[0]
+            if job.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            delay: float = next_run - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._queue)
+            now: float = time.time()
+            if now - next_run > job.misfire_grace and job.missed_policy == Job.SKIP:
+                job.missed += 1
+            elif job.running and not job.allow_overlap:
+                job.overlaps += 1
+            else:
+                if now - next_run > job.misfire_grace:
+                    job.missed += 1
+                task: asyncio.Task = asyncio.ensure_future(self._execute(job=job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            # Always schedule from now, so missed runs never cause a burst of catch-up runs.
+            job.schedule_next(now=now)
+            self._push(job=job)
+
+    async def _execute(self, job: Job) -> None:
+        """
+        Runs a job once and records how long it took.
+        :param job: The Job.
+        """
+        job.running += 1
+        start: float = time.perf_counter()
+        try:
+            await job.coro()
+        except Exception:
+            job.failures += 1
+            logger.exception(f'event=job_failed job={job.name!r}')
+        finally:
+            job.running -= 1
+            job.last_duration = time.perf_counter() - start
+            job.max_duration = max(job.max_duration, job.last_duration)
+            job.total_duration += job.last_duration
+            job.runs += 1
+
+    def __str__(self) -> str:
+        return '\n'.join(str(job) for job in sorted(self.jobs.values(), key=lambda j: j.next_run))
@@ -0,0 +1,52 @@
+from typing import Dict
+
+
+class PrefixCache:
+    default_prefix: str = 'wk!'
+    loaded: bool = False
+    hits: int = 0
+    misses: int = 0
+
+    def __init__(self, default_prefix: str = 'wk!') -> None:
+        """
+        Initializes the in-memory map of Discord Guild IDs to their custom prefix.
+        :param default_prefix: The prefix used for Guilds without a custom prefix.
+        """
+        self.default_prefix = default_prefix
+        self._prefixes: Dict[int, str] = {}
+
+    def load(self, prefixes: Dict[int, str]) -> None:
+        """
+        Replaces the cached prefixes with a complete set loaded from the database.
+        :param prefixes: Dictionary mapping every Discord Guild ID with a custom prefix to that prefix.
+        """
+        self._prefixes = dict(prefixes)
+        self.loaded = True
+
+    def get(self, guild_id: int) -> str:
+        """
+        Gets the prefix for a Discord Guild without touching the database.
+        Since all custom prefixes are loaded, a miss simply means the Guild uses the default prefix.
+        :param guild_id: The Discord Guild ID.
+        :return: The custom prefix, or the default prefix if the Guild has none.
+        """
+        prefix: str = self._prefixes.get(guild_id)
+        if prefix is None:
+            self.misses += 1
+            return self.default_prefix
+        self.hits += 1
+        return prefix
+
+    def set(self, guild_id: int, prefix: str) -> None:
+        """
+        Stores the prefix of a Discord Guild. Should be called after the database write succeeded.
+        :param guild_id: The Discord Guild ID.
+        :param prefix: The custom prefix.
+        """
+        self._prefixes[guild_id] = prefix
+
+    def __len__(self) -> int:
+        return len(self._prefixes)
+
+    def __str__(self) -> str:
+        return f'Prefixes cached: {len(self)} - Hits: {self.hits} - Misses: {self.misses}'
@@ -0,0 +1,117 @@
+from collections import OrderedDict
+from typing import List, Optional
+import asyncio
+import hashlib
+import os
+
+
+class RenderCache:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, version: str = '', directory: str = None) -> None:
+        """
+        Initializes a least recently used cache of rendered images, bounded by their total size.
+        :param max_bytes: The maximum summed size of all cached images.
+        :param version: Identifies the templates and font, so that changing them never serves outdated images.
+        :param directory: Optional directory in which the cached images are persisted between restarts.
+        """
+        self.max_bytes: int = max_bytes
+        self.version: str = version
+        self.directory: str = directory
+        self.total_bytes: int = 0
+        self._images: 'OrderedDict[str, bytes]' = OrderedDict()
+
+    def make_key(self, kind: str, text: str) -> str:
+        """
+        Builds the content address of a rendered image.
+        :param kind: What was rendered, for example 'sign'.
+        :param text: The text that was drawn. Runs of whitespace are collapsed, since they render the same.
+        :return: The key of the image.
+        """
+        normalized: str = ' '.join(text.split())
+        return hashlib.sha256(f'{self.version}\0{kind}\0{normalized}'.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.png')
+
+    def load_directory(self) -> None:
+        """
+        Loads the persisted images, most recently used first, and deletes the ones that no longer fit.
+        """
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        paths: List[str] = sorted((os.path.join(self.directory, f) for f in os.listdir(self.directory)
+                                   if f.endswith('.png')), key=os.path.getmtime)
+        for path in paths:
+            with open(path, 'rb') as image:
+                self._store(key=os.path.basename(path)[:-len('.png')], content=image.read())
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Gets a rendered image and marks it as recently used.
+        :param key: The key created by make_key.
+        :return: The encoded image, or None if it was not cached.
+        """
+        content: bytes = self._images.get(key)
+        if content is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._images.move_to_end(key)
+        return content
+
+    async def put(self, key: str, content: bytes) -> None:
+        """
+        Stores a rendered image, evicting the least recently used images until the cache fits again.
+        :param key: The key created by make_key.
+        :param content: The encoded image.
+        """
+        evicted: List[str] = self._store(key=key, content=content)
+        if self.directory:
+            loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, self._persist, key, content, evicted)
+
+    def _store(self, key: str, content: bytes) -> List[str]:
+        if key in self._images:
+            self.total_bytes -= len(self._images.pop(key))
+        evicted: List[str] = []
+        if len(content) > self.max_bytes:
+            return evicted
+        self._images[key] = content
+        self.total_bytes += len(content)
+        while self.total_bytes > self.max_bytes:
+            evicted_key, evicted_content = self._images.popitem(last=False)
+            self.total_bytes -= len(evicted_content)
+            self.evictions += 1
+            evicted.append(evicted_key)
+        return evicted
+
+    def _persist(self, key: str, content: bytes, evicted: List[str]) -> None:
+        """
+        Mirrors a change of the in-memory cache to the directory. Runs on an executor thread.
+        """
+        if key in self._images:
+            with open(self._path(key=key), 'wb') as image:
+                image.write(content)
+        for evicted_key in evicted:
+            try:
+                os.remove(self._path(key=evicted_key))
+            except FileNotFoundError:
+                pass
+
+    def hit_rate(self) -> float:
+        """
+        :return: The fraction of lookups that were served from the cache.
+        """
+        lookups: int = self.hits + self.misses
+        return self.hits / lookups if lookups else 0
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+    def __str__(self) -> str:
+        return f'Images cached: {len(self)} ({self.total_bytes} bytes) - Hit rate: {self.hit_rate():.0%}' \
+            f' - Evictions: {self.evictions}'
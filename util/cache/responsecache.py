@@ -0,0 +1,155 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import time
+
+
+class CachedResponse:
+    def __init__(self, body: Dict[str, Any], size: int, etag: str, last_modified: str, expires_at: float) -> None:
+        self.body: Dict[str, Any] = body
+        self.size: int = size
+        self.etag: str = etag
+        self.last_modified: str = last_modified
+        self.expires_at: float = expires_at
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """
+        Builds the headers needed to revalidate this response with the WaniKani API.
+        :return: Dictionary with If-None-Match and/or If-Modified-Since headers.
+        """
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    # Seconds that a response of a WaniKani resource stays fresh. None means until the next hour boundary,
+    # which is when WaniKani moves new reviews into the available queue.
+    RESOURCE_TTLS: Dict[str, Optional[int]] = {
+        'user': 300,
+        'summary': None,
+        'assignments': 60,
+        'reviews': 60,
+        'level_progressions': 600,
+        'subjects': 86400,
+    }
+    DEFAULT_TTL: int = 60
+    hits: int = 0
+    misses: int = 0
+    revalidations: int = 0
+    evictions: int = 0
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 32 * 1024 * 1024) -> None:
+        """
+        Initializes a response cache that is bounded by both the amount of entries and the total body size.
+        :param max_entries: The maximum amount of cached responses.
+        :param max_bytes: The maximum summed size of all cached response bodies.
+        """
+        self.max_entries: int = max_entries
+        self.max_bytes: int = max_bytes
+        self.total_bytes: int = 0
+        self._entries: 'OrderedDict[Hashable, CachedResponse]' = OrderedDict()
+
+    @staticmethod
+    def make_key(api_token: str, resource: str, params: Dict[str, str]) -> Tuple[str, str, Tuple]:
+        """
+        Builds the cache key for a request.
+        :param api_token: The WaniKani API token the request is made with.
+        :param resource: The WaniKani API resource.
+        :param params: The query parameters of the request.
+        :return: A hashable key.
+        """
+        return api_token, resource, tuple(sorted(params.items()))
+
+    def expiry_for(self, resource: str) -> float:
+        """
+        Determines when a freshly received response for a resource goes stale.
+        :param resource: The WaniKani API resource, optionally followed by a path like 'subjects/1'.
+        :return: The UNIX timestamp after which the response needs to be revalidated.
+        """
+        now: float = time.time()
+        ttl: Optional[int] = self.RESOURCE_TTLS.get(resource.split('/')[0], self.DEFAULT_TTL)
+        if ttl is None:
+            return now - now % 3600 + 3600
+        return now + ttl
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        """
+        Gets a cached response, fresh or stale, and marks it as recently used.
+        :param key: The key created by make_key.
+        :return: The cached response, or None if nothing is cached.
+        """
+        entry: CachedResponse = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if entry.is_fresh():
+            self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, resource: str, body: Dict[str, Any], size: int,
+            etag: str = None, last_modified: str = None, expires_at: float = None) -> None:
+        """
+        Stores a response and evicts the least recently used responses until the cache fits its bounds again.
+        :param key: The key created by make_key.
+        :param resource: The WaniKani API resource, used to determine the freshness.
+        :param body: The parsed JSON body.
+        :param size: The size of the raw body in bytes.
+        :param etag: The ETag header of the response.
+        :param last_modified: The Last-Modified header of the response.
+        :param expires_at: When the response goes stale, if it was received earlier by another process.
+        """
+        self.invalidate(key=key)
+        # Responses that can never fit are not worth evicting everything else for.
+        if size > self.max_bytes:
+            return
+        self._entries[key] = CachedResponse(body=body, size=size, etag=etag, last_modified=last_modified,
+                                            expires_at=expires_at or self.expiry_for(resource=resource))
+        self.total_bytes += size
+        while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+            self.evictions += 1
+
+    def revalidated(self, key: Hashable, resource: str) -> Optional[CachedResponse]:
+        """
+        Marks a stale response as fresh again after the WaniKani API answered 304 Not Modified.
+        :param key: The key created by make_key.
+        :param resource: The WaniKani API resource, used to determine the freshness.
+        :return: The revalidated response, or None if it was evicted in the meantime.
+        """
+        entry: CachedResponse = self._entries.get(key)
+        if entry is not None:
+            entry.expires_at = self.expiry_for(resource=resource)
+            self.revalidations += 1
+        return entry
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Removes a response from the cache.
+        :param key: The key created by make_key.
+        """
+        entry: CachedResponse = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+
+    def invalidate_token(self, api_token: str) -> None:
+        """
+        Removes every response that was fetched with a WaniKani API token.
+        :param api_token: The WaniKani API token.
+        """
+        for key in [k for k in self._entries if k[0] == api_token]:
+            self.invalidate(key=key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __str__(self) -> str:
+        return f'Responses cached: {len(self)} ({self.total_bytes} bytes) - Hits: {self.hits}' \
+            f' - Misses: {self.misses} - Revalidations: {self.revalidations} - Evictions: {self.evictions}'
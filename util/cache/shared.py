@@ -0,0 +1,191 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+import asyncio
+import functools
+import os
+import sqlite3
+import time
+import uuid
+
+
+class SharedCache:
+    # Whether other processes see what this one stores, otherwise there is no point in polling for changes.
+    shared: bool = False
+
+    def __init__(self) -> None:
+        """
+        Initializes the backend that caches share between the processes of a sharded bot.
+        This implementation is used when everything runs in a single process, so there is nothing to share.
+        """
+        self.published: int = 0
+        self.received: int = 0
+
+    async def open(self) -> None:
+        """
+        Starts following the changes of the other processes. Should be called before this process loads what those
+        changes apply to, so that nothing published in between is missed.
+        """
+        pass
+
+    async def get(self, namespace: str, key: str) -> Optional[str]:
+        """
+        Gets a shared entry that has not expired yet.
+        :param namespace: What kind of entry it is, for example 'response'.
+        :param key: The key of the entry.
+        :return: The value, or None if no process stored a fresh one.
+        """
+        return None
+
+    async def set(self, namespace: str, key: str, value: str, expires_at: float, group: str = None) -> None:
+        """
+        Stores an entry for every process.
+        :param namespace: What kind of entry it is, for example 'response'.
+        :param key: The key of the entry.
+        :param value: The value.
+        :param expires_at: The UNIX timestamp after which the entry is no longer returned.
+        :param group: Optional group, so that all entries of for example one API token can be deleted together.
+        """
+        pass
+
+    async def delete_group(self, namespace: str, group: str) -> None:
+        """
+        Deletes every shared entry of a group.
+        :param namespace: What kind of entries they are.
+        :param group: The group.
+        """
+        pass
+
+    async def publish(self, namespace: str, key: str, value: Optional[str]) -> None:
+        """
+        Tells the other processes that something they cache changed, for example a Guild prefix.
+        :param namespace: What changed, for example 'prefix'.
+        :param key: The key of what changed.
+        :param value: The new value, or None if it was removed.
+        """
+        pass
+
+    async def changes(self) -> List[Tuple[str, str, Optional[str]]]:
+        """
+        Gets what the other processes published since the last call.
+        :return: List of (namespace, key, value) tuples, oldest first.
+        """
+        return []
+
+    def close(self) -> None:
+        pass
+
+    def __str__(self) -> str:
+        return f'Shared cache: local - Published: {self.published} - Received: {self.received}'
+
+
+class SQLiteSharedCache(SharedCache):
+    shared: bool = True
+    # How long published changes are kept around for processes that poll late.
+    CHANGE_RETENTION: float = 600
+    PURGE_INTERVAL: float = 60
+
+    def __init__(self, path: str) -> None:
+        """
+        Initializes a shared cache in an SQLite database file, which every process on the same host opens.
+        All calls run on a single thread, so SQLite never blocks the event loop.
+        The file is created readable for its owner only. It holds response bodies but never API tokens.
+        :param path: The path of the database file.
+        """
+        super(SQLiteSharedCache, self).__init__()
+        self.path: str = path
+        # Changes this process published itself are not received again.
+        self._origin: str = uuid.uuid4().hex
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sharedcache')
+        self._connection: sqlite3.Connection = None
+        self._cursor: int = 0
+        self._last_purge: float = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            # Shared responses contain user data, so only the user running the bot may read the file.
+            # SQLite gives the -wal and -shm files the same permissions.
+            os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+            connection: sqlite3.Connection = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                                             check_same_thread=False)
+            # Write-ahead logging lets the other processes keep reading while one of them writes.
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS entries (namespace TEXT NOT NULL, key TEXT NOT NULL, '
+                               'value TEXT NOT NULL, grp TEXT, expires_at REAL NOT NULL, '
+                               'PRIMARY KEY (namespace, key))')
+            connection.execute('CREATE INDEX IF NOT EXISTS entries_group ON entries (namespace, grp)')
+            connection.execute('CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                               'origin TEXT NOT NULL, namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT, '
+                               'created REAL NOT NULL)')
+            # Only changes published after this point matter, everything before is in the database that is loaded next.
+            self._cursor = connection.execute('SELECT COALESCE(MAX(seq), 0) FROM changes').fetchone()[0]
+            self._connection = connection
+        return self._connection
+
+    async def _run(self, func: Callable[..., Any], *args) -> Any:
+        """
+        Runs a blocking SQLite call on the shared cache thread.
+        :param func: Function taking the connection and the other arguments.
+        :return: Whatever the function returned.
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._executor,
+                                          functools.partial(lambda *a: func(self._connect(), *a), *args))
+
+    async def open(self) -> None:
+        # Connecting remembers the newest change.
+        await self._run(lambda connection: None)
+
+    async def get(self, namespace: str, key: str) -> Optional[str]:
+        def select(connection: sqlite3.Connection) -> Optional[str]:
+            row: Tuple[str] = connection.execute('SELECT value FROM entries WHERE namespace = ? AND key = ? '
+                                                 'AND expires_at > ?', (namespace, key, time.time())).fetchone()
+            return row[0] if row else None
+
+        value: Optional[str] = await self._run(select)
+        if value is not None:
+            self.received += 1
+        return value
+
+    async def set(self, namespace: str, key: str, value: str, expires_at: float, group: str = None) -> None:
+        await self._run(lambda connection: connection.execute(
+            'INSERT OR REPLACE INTO entries (namespace, key, value, grp, expires_at) VALUES (?, ?, ?, ?, ?)',
+            (namespace, key, value, group, expires_at)))
+        self.published += 1
+
+    async def delete_group(self, namespace: str, group: str) -> None:
+        await self._run(lambda connection: connection.execute(
+            'DELETE FROM entries WHERE namespace = ? AND grp = ?', (namespace, group)))
+
+    async def publish(self, namespace: str, key: str, value: Optional[str]) -> None:
+        await self._run(lambda connection: connection.execute(
+            'INSERT INTO changes (origin, namespace, key, value, created) VALUES (?, ?, ?, ?, ?)',
+            (self._origin, namespace, key, value, time.time())))
+        self.published += 1
+
+    async def changes(self) -> List[Tuple[str, str, Optional[str]]]:
+        def select(connection: sqlite3.Connection) -> List[Tuple[str, str, Optional[str]]]:
+            now: float = time.time()
+            if now - self._last_purge > self.PURGE_INTERVAL:
+                connection.execute('DELETE FROM entries WHERE expires_at <= ?', (now, ))
+                connection.execute('DELETE FROM changes WHERE created < ?', (now - self.CHANGE_RETENTION, ))
+                self._last_purge = now
+            rows: List[Tuple[int, str, str, str, Optional[str]]] = connection.execute(
+                'SELECT seq, origin, namespace, key, value FROM changes WHERE seq > ? ORDER BY seq',
+                (self._cursor, )).fetchall()
+            if rows:
+                self._cursor = rows[-1][0]
+            return [(namespace, key, value) for _, origin, namespace, key, value in rows if origin != self._origin]
+
+        changes: List[Tuple[str, str, Optional[str]]] = await self._run(select)
+        self.received += len(changes)
+        return changes
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __str__(self) -> str:
+        return f'Shared cache: {self.path} - Published: {self.published} - Received: {self.received}'
@@ -0,0 +1,148 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Hashable, Optional, Tuple
+import sys
+import time
+
+
+class CachedModel:
+    def __init__(self, model: Any, size: int, expires_at: float) -> None:
+        self.model: Any = model
+        self.size: int = size
+        self.expires_at: float = expires_at
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+
+class UserCache:
+    USER_DATA: str = 'USER_DATA'
+    SUMMARY: str = 'SUMMARY'
+    ASSIGNMENTS: str = 'ASSIGNMENTS'
+    LEVELING: str = 'LEVELING'
+    KINDS: Tuple[str, ...] = (USER_DATA, SUMMARY, ASSIGNMENTS, LEVELING)
+    hits: int = 0
+    misses: int = 0
+    expirations: int = 0
+    evictions: int = 0
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, min_ttl: float = 60, max_ttl: float = 3600) -> None:
+        """
+        Initializes the cache of parsed WaniKani models and synchronised states per user, bounded by their
+        estimated total size.
+        :param max_bytes: The memory budget of all cached models together.
+        :param min_ttl: The least amount of seconds a model stays fresh.
+        :param max_ttl: The most amount of seconds a model stays fresh.
+        """
+        self.max_bytes: int = max_bytes
+        self.min_ttl: float = min_ttl
+        self.max_ttl: float = max_ttl
+        self.total_bytes: int = 0
+        self._entries: 'OrderedDict[Tuple[int, str], CachedModel]' = OrderedDict()
+
+    @staticmethod
+    def estimate_size(model: Any) -> int:
+        """
+        Estimates the memory a slotted model takes, including the values it holds but not what those refer to.
+        Models that hold collections estimate their own size.
+        :param model: The model.
+        :return: The estimated size in bytes.
+        """
+        if hasattr(model, 'estimate_size'):
+            return model.estimate_size()
+        return sys.getsizeof(model) + sum(sys.getsizeof(getattr(model, slot, None))
+                                          for slot in getattr(model, '__slots__', ()))
+
+    def expiry_for(self, kind: str, last_update: datetime) -> float:
+        """
+        Determines when a model goes stale, based on when WaniKani last updated its data.
+        Data that changed recently is likely to change again soon, data that did not change for a while is not.
+        A Summary never stays fresh past the next hour boundary, which is when new reviews become available.
+        Synchronised states are brought up to date on every use, so they only leave the cache when evicted.
+        :param kind: One of UserCache.KINDS.
+        :param last_update: The data_updated_at of the model, or None if unknown.
+        :return: The UNIX timestamp after which the model needs to be fetched again.
+        """
+        if kind in (self.ASSIGNMENTS, self.LEVELING):
+            return float('inf')
+        now: float = time.time()
+        age: float = now - last_update.timestamp() if last_update else 0
+        expires_at: float = now + min(self.max_ttl, max(self.min_ttl, age / 4))
+        if kind == self.SUMMARY:
+            expires_at = min(expires_at, now - now % 3600 + 3600)
+        return expires_at
+
+    def get(self, user_id: int, kind: str) -> Optional[Any]:
+        """
+        Gets a fresh model and marks it as recently used. Stale models are removed.
+        :param user_id: The Discord.User.id of the WaniKani user.
+        :param kind: One of UserCache.KINDS.
+        :return: The model, or None if no fresh model is cached.
+        """
+        key: Tuple[int, str] = (user_id, kind)
+        entry: CachedModel = self._entries.get(key)
+        if entry is not None and not entry.is_fresh():
+            self._remove(key=key)
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.model
+
+    def put(self, user_id: int, kind: str, model: Any) -> None:
+        """
+        Stores a model and evicts the least recently used models until the cache fits its memory budget again.
+        :param user_id: The Discord.User.id of the WaniKani user.
+        :param kind: One of UserCache.KINDS.
+        :param model: The model, which should have a last_update datetime.
+        """
+        key: Tuple[int, str] = (user_id, kind)
+        self._remove(key=key)
+        entry: CachedModel = CachedModel(model=model, size=self.estimate_size(model=model),
+                                         expires_at=self.expiry_for(kind=kind,
+                                                                    last_update=getattr(model, 'last_update', None)))
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self.total_bytes += entry.size
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+            self.evictions += 1
+
+    def refresh(self, user_id: int, kind: str, model: Any) -> bool:
+        """
+        Replaces a model that is cached, but caches nothing new, so that a background sync of every user does not
+        evict the models of the users that are active.
+        :param user_id: The Discord.User.id of the WaniKani user.
+        :param kind: One of UserCache.KINDS.
+        :param model: The newer model.
+        :return: Whether a model was replaced.
+        """
+        if (user_id, kind) not in self._entries:
+            return False
+        self.put(user_id=user_id, kind=kind, model=model)
+        return True
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Removes every model of a user, for example when they deregister.
+        :param user_id: The Discord.User.id of the WaniKani user.
+        """
+        for kind in self.KINDS:
+            self._remove(key=(user_id, kind))
+
+    def _remove(self, key: Hashable) -> None:
+        entry: CachedModel = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __str__(self) -> str:
+        return f'Users cached: {len(self)} ({self.total_bytes} bytes) - Hits: {self.hits} - Misses: {self.misses}' \
+            f' - Expirations: {self.expirations} - Evictions: {self.evictions}'
@@ -0,0 +1,80 @@
+from typing import Any, Collection, Dict, Optional
+
+
+class UserRegistry:
+    loaded: bool = False
+    hits: int = 0
+    misses: int = 0
+
+    def __init__(self) -> None:
+        """
+        Initializes the in-memory map of registered Discord User IDs to their WaniKani API token.
+        """
+        self._tokens: Dict[int, str] = {}
+
+    def load(self, tokens: Dict[int, str]) -> None:
+        """
+        Replaces the registry with a complete set of registered users loaded from the database.
+        :param tokens: Dictionary mapping every registered Discord User ID to their WaniKani API token.
+        """
+        self._tokens = dict(tokens)
+        self.loaded = True
+
+    def get_token(self, user_id: int) -> Optional[str]:
+        """
+        Gets the WaniKani API token of a registered user without touching the database.
+        :param user_id: The Discord User ID.
+        :return: The WaniKani API token, or None if the user is not registered.
+        """
+        token: str = self._tokens.get(user_id)
+        if token is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return token
+
+    def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Gets a registered user in the same shape as DataStorage.find_api_user returns it.
+        :param user_id: The Discord User ID.
+        :return: Dictionary containing the ID and API key, or None if the user is not registered.
+        """
+        token: str = self.get_token(user_id=user_id)
+        if token is None:
+            return None
+        return {'_id': user_id, 'API_KEY': token}
+
+    def register(self, user_id: int, token: str) -> None:
+        """
+        Adds or replaces a registered user. Should be called after the database write succeeded.
+        :param user_id: The Discord User ID.
+        :param token: The WaniKani API token.
+        """
+        self._tokens[user_id] = token
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Forgets a registered user. Should be called after the database delete succeeded.
+        :param user_id: The Discord User ID.
+        """
+        self._tokens.pop(user_id, None)
+
+    def any_token(self, exclude: Collection[str] = ()) -> Optional[str]:
+        """
+        Gets the WaniKani API token of any registered user, for requests that are the same for every user.
+        :param exclude: Tokens that should not be used, for example because they were revoked.
+        :return: A WaniKani API token, or None if there is no usable one.
+        """
+        for token in self._tokens.values():
+            if token not in exclude:
+                return token
+        return None
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._tokens
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def __str__(self) -> str:
+        return f'Registered users: {len(self)} - Hits: {self.hits} - Misses: {self.misses}'
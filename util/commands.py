@@ -0,0 +1,73 @@
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+
+class Command:
+    def __init__(self, name: str, handler: Callable[..., Awaitable[Any]], aliases: List[str] = None,
+                 help_entries: List[Tuple[str, str]] = None, help_inline: bool = False, dm_only: bool = False,
+                 guild_only: bool = False, admin_only: bool = False, owner_only: bool = False,
+                 requires_user: bool = False) -> None:
+        """
+        Initializes a Crabigator command.
+        :param name: The name of the command, as shown in the help menu.
+        :param handler: Co-routine function handling the command. Gets called with the message, words and prefix,
+                        plus the user_id if the command requires a registered user.
+        :param aliases: Other names that invoke the command.
+        :param help_entries: Pairs of argument usage and description to show in the help menu. None to hide it.
+        :param help_inline: Whether the help menu entries should be shown inline.
+        :param dm_only: Whether the command may only be used in direct messages.
+        :param guild_only: Whether the command may only be used in servers.
+        :param admin_only: Whether the command may only be used by server administrators.
+        :param owner_only: Whether the command may only be used by the owner of the Crabigator.
+        :param requires_user: Whether the command targets a registered WaniKani user, either the author or a tag.
+        """
+        self.name: str = name
+        self.handler: Callable[..., Awaitable[Any]] = handler
+        self.aliases: List[str] = aliases or []
+        self.help_entries: List[Tuple[str, str]] = help_entries or []
+        self.help_inline: bool = help_inline
+        self.dm_only: bool = dm_only
+        self.guild_only: bool = guild_only
+        self.admin_only: bool = admin_only
+        self.owner_only: bool = owner_only
+        self.requires_user: bool = requires_user
+        self.invocations: int = 0
+        self.errors: int = 0
+
+    def __str__(self) -> str:
+        return f'Command: {self.name} - Invocations: {self.invocations} - Errors: {self.errors}'
+
+
+class CommandRegistry:
+    def __init__(self) -> None:
+        """
+        Initializes an empty registry that maps command names and aliases to their Command.
+        """
+        self.commands: List[Command] = []
+        self._lookup: Dict[str, Command] = {}
+
+    def register(self, command: Command) -> None:
+        """
+        Adds a command under its name and all of its aliases.
+        :param command: The Command.
+        """
+        for name in [command.name] + command.aliases:
+            if name in self._lookup:
+                raise ValueError(f'Command name {name} is already registered to {self._lookup[name].name}.')
+            self._lookup[name] = command
+        self.commands.append(command)
+
+    def find(self, name: str) -> Command:
+        """
+        :param name: The name or alias that was used, in lowercase.
+        :return: The Command, or None if no command goes by that name.
+        """
+        return self._lookup.get(name)
+
+    def total_invocations(self) -> int:
+        """
+        :return: How many times any command was invoked.
+        """
+        return sum(command.invocations for command in self.commands)
+
+    def __len__(self) -> int:
+        return len(self.commands)
@@ -1,62 +1,318 @@
-from pymongo import MongoClient
-from typing import Dict, Any
+from ..cache.prefixcache import PrefixCache
+from ..cache.shared import SharedCache, SQLiteSharedCache
+from ..metrics import MONGO_DURATION, elapsed_since
+from ..cache.userregistry import UserRegistry
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import MongoClient, ReplaceOne, UpdateOne
+from typing import Any, AsyncIterator, Callable, Dict, List, Tuple
+import asyncio
+import functools
+import itertools
 import json
+import time
 
 
 class DataStorage:
     client: MongoClient = None
     db = None
+    prefix_cache: PrefixCache = None
+    user_registry: UserRegistry = None
+    shared_cache: SharedCache = None
+    _executor: ThreadPoolExecutor = None
 
     def __init__(self):
+        self.prefix_cache = PrefixCache()
+        self.user_registry = UserRegistry()
         with open('resources/settings.json') as json_data_file:
             data: Dict[str, Any] = json.load(json_data_file)
+            # Processes of a sharded bot keep each other's prefixes, users and responses up to date through this.
+            shared_cache_path: str = data.get('SHARED_CACHE_PATH')
+            self.shared_cache = SQLiteSharedCache(path=shared_cache_path) if shared_cache_path else SharedCache()
             if data["MONGO_DB_URI"]:
-                self.client = MongoClient(data["MONGO_DB_URI"])
+                max_pool_size: int = data.get('MONGO_MAX_POOL_SIZE', 10)
+                self.client = MongoClient(data["MONGO_DB_URI"], maxPoolSize=max_pool_size)
                 self.db = self.client['wanikani-bot']
+                # Never run more blocking calls than there are pooled connections to serve them.
+                self._executor = ThreadPoolExecutor(max_workers=data.get('MONGO_EXECUTOR_WORKERS', max_pool_size),
+                                                    thread_name_prefix='datastorage')
             else:
                 print("Settings.json is corrupt. Please redownload the original file to fix this.")
 
-    def register_api_user(self, user_id: int, api_key: str) -> None:
+    async def _run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Runs a blocking pymongo call on the bounded executor so that it does not block the event loop.
+        :param func: The pymongo function that needs to be called.
+        :return: Whatever the pymongo function returned.
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        collection: Any = getattr(func, '__self__', None)
+        operation: str = f'{collection.name}.{func.__name__}' if collection is not None else func.__name__
+        start: float = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        finally:
+            MONGO_DURATION.observe(operation, value=elapsed_since(start=start))
+
+    def close(self) -> None:
+        """
+        Shuts down the executor, closes the MongoClient connection pool and the shared cache.
+        """
+        self.shared_cache.close()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+        if self.client:
+            self.client.close()
+
+    async def register_api_user(self, user_id: int, api_key: str) -> None:
         """
         Inserts a new WaniKani user with their API key into the database.
         :param user_id: The Discord Member ID.
         :param api_key: The API key to access WaniKani's API.
         """
         users = self.db['wanikani-users']
-        users.update_one({"_id": user_id}, {"$set": {"API_KEY": api_key}}, True)
+        await self._run(users.update_one, {"_id": user_id},
+                        {"$set": {"API_KEY": api_key}, "$unset": {"INVALID_TOKEN": ""}}, True)
+        self.user_registry.register(user_id=user_id, token=api_key)
+        # Only tell the other processes to read the user again, so that tokens never end up in the shared cache.
+        await self.shared_cache.publish(namespace='user', key=str(user_id), value=None)
 
-    def find_api_user(self, user_id: int) -> Dict[str, Any]:
+    async def find_api_user(self, user_id: int) -> Dict[str, Any]:
         """
         Gets a WaniKani user based on ID.
         :param user_id: The Discord Member ID.
-        :return: The first found WaniKani user object.
+        :return: The first found WaniKani user object, only containing the API key.
+        """
+        if self.user_registry.loaded:
+            return self.user_registry.get_user(user_id=user_id)
+
+        users = self.db['wanikani-users']
+        return await self._run(users.find_one, {"_id": user_id}, {"API_KEY": 1})
+
+    async def reload_api_user(self, user_id: int) -> None:
+        """
+        Reads a WaniKani user from the database into the user registry again, after another process changed it.
+        :param user_id: The Discord Member ID.
         """
         users = self.db['wanikani-users']
-        return users.find_one({"_id": user_id})
+        user: Dict[str, Any] = await self._run(users.find_one, {"_id": user_id}, {"API_KEY": 1})
+        if user is None:
+            self.user_registry.invalidate(user_id=user_id)
+        else:
+            self.user_registry.register(user_id=user_id, token=user['API_KEY'])
 
-    def remove_api_user(self, user_id: int) -> int:
+    async def remove_api_user(self, user_id: int) -> int:
         """
         Deletes a WaniKani user based on ID.
         :param user_id: The Discord Member ID.
         :return: The amount of deleted objects.
         """
         users = self.db['wanikani-users']
-        return users.delete_one({"_id": user_id}).deleted_count
+        deleted_count: int = (await self._run(users.delete_one, {"_id": user_id})).deleted_count
+        await self.remove_assignment_state(user_id=user_id)
+        await self.remove_level_progressions(user_id=user_id)
+        self.user_registry.invalidate(user_id=user_id)
+        await self.shared_cache.publish(namespace='user', key=str(user_id), value=None)
+        return deleted_count
 
-    def insert_guild_prefix(self, guild_id: int, prefix: str) -> None:
+    async def insert_guild_prefix(self, guild_id: int, prefix: str) -> None:
         """
         Inserts a new Discord Guild with their prefix into the database.
         :param guild_id: The Discord Guild ID.
         :param prefix: The custom prefix.
         """
         prefixes = self.db['guild-prefixes']
-        prefixes.update_one({"_id": guild_id}, {"$set": {"prefix": prefix}}, True)
+        await self._run(prefixes.update_one, {"_id": guild_id}, {"$set": {"prefix": prefix}}, True)
+        # Write-through so that the next message in this Guild already uses the new prefix.
+        self.prefix_cache.set(guild_id=guild_id, prefix=prefix)
+        await self.shared_cache.publish(namespace='prefix', key=str(guild_id), value=prefix)
 
-    def find_guild_prefix(self, guild_id: int) -> Dict[str, Any]:
+    async def find_guild_prefix(self, guild_id: int) -> Dict[str, Any]:
         """
         Gets a custom prefix for a Discord Guild based on ID.
         :param guild_id: The Discord Guild ID.
         :return: The first found prefix.
         """
         prefixes = self.db['guild-prefixes']
-        return prefixes.find_one({"_id": guild_id})
+        return await self._run(prefixes.find_one, {"_id": guild_id}, {"prefix": 1})
+
+    async def load_guild_prefixes(self) -> None:
+        """
+        Loads every custom Discord Guild prefix from the database into the prefix cache.
+        """
+        prefixes = self.db['guild-prefixes']
+
+        def find_all_prefixes() -> Dict[int, str]:
+            return {p['_id']: p['prefix'] for p in prefixes.find({}, {"prefix": 1})}
+
+        self.prefix_cache.load(prefixes=await self._run(find_all_prefixes))
+
+    async def load_api_users(self) -> None:
+        """
+        Loads every registered WaniKani user and their API key from the database into the user registry.
+        """
+        users = self.db['wanikani-users']
+
+        def find_all_users() -> Dict[int, str]:
+            return {u['_id']: u['API_KEY'] for u in users.find({}, {"API_KEY": 1})}
+
+        self.user_registry.load(tokens=await self._run(find_all_users))
+
+    async def count_api_users(self) -> int:
+        """
+        :return: The amount of registered WaniKani users whose API key is not flagged as invalid.
+        """
+        users = self.db['wanikani-users']
+        return await self._run(users.count_documents, {"INVALID_TOKEN": {"$ne": True}})
+
+    async def iterate_api_users(self, batch_size: int = 100) -> AsyncIterator[Tuple[int, str]]:
+        """
+        Streams every registered WaniKani user whose API key is not flagged as invalid from the database,
+        so that only a single batch of users is held in memory at once.
+        :param batch_size: The amount of users that is fetched from the cursor at once.
+        :return: An asynchronous iterator over the Discord Member ID and API key of every user.
+        """
+        users = self.db['wanikani-users']
+        cursor = users.find({"INVALID_TOKEN": {"$ne": True}}, {"API_KEY": 1}, batch_size=batch_size)
+
+        def next_batch() -> List[Tuple[int, str]]:
+            return [(u['_id'], u['API_KEY']) for u in itertools.islice(cursor, batch_size)]
+
+        try:
+            while True:
+                batch: List[Tuple[int, str]] = await self._run(next_batch)
+                if not batch:
+                    break
+                for user in batch:
+                    yield user
+        finally:
+            cursor.close()
+
+    async def bulk_update_api_users(self, updates: Dict[int, Dict[str, Any]]) -> None:
+        """
+        Sets fields of many WaniKani users in a single round trip.
+        :param updates: Dictionary mapping Discord Member IDs to the fields that should be set.
+        """
+        if not updates:
+            return
+        users = self.db['wanikani-users']
+        requests: List[UpdateOne] = [UpdateOne({"_id": user_id}, {"$set": fields})
+                                     for user_id, fields in updates.items()]
+        await self._run(users.bulk_write, requests, ordered=False)
+
+    async def find_assignment_state(self, user_id: int) -> Dict[str, Any]:
+        """
+        Gets the synchronised assignments of a WaniKani user.
+        :param user_id: The Discord Member ID.
+        :return: The stored assignment state, or None if the user was never synced.
+        """
+        assignments = self.db['wanikani-assignments']
+        return await self._run(assignments.find_one, {"_id": user_id})
+
+    async def update_assignment_state(self, user_id: int, last_sync: str, changed: Dict[str, List[Any]],
+                                      counts: Dict[str, int]) -> None:
+        """
+        Stores an assignments delta of a WaniKani user, only writing the assignments that changed.
+        :param user_id: The Discord Member ID.
+        :param last_sync: The data_updated_at of the applied delta.
+        :param changed: The changed assignment records, keyed by assignment ID.
+        :param counts: The updated counters for every subject type and the burned items.
+        """
+        assignments = self.db['wanikani-assignments']
+        await self._run(assignments.update_one, {"_id": user_id},
+                        self._assignment_update(last_sync=last_sync, changed=changed, counts=counts), True)
+
+    async def bulk_update_assignment_states(self, deltas: List[Tuple[int, str, Dict[str, List[Any]],
+                                                                     Dict[str, int]]]) -> None:
+        """
+        Stores the assignments deltas of many WaniKani users in a single round trip.
+        :param deltas: List of (user_id, last_sync, changed, counts) tuples, like update_assignment_state takes.
+        """
+        if not deltas:
+            return
+        assignments = self.db['wanikani-assignments']
+        requests: List[UpdateOne] = [UpdateOne({"_id": user_id}, self._assignment_update(last_sync=last_sync,
+                                                                                         changed=changed,
+                                                                                         counts=counts),
+                                               upsert=True)
+                                     for user_id, last_sync, changed, counts in deltas]
+        await self._run(assignments.bulk_write, requests, ordered=False)
+
+    @staticmethod
+    def _assignment_update(last_sync: str, changed: Dict[str, List[Any]], counts: Dict[str, int]) -> Dict[str, Any]:
+        update: Dict[str, Any] = {f'assignments.{key}': record for key, record in changed.items()}
+        update.update({"last_sync": last_sync, "counts": counts})
+        return {"$set": update}
+
+    async def remove_assignment_state(self, user_id: int) -> None:
+        """
+        Deletes the synchronised assignments of a WaniKani user.
+        :param user_id: The Discord Member ID.
+        """
+        assignments = self.db['wanikani-assignments']
+        await self._run(assignments.delete_one, {"_id": user_id})
+
+    async def find_level_progressions(self, user_id: int) -> Dict[str, Any]:
+        """
+        Gets the synchronised level progressions of a WaniKani user.
+        :param user_id: The Discord Member ID.
+        :return: The stored level progressions, or None if the user was never synced.
+        """
+        progressions = self.db['wanikani-level-progressions']
+        return await self._run(progressions.find_one, {"_id": user_id})
+
+    async def update_level_progressions(self, user_id: int, last_sync: str,
+                                        changed: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Stores a level progressions delta of a WaniKani user, only writing the level progressions that changed.
+        :param user_id: The Discord Member ID.
+        :param last_sync: The data_updated_at of the applied delta.
+        :param changed: The stored fields of the changed level progressions, keyed by level progression ID.
+        """
+        progressions = self.db['wanikani-level-progressions']
+        update: Dict[str, Any] = {f'progressions.{key}': document for key, document in changed.items()}
+        update["last_sync"] = last_sync
+        await self._run(progressions.update_one, {"_id": user_id}, {"$set": update}, True)
+
+    async def remove_level_progressions(self, user_id: int) -> None:
+        """
+        Deletes the synchronised level progressions of a WaniKani user.
+        :param user_id: The Discord Member ID.
+        """
+        progressions = self.db['wanikani-level-progressions']
+        await self._run(progressions.delete_one, {"_id": user_id})
+
+    async def load_subjects(self, updated_after: str = None) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Loads the WaniKani subject catalog from the database.
+        :param updated_after: Optionally only load the subjects updated after this data_updated_at.
+        :return: The data_updated_at of the last complete sync, or None if never synced, and the stored subjects.
+        """
+        subjects = self.db['wanikani-subjects']
+        sync_state = self.db['sync-state']
+        query: Dict[str, Any] = {"last_update": {"$gt": updated_after}} if updated_after else {}
+
+        def find_all_subjects() -> Tuple[str, List[Dict[str, Any]]]:
+            state: Dict[str, Any] = sync_state.find_one({"_id": "subjects"})
+            return (state or {}).get('last_sync'), list(subjects.find(query))
+
+        return await self._run(find_all_subjects)
+
+    async def bulk_upsert_subjects(self, documents: List[Dict[str, Any]]) -> None:
+        """
+        Inserts or replaces many WaniKani subjects in a single round trip.
+        :param documents: The subjects to store, with their subject ID as _id.
+        """
+        if not documents:
+            return
+        subjects = self.db['wanikani-subjects']
+        requests: List[ReplaceOne] = [ReplaceOne({"_id": document['_id']}, document, upsert=True)
+                                      for document in documents]
+        await self._run(subjects.bulk_write, requests, ordered=False)
+
+    async def update_subjects_sync(self, last_sync: str) -> None:
+        """
+        Stores up to when the WaniKani subject catalog is complete.
+        :param last_sync: The data_updated_at of the last complete sync.
+        """
+        sync_state = self.db['sync-state']
+        await self._run(sync_state.update_one, {"_id": "subjects"}, {"$set": {"last_sync": last_sync}}, True)
\ No newline at end of file
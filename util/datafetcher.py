@@ -1,119 +1,609 @@
 from .models.wanikani.User import User
 from .models.wanikani.Summary import Summary
+from .cache.responsecache import CachedResponse, ResponseCache
+from .cache.usercache import UserCache
 from .database.datastorage import DataStorage
-from typing import Any, Dict, List
+from .metrics import WANIKANI_DURATION, WANIKANI_REQUESTS, elapsed_since, log_event
+from .ratelimit import RateLimiter
+from .singleflight import SingleFlight
+from .sync.assignments import AssignmentState
+from .sync.levels import LevelingState
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from urllib.parse import SplitResult, parse_qsl, urlsplit
+import aiohttp
+import asyncio
+import hashlib
 import json
-import requests
+import logging
+import random
+import time
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class WaniKaniRequestError(Exception):
+    pass
 
 
 class DataFetcher:
-    wanikani_users = {}
+    user_cache: UserCache = None
     _dataStorage = None
+    response_cache: ResponseCache = None
+    inflight: SingleFlight = None
+    rate_limiter: RateLimiter = None
+    unauthorized_tokens: Set[str] = None
+    _session: aiohttp.ClientSession = None
+    _pool_limit: int = 100
+    _pool_limit_per_host: int = 20
+    _keepalive_timeout: float = 30
+    _timeout: float = 10
+    _max_retries: int = 3
+    _base_backoff: float = 1
+    _max_backoff: float = 30
+
+    def __init__(self, data_storage: DataStorage, processes: int = 1):
+        """
+        :param data_storage: The DataStorage of the client.
+        :param processes: The amount of processes of the bot on this host, which share the rate limit of every
+                          API token.
+        """
+        self._dataStorage = data_storage
+        self.inflight = SingleFlight()
+        self.unauthorized_tokens = set()
+        with open('resources/settings.json') as json_data_file:
+            data: Dict[str, Any] = json.load(json_data_file)
+            self._pool_limit = data.get('WANIKANI_POOL_LIMIT', self._pool_limit)
+            self._pool_limit_per_host = data.get('WANIKANI_POOL_LIMIT_PER_HOST', self._pool_limit_per_host)
+            self._keepalive_timeout = data.get('WANIKANI_KEEPALIVE_TIMEOUT', self._keepalive_timeout)
+            self._timeout = data.get('WANIKANI_TIMEOUT', self._timeout)
+            self._max_retries = data.get('WANIKANI_MAX_RETRIES', self._max_retries)
+            self.rate_limiter = RateLimiter(requests_per_minute=data.get('WANIKANI_REQUESTS_PER_MINUTE', 60),
+                                            processes=processes)
+            self.response_cache = ResponseCache(max_entries=data.get('RESPONSE_CACHE_MAX_ENTRIES', 1000),
+                                                max_bytes=data.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+            self.user_cache = UserCache(max_bytes=data.get('USER_CACHE_MAX_BYTES', 32 * 1024 * 1024))
 
-    def __init__(self):
-        self._dataStorage = DataStorage()
+    async def get_session(self) -> aiohttp.ClientSession:
+        """
+        Get the shared HTTP session, creating it on first use so that it binds to the running event loop.
+        All WaniKani requests go through this session to reuse its keep-alive connection pool.
+        :return: The shared aiohttp.ClientSession.
+        """
+        if self._session is None or self._session.closed:
+            connector: aiohttp.TCPConnector = aiohttp.TCPConnector(limit=self._pool_limit,
+                                                                   limit_per_host=self._pool_limit_per_host,
+                                                                   keepalive_timeout=self._keepalive_timeout)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self._timeout))
+        return self._session
 
-    async def get_wanikani_data(self, user_id: int, resource: str, after_date: str = None, after_id: str = None):
+    async def close(self) -> None:
+        """
+        Closes the shared HTTP session and its connection pool.
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def get_wanikani_data(self, user_id: int, resource: str, after_date: str = None, after_id: str = None,
+                                updated_after: str = None):
         """
         Fetch a user's WaniKani data via the API from a resource.
         :param user_id: The Discord.User.id that was used to as the dictionary key.
         :param resource: The WaniKani API resource that needs to be called.
         :param after_date: Optional argument for specifying since when you want to check the data.
+        :param updated_after: Optional argument like after_date, but taking a full ISO 8601 timestamp.
         :param after_id: Optional argument for specifying after which ID you want to fetch all the data.
+        :return: The JSON content of the response, otherwise None if the request fails.
+                 Responses may be shared with the response cache, so they should not be modified.
+        """
+        api_token: str = await self.get_api_token(user_id=user_id)
+
+        # Adds query parameters to the URL.
+        params: Dict[str, str] = {}
+        if after_date:
+            params['updated_after'] = f'{after_date}T00:00:00.000000Z'
+        if updated_after:
+            params['updated_after'] = updated_after
+        if after_id:
+            params['page_after_id'] = after_id
+
+        return await self.request_wanikani_data(api_token=api_token, resource=resource, params=params)
+
+    async def get_api_token(self, user_id: int) -> str:
+        """
+        Get the WaniKani API token of a registered user.
+        :param user_id: The Discord.User.id that was used to as the dictionary key.
+        :return: The WaniKani API token.
+        """
+        api_token: str = self._dataStorage.user_registry.get_token(user_id=user_id)
+        if api_token is None:
+            api_token = (await self._dataStorage.find_api_user(user_id=user_id))['API_KEY']
+        return api_token
+
+    async def forget_user(self, user_id: int) -> None:
+        """
+        Drops everything that is cached for a user, should be called before the user is removed from the database.
+        :param user_id: The Discord.User.id that was used to as the dictionary key.
+        """
+        user: Dict[str, Any] = await self._dataStorage.find_api_user(user_id=user_id)
+        if user is not None:
+            await self._dataStorage.shared_cache.delete_group(namespace='response',
+                                                              group=self.token_group(api_token=user['API_KEY']))
+        self.forget_local_user(user_id=user_id, api_token=user['API_KEY'] if user else None)
+
+    def forget_local_user(self, user_id: int, api_token: str = None) -> None:
+        """
+        Drops what this process caches for a user, without telling the other processes.
+        :param user_id: The Discord.User.id that was used to as the dictionary key.
+        :param api_token: The WaniKani API token of the user, if known.
+        """
+        if api_token is not None:
+            self.response_cache.invalidate_token(api_token=api_token)
+        self.user_cache.invalidate(user_id=user_id)
+
+    async def sync_shared_caches(self) -> int:
+        """
+        Applies the prefixes and users that other processes of a sharded bot changed to the caches of this process.
+        :return: The amount of applied changes.
+        """
+        changes: List[Tuple[str, str, str]] = await self._dataStorage.shared_cache.changes()
+        for namespace, key, value in changes:
+            if namespace == 'prefix':
+                self._dataStorage.prefix_cache.set(guild_id=int(key), prefix=value)
+            elif namespace == 'user':
+                user_id: int = int(key)
+                # The old token is only known until the registry reads the user again.
+                self.forget_local_user(user_id=user_id, api_token=self._dataStorage.user_registry.get_token(user_id))
+                await self._dataStorage.reload_api_user(user_id=user_id)
+        return len(changes)
+
+    @staticmethod
+    def token_group(api_token: str) -> str:
+        """
+        :param api_token: The WaniKani API token.
+        :return: The group of the responses of a token in the shared cache, which does not reveal the token.
+        """
+        return hashlib.sha256(api_token.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def shared_key(cache_key: Tuple[str, str, Tuple]) -> str:
+        """
+        :param cache_key: The key created by ResponseCache.make_key.
+        :return: The key of the response in the shared cache, which does not reveal the token.
+        """
+        return hashlib.sha256(repr(cache_key).encode('utf-8')).hexdigest()
+
+    async def _load_shared_response(self, resource: str, cache_key: Any) -> Optional[Dict[str, Any]]:
+        """
+        Gets a fresh response that another process already received and stores it in the response cache.
+        :param resource: The WaniKani API resource.
+        :param cache_key: The key of the request in the response cache.
+        :return: The JSON content of the response, or None if no process received a fresh one.
+        """
+        value: str = await self._dataStorage.shared_cache.get(namespace='response', key=self.shared_key(cache_key))
+        if value is None:
+            return None
+        header, content = value.split('\n', 1)
+        meta: Dict[str, Any] = json.loads(header)
+        body: Dict[str, Any] = json.loads(content)
+        self.response_cache.put(key=cache_key, resource=resource, body=body, size=len(content),
+                                etag=meta['etag'], last_modified=meta['last_modified'], expires_at=meta['expires_at'])
+        return body
+
+    async def _store_shared_response(self, api_token: str, cache_key: Any, content: str, etag: str,
+                                     last_modified: str, expires_at: float) -> None:
+        """
+        Shares a response with the other processes, so that they do not need to request it again.
+        :param api_token: The WaniKani API token the response was requested with.
+        :param cache_key: The key of the request in the response cache.
+        :param content: The raw JSON body.
+        :param etag: The ETag header of the response.
+        :param last_modified: The Last-Modified header of the response.
+        :param expires_at: When the response goes stale.
+        """
+        # The headers go on the first line, so that the body does not need to be encoded again.
+        header: str = json.dumps({'etag': etag, 'last_modified': last_modified, 'expires_at': expires_at})
+        await self._dataStorage.shared_cache.set(namespace='response', key=self.shared_key(cache_key),
+                                                 value=f'{header}\n{content}', expires_at=expires_at,
+                                                 group=self.token_group(api_token=api_token))
+
+    async def iterate_wanikani_pages(self, api_token: str, resource: str, params: Dict[str, str] = None,
+                                     cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over every page of a WaniKani collection resource by following pages.next_url.
+        The next page is already requested while the caller is still processing the current one,
+        so at most two pages are held in memory at once.
+        :param api_token: The WaniKani API token.
+        :param resource: The WaniKani API collection resource, for example 'assignments'.
+        :param params: The query parameters of the first request.
+        :param cache: Whether the pages should be stored in the response cache.
+        :return: An asynchronous iterator over the JSON content of every page.
+        :raise WaniKaniRequestError: When one of the pages could not be fetched.
+        """
+        page: Dict[str, Any] = await self.request_wanikani_data(api_token=api_token, resource=resource, params=params,
+                                                                cache=cache)
+        next_page: asyncio.Future = None
+        try:
+            while True:
+                if page is None:
+                    raise WaniKaniRequestError(f'Could not fetch a page of the WaniKani {resource} collection.')
+
+                next_url: str = page['pages']['next_url']
+                if next_url:
+                    next_resource, next_params = self.split_wanikani_url(url=next_url)
+                    next_page = asyncio.ensure_future(self.request_wanikani_data(api_token=api_token,
+                                                                                 resource=next_resource,
+                                                                                 params=next_params,
+                                                                                 cache=cache))
+                yield page
+
+                if not next_page:
+                    break
+                page = await next_page
+                next_page = None
+        finally:
+            # The caller stopped iterating early, so the read-ahead is no longer needed.
+            if next_page is not None and not next_page.done():
+                next_page.cancel()
+
+    async def iterate_wanikani_collection(self, api_token: str, resource: str,
+                                          params: Dict[str, str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over every record of a WaniKani collection resource, across all of its pages.
+        :param api_token: The WaniKani API token.
+        :param resource: The WaniKani API collection resource, for example 'assignments'.
+        :param params: The query parameters of the first request.
+        :return: An asynchronous iterator over every record in the collection.
+        :raise WaniKaniRequestError: When one of the pages could not be fetched.
+        """
+        async for page in self.iterate_wanikani_pages(api_token=api_token, resource=resource, params=params):
+            for record in page['data']:
+                yield record
+
+    @staticmethod
+    def split_wanikani_url(url: str) -> Tuple[str, Dict[str, str]]:
+        """
+        Splits a full WaniKani API URL, like pages.next_url, into its resource and query parameters.
+        :param url: The full WaniKani API URL.
+        :return: The resource and a dictionary of query parameters.
+        """
+        parts: SplitResult = urlsplit(url)
+        resource: str = parts.path.split('/v2/', 1)[-1]
+        return resource, dict(parse_qsl(parts.query))
+
+    async def request_wanikani_data(self, api_token: str, resource: str, params: Dict[str, str] = None,
+                                    cache: bool = True):
+        """
+        Fetch WaniKani data via the API from a resource using an API token.
+        Concurrent requests for the same token, resource and query share a single request to WaniKani.
+        :param api_token: The WaniKani API token.
+        :param resource: The WaniKani API resource that needs to be called.
+        :param params: The query parameters of the request.
+        :param cache: Whether the response should be stored in the response cache.
+        :return: The JSON content of the response, otherwise None if the request fails.
+                 Responses may be shared with the response cache, so they should not be modified.
+        """
+        params = params or {}
+        # Serve fresh responses from the cache, otherwise ask WaniKani whether the stale one is still valid.
+        cache_key = ResponseCache.make_key(api_token=api_token, resource=resource, params=params)
+        cached: CachedResponse = self.response_cache.get(key=cache_key)
+        if cached is not None and cached.is_fresh():
+            return cached.body
+
+        return await self.inflight.do(key=cache_key,
+                                       func=lambda: self._fetch_wanikani_data(api_token=api_token, resource=resource,
+                                                                              params=params, cache_key=cache_key,
+                                                                              cached=cached, cache=cache))
+
+    async def _fetch_wanikani_data(self, api_token: str, resource: str, params: Dict[str, str],
+                                   cache_key: Any, cached: CachedResponse, cache: bool = True):
+        """
+        Performs the actual request to the WaniKani API and stores the response in the response cache.
+        :param api_token: The WaniKani API token.
+        :param resource: The WaniKani API resource that needs to be called.
+        :param params: The query parameters of the request.
+        :param cache_key: The key of the request in the response cache.
+        :param cached: The stale cached response that should be revalidated, None if nothing was cached.
+        :param cache: Whether the response should be stored in the response cache.
         :return: The JSON content of the response, otherwise None if the request fails.
         """
-        api_token = self._dataStorage.find_api_user(user_id=user_id)['API_KEY']
         api_url_base = 'https://api.wanikani.com/v2/'
         headers = {'Content-Type': 'application/json',
                    'Authorization': 'Bearer {0}'.format(api_token)}
+        if cached is not None:
+            headers.update(cached.conditional_headers())
+        if cache:
+            # Another process of a sharded bot may have received this response already.
+            shared: Dict[str, Any] = await self._load_shared_response(resource=resource, cache_key=cache_key)
+            if shared is not None:
+                return shared
         # Build the URL.
         api_url = f'{api_url_base}{resource}'
 
-        # Adds query parameters to the URL.
-        if after_date:
-            api_url = f'{api_url}?updated_after={after_date}T00:00:00.000000Z'
-        if after_id:
-            api_url = f'{api_url}?page_after_id={after_id}'
+        session: aiohttp.ClientSession = await self.get_session()
+        for attempt in range(self._max_retries + 1):
+            # Queue behind earlier requests of this token instead of getting throttled by WaniKani.
+            await self.rate_limiter.acquire(api_token=api_token)
+            retry_after: float = None
+            start: float = time.perf_counter()
+            status: Any = 'error'
+            try:
+                async with session.get(api_url, headers=headers, params=params) as response:
+                    status = response.status
+                    self._respect_rate_limit_headers(api_token=api_token, response=response)
+                    # Remember revoked or mistyped tokens, so that callers can tell them apart from outages.
+                    if response.status == 401:
+                        self.unauthorized_tokens.add(api_token)
+                        return None
+                    self.unauthorized_tokens.discard(api_token)
+                    if response.status == 200:
+                        content: bytes = await response.read()
+                        text: str = content.decode('utf-8')
+                        body: Dict[str, Any] = json.loads(text)
+                        if cache:
+                            expires_at: float = self.response_cache.expiry_for(resource=resource)
+                            etag: str = response.headers.get('ETag')
+                            last_modified: str = response.headers.get('Last-Modified')
+                            self.response_cache.put(key=cache_key, resource=resource, body=body, size=len(content),
+                                                    etag=etag, last_modified=last_modified, expires_at=expires_at)
+                            await self._store_shared_response(api_token=api_token, cache_key=cache_key, content=text,
+                                                              etag=etag, last_modified=last_modified,
+                                                              expires_at=expires_at)
+                        return body
+                    elif response.status == 304 and cached is not None:
+                        self.response_cache.revalidated(key=cache_key, resource=resource)
+                        return cached.body
+                    elif response.status != 429 and response.status < 500:
+                        return None
+                    # WaniKani sends RateLimit-Reset on every response, but only a 429 means the token has to wait.
+                    # Server errors are retried with the jittered backoff alone.
+                    if response.status == 429:
+                        retry_after = self._parse_retry_after(response=response)
+                    log_event(logger, 'wanikani_retry', level=logging.WARNING, resource=resource,
+                              status=response.status, attempt=attempt + 1)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as ex:
+                log_event(logger, 'wanikani_retry', level=logging.WARNING, resource=resource, error=repr(ex),
+                          attempt=attempt + 1)
+            finally:
+                WANIKANI_REQUESTS.inc(resource.split('/')[0], status)
+                WANIKANI_DURATION.observe(resource.split('/')[0], value=elapsed_since(start=start))
 
-        response = requests.get(api_url, headers=headers)
-        if response.status_code == 200:
-            return json.loads(response.content.decode('utf-8'))
-        else:
-            return None
+            if attempt < self._max_retries:
+                # Full jitter keeps retries of many requests that failed together from arriving together again.
+                delay: float = random.uniform(0, min(self._max_backoff, self._base_backoff * 2 ** attempt))
+                if retry_after is not None:
+                    self.rate_limiter.pause(api_token=api_token, seconds=retry_after)
+                    delay = max(delay, retry_after)
+                await asyncio.sleep(delay)
+        return None
+
+    def _respect_rate_limit_headers(self, api_token: str, response: aiohttp.ClientResponse) -> None:
+        """
+        Pauses the API token until the rate limit resets once WaniKani reports that no requests are remaining.
+        :param api_token: The WaniKani API token.
+        :param response: The response of the WaniKani API.
+        """
+        remaining: str = response.headers.get('RateLimit-Remaining')
+        reset: str = response.headers.get('RateLimit-Reset')
+        if remaining is not None and reset is not None and remaining.isdigit() and int(remaining) == 0:
+            try:
+                self.rate_limiter.pause(api_token=api_token, seconds=max(0.0, float(reset) - time.time()))
+            except ValueError:
+                pass
+
+    @staticmethod
+    def _parse_retry_after(response: aiohttp.ClientResponse) -> float:
+        """
+        Determines how long to wait before retrying a 429 from the Retry-After or RateLimit-Reset header.
+        :param response: The response of the WaniKani API.
+        :return: The amount of seconds to wait, or None if the response does not say.
+        """
+        retry_after: str = response.headers.get('Retry-After')
+        if retry_after:
+            if retry_after.isdigit():
+                return float(retry_after)
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+        reset: str = response.headers.get('RateLimit-Reset')
+        if reset:
+            try:
+                return max(0.0, float(reset) - time.time())
+            except ValueError:
+                pass
+        return None
 
     async def fetch_wanikani_user_data(self, user_id: int) -> User:
         """
         Fetch a WaniKani User's data.
         :param user_id: The Discord.User.id that was used to as the dictionary key.
-        :return: The data as a util.models.User object.
+        :return: The data as a util.models.User object, or None if the request fails.
         """
         user_data: Dict[str, Any] = await self.get_wanikani_data(user_id=user_id, resource='user')
         if user_data is None:
             return None
 
-        user: User = User(last_update=user_data['data_updated_at'], wk_id=user_data['data']['id'],
-                          username=user_data['data']['username'], profile_url=user_data['data']['profile_url'],
-                          level=user_data['data']['level'], member_since=user_data['data']['started_at'],
-                          subscribed=user_data['data']['subscription']['active'],
-                          subscription_type=user_data['data']['subscription']['type'],
-                          max_level=user_data['data']['subscription']['max_level_granted'],
-                          on_vacation_since=user_data['data']['current_vacation_started_at'])
-        self.wanikani_users[user_id]['USER_DATA'] = user
+        user: User = User.from_api(user_data=user_data)
+        self.user_cache.put(user_id=user_id, kind=UserCache.USER_DATA, model=user)
+        return user
+
+    async def get_wanikani_user_data(self, user_id: int) -> User:
+        """
+        Get a WaniKani User's data from the user cache, only fetching it when it is missing or stale.
+        :param user_id: The Discord.User.id that was used to as the dictionary key.
+        :return: The data as a util.models.User object, or None if the request fails.
+        """
+        user: User = self.user_cache.get(user_id=user_id, kind=UserCache.USER_DATA)
+        if user is None:
+            user = await self.fetch_wanikani_user_data(user_id=user_id)
         return user
 
     async def fetch_wanikani_user_summary(self, user_id: int) -> Summary:
         """
         Fetch a WaniKani User's Summary.
         :param user_id: The Discord.User.id that was used to as the dictionary key.
-        :return: The data as a util.models.Summary object.
+        :return: The data as a util.models.Summary object, or None if the request fails.
         """
         summary_data: Dict[str, Any] = await self.get_wanikani_data(user_id=user_id, resource='summary')
-        start: int = 0
-        available_reviews: List[int] = []
-        upcoming_reviews: List[int] = []
-        # Check if there are available reviews.
-        if summary_data['data_updated_at'] == summary_data['data']['next_reviews_at']:
-            start = 1
-            available_reviews = summary_data['data']['reviews'][0]['subject_ids']
-        # Loop over all the available review times and add all of them together.
-        for i in range(start, len(summary_data['data']['reviews'])):
-            upcoming_reviews.extend(summary_data['data']['reviews'][i]['subject_ids'])
-
-        summary: Summary = Summary(last_update=summary_data['data_updated_at'],
-                                   available_lessons=summary_data['data']['lessons'][0]['subject_ids'],
-                                   available_reviews=available_reviews,
-                                   upcoming_reviews=upcoming_reviews)
-        self.wanikani_users[user_id]['SUMMARY'] = summary
+        if summary_data is None:
+            return None
+
+        summary: Summary = Summary.from_api(summary_data=summary_data)
+        self.user_cache.put(user_id=user_id, kind=UserCache.SUMMARY, model=summary)
         return summary
 
+    async def get_wanikani_user_summary(self, user_id: int) -> Summary:
+        """
+        Get a WaniKani User's Summary from the user cache, only fetching it when it is missing or stale.
+        :param user_id: The Discord.User.id that was used to as the dictionary key.
+        :return: The data as a util.models.Summary object, or None if the request fails.
+        """
+        summary: Summary = self.user_cache.get(user_id=user_id, kind=UserCache.SUMMARY)
+        if summary is None:
+            summary = await self.fetch_wanikani_user_summary(user_id=user_id)
+        return summary
+
+    async def count_wanikani_started_lessons(self, user_id: int, date: str) -> int:
+        """
+        Count the lessons a WaniKani User did on a day, across every page of assignments updated since then.
+        :param user_id: The Discord.User.id that was used to as the dictionary key.
+        :param date: The day, formatted as YYYY-MM-DD.
+        :return: The amount of assignments started on that day, or None if a page could not be fetched.
+        """
+        count: int = 0
+        try:
+            async for assignment in self.iterate_wanikani_collection(
+                    api_token=await self.get_api_token(user_id=user_id), resource='assignments',
+                    params={'updated_after': f'{date}T00:00:00.000000Z'}):
+                started_at: str = assignment['data']['started_at']
+                if started_at and started_at.startswith(date):
+                    count += 1
+        except WaniKaniRequestError:
+            return None
+        return count
+
     async def fetch_wanikani_item_counts(self, user_id: int) -> List[int]:
-        radicals: int = 0
-        kanji: int = 0
-        vocabulary: int = 0
-        burned: int = 0
-
-        assignments_data: Dict[str, Any] = await self.get_wanikani_data(user_id=user_id, resource='assignments')
-        while True:
-            # Count every entry.
-            for entry in assignments_data['data']:
-                if entry['data']['subject_type'] == 'radical':
-                    radicals += 1
-                elif entry['data']['subject_type'] == 'kanji':
-                    kanji += 1
-                elif entry['data']['subject_type'] == 'vocabulary':
-                    vocabulary += 1
-
-                if entry['data']['srs_stage_name'] == 'Burned':
-                    burned += 1
-
-            # Break if there is no more data after this.
-            if not assignments_data['pages']['next_url']:
-                break
-            else:
-                after_id = assignments_data['pages']['next_url'][assignments_data['pages']['next_url'].index('page_after_id='):]
-                after_id = after_id.replace('page_after_id=', '')
-                assignments_data = await self.get_wanikani_data(user_id=user_id,
-                                                                resource='assignments',
-                                                                after_id=after_id)
-
-        return [radicals, kanji, vocabulary, burned]
+        """
+        Fetch the amount of radicals, kanji and vocabulary a WaniKani User has learned, and how many are burned.
+        The first call loads all assignments, afterwards only the assignments updated since the last sync are fetched.
+        :param user_id: The Discord.User.id that was used to as the dictionary key.
+        :return: The amount of radicals, kanji, vocabulary and burned items, in that order.
+        """
+        # Concurrent counts for the same user share one sync instead of each paging through the same deltas.
+        return await self.inflight.do(key=('item_counts', user_id),
+                                       func=lambda: self._sync_wanikani_item_counts(user_id=user_id))
+
+    async def _sync_wanikani_item_counts(self, user_id: int) -> List[int]:
+        """
+        Applies the assignments updated since the last sync to the user's AssignmentState and stores the delta.
+        :param user_id: The Discord.User.id that was used to as the dictionary key.
+        :return: The amount of radicals, kanji, vocabulary and burned items, in that order.
+        """
+        state: AssignmentState = await self.load_assignment_state(user_id=user_id)
+        # The pages of a first full sync are never requested again, so they would only push others out of the caches.
+        changed: Dict[str, List[Any]] = await self.pull_assignment_delta(state=state,
+                                                                         api_token=await self.get_api_token(user_id),
+                                                                         cache=state.last_sync is not None)
+        if changed is not None:
+            await self._dataStorage.update_assignment_state(user_id=user_id, last_sync=state.last_sync,
+                                                            changed=changed, counts=state.counts)
+            # Store it again, so that the cache accounts for the assignments that were added.
+            self.user_cache.put(user_id=user_id, kind=UserCache.ASSIGNMENTS, model=state)
+        return state.item_counts()
+
+    async def load_assignment_state(self, user_id: int, keep: bool = True) -> AssignmentState:
+        """
+        Get the AssignmentState of a user, loading it from the database if it is not in the user cache.
+        Evicted states are simply loaded again, the database always has their last synced version.
+        :param user_id: The Discord.User.id that was used to as the dictionary key.
+        :param keep: Whether a state loaded from the database should be stored in the user cache afterwards.
+        :return: The AssignmentState.
+        """
+        state: AssignmentState = self.user_cache.get(user_id=user_id, kind=UserCache.ASSIGNMENTS)
+        if state is None:
+            state = AssignmentState.from_document(user_id=user_id,
+                                                  document=await self._dataStorage.find_assignment_state(user_id))
+            if keep:
+                self.user_cache.put(user_id=user_id, kind=UserCache.ASSIGNMENTS, model=state)
+        return state
+
+    async def pull_assignment_delta(self, state: AssignmentState, api_token: str,
+                                    cache: bool = True) -> Dict[str, List[Any]]:
+        """
+        Applies the assignments updated since the last sync to an AssignmentState, without storing it.
+        :param state: The AssignmentState of the user.
+        :param api_token: The WaniKani API token of the user.
+        :param cache: Whether the pages should be stored in the response cache.
+        :return: The changed assignment records keyed by assignment ID, or None if the state did not change at all.
+        """
+        changed: Dict[str, List[Any]] = {}
+        last_sync: str = state.last_sync
+        complete: bool = False
+        params: Dict[str, str] = {'updated_after': state.last_sync} if state.last_sync else {}
+        try:
+            async for assignments_data in self.iterate_wanikani_pages(api_token=api_token, resource='assignments',
+                                                                      params=params, cache=cache):
+                changed.update(state.apply(entries=assignments_data['data']))
+                # The collection's data_updated_at is the newest updated_at of its assignments, so nothing is skipped.
+                if assignments_data['data_updated_at'] \
+                        and (not last_sync or assignments_data['data_updated_at'] > last_sync):
+                    last_sync = assignments_data['data_updated_at']
+            complete = True
+        except WaniKaniRequestError as ex:
+            log_event(logger, 'assignment_sync_failed', level=logging.WARNING, user=state.user_id, error=ex)
+
+        # Pages are ordered by ID, so the sync point may only move once every page has been applied.
+        if not complete:
+            last_sync = state.last_sync
+        if not changed and last_sync == state.last_sync:
+            return None
+        state.last_sync = last_sync
+        return changed
+
+    async def fetch_wanikani_leveling_state(self, user_id: int) -> LevelingState:
+        """
+        Fetch the level progressions of a WaniKani User.
+        The first call loads all of them, afterwards only the ones updated since the last sync are fetched.
+        :param user_id: The Discord.User.id that was used to as the dictionary key.
+        :return: The LevelingState, whose statistics are only computed again when a level progression changed.
+        """
+        return await self.inflight.do(key=('leveling', user_id),
+                                       func=lambda: self._sync_wanikani_level_progressions(user_id=user_id))
+
+    async def _sync_wanikani_level_progressions(self, user_id: int) -> LevelingState:
+        """
+        Applies the level progressions updated since the last sync to the user's LevelingState and stores the delta.
+        :param user_id: The Discord.User.id that was used to as the dictionary key.
+        :return: The LevelingState.
+        """
+        state: LevelingState = self.user_cache.get(user_id=user_id, kind=UserCache.LEVELING)
+        if state is None:
+            state = LevelingState.from_document(user_id=user_id,
+                                                document=await self._dataStorage.find_level_progressions(user_id))
+
+        changed: Dict[str, Dict[str, Any]] = {}
+        last_sync: str = state.last_sync
+        params: Dict[str, str] = {'updated_after': state.last_sync} if state.last_sync else {}
+        try:
+            # Like the assignments, the pages of a first full sync are not worth caching.
+            async for progressions_data in self.iterate_wanikani_pages(api_token=await self.get_api_token(user_id),
+                                                                       resource='level_progressions', params=params,
+                                                                       cache=state.last_sync is not None):
+                changed.update(state.apply(entries=progressions_data['data']))
+                if progressions_data['data_updated_at'] \
+                        and (not last_sync or progressions_data['data_updated_at'] > last_sync):
+                    last_sync = progressions_data['data_updated_at']
+        except WaniKaniRequestError as ex:
+            # Only move the sync point once every page has been applied, see pull_assignment_delta.
+            log_event(logger, 'leveling_sync_failed', level=logging.WARNING, user=user_id, error=ex)
+            last_sync = state.last_sync
+
+        if changed or last_sync != state.last_sync:
+            state.last_sync = last_sync
+            await self._dataStorage.update_level_progressions(user_id=user_id, last_sync=last_sync, changed=changed)
+        # Store it (again), so that the cache accounts for the progressions that were added.
+        self.user_cache.put(user_id=user_id, kind=UserCache.LEVELING, model=state)
+        return state
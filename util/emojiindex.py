@@ -0,0 +1,53 @@
+from typing import Any, Dict, Iterable, List
+import random
+
+
+class EmojiIndex:
+    def __init__(self, keywords: Iterable[str]) -> None:
+        """
+        Initializes an index of the custom emoji of every Discord Guild, keyed by lowercase keyword.
+        Only the given keywords are indexed, which is what allows lookups to be constant time.
+        :param keywords: Every keyword that will ever be looked up.
+        """
+        self.keywords: List[str] = sorted({k.lower() for k in keywords})
+        self._guilds: Dict[int, Dict[str, List[str]]] = {}
+
+    def index_guild(self, guild_id: int, emojis: Iterable[Any]) -> None:
+        """
+        (Re)builds the index for a Discord Guild, replacing what was indexed before.
+        :param guild_id: The Discord Guild ID.
+        :param emojis: The Discord.Emoji objects of the Guild, as found in the gateway cache.
+        """
+        index: Dict[str, List[str]] = {}
+        for em in emojis:
+            name: str = em.name.lower()
+            for keyword in self.keywords:
+                if keyword in name:
+                    index.setdefault(keyword, []).append(f'<:{em.name}:{em.id}>')
+        self._guilds[guild_id] = index
+
+    def remove_guild(self, guild_id: int) -> None:
+        """
+        Forgets the custom emoji of a Discord Guild.
+        :param guild_id: The Discord Guild ID.
+        """
+        self._guilds.pop(guild_id, None)
+
+    def find(self, guild_id: int, keywords: List[str]) -> str:
+        """
+        Find a custom emoji of a Discord Guild whose name contains one of the keywords.
+        :param guild_id: The Discord Guild ID.
+        :param keywords: The keywords that should be searched for.
+        :return: A random hit, properly formatted to be sent. Empty string if nothing was found.
+        """
+        index: Dict[str, List[str]] = self._guilds.get(guild_id)
+        if not index:
+            return ''
+        # Mix up the potential results.
+        hits: List[List[str]] = [index[k] for k in keywords if k in index]
+        if not hits:
+            return ''
+        return random.choice(random.choice(hits))
+
+    def __len__(self) -> int:
+        return len(self._guilds)
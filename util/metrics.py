@@ -0,0 +1,240 @@
+from aiohttp import web
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+import asyncio
+import bisect
+import logging
+import random
+import time
+
+Labels = Tuple[str, ...]
+
+
+def _format_labels(labelnames: Sequence[str], labels: Labels, extra: str = '') -> str:
+    pairs: List[str] = [f'{name}="{str(value)}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    kind: str = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labelnames: Sequence[str] = labelnames
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: Any, amount: float = 1) -> None:
+        """
+        Increases the counter of a label combination.
+        :param labels: The values of the labels, in the order of labelnames.
+        :param amount: How much to increase the counter by.
+        """
+        key: Labels = tuple(str(label) for label in labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels: Any) -> float:
+        return self._values.get(tuple(str(label) for label in labels), 0)
+
+    def samples(self) -> List[str]:
+        return [f'{self.name}{_format_labels(self.labelnames, labels)} {value}'
+                for labels, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind: str = 'gauge'
+
+    def set(self, *labels: Any, value: float) -> None:
+        """
+        Sets the gauge of a label combination.
+        :param labels: The values of the labels, in the order of labelnames.
+        :param value: The new value.
+        """
+        self._values[tuple(str(label) for label in labels)] = value
+
+
+class CallbackMetric(Counter):
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Sequence[str],
+                 callback: Callable[[], Dict[Labels, float]]) -> None:
+        """
+        A metric whose values are read from elsewhere, like the counters of a cache, whenever it is collected.
+        :param kind: Either 'counter' or 'gauge'.
+        :param callback: Function returning a dictionary mapping label values to the current value.
+        """
+        super(CallbackMetric, self).__init__(name=name, documentation=documentation, labelnames=labelnames)
+        self.kind = kind
+        self._callback: Callable[[], Dict[Labels, float]] = callback
+
+    def samples(self) -> List[str]:
+        self._values = {tuple(str(label) for label in labels): value
+                        for labels, value in self._callback().items()}
+        return super(CallbackMetric, self).samples()
+
+
+class Histogram:
+    kind: str = 'histogram'
+    DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labelnames: Sequence[str] = labelnames
+        self.buckets: Sequence[float] = sorted(buckets)
+        # Per label combination: the count of every bucket (not cumulative), the sum and the total count.
+        self._values: Dict[Labels, List[Any]] = {}
+
+    def observe(self, *labels: Any, value: float) -> None:
+        """
+        Records an observation, usually a duration in seconds.
+        :param labels: The values of the labels, in the order of labelnames.
+        :param value: The observed value.
+        """
+        key: Labels = tuple(str(label) for label in labels)
+        entry: List[Any] = self._values.get(key)
+        if entry is None:
+            entry = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            self._values[key] = entry
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def average(self, *labels: Any) -> float:
+        entry: List[Any] = self._values.get(tuple(str(label) for label in labels))
+        return entry[1] / entry[2] if entry else 0
+
+    def samples(self) -> List[str]:
+        lines: List[str] = []
+        for labels, (counts, total, count) in sorted(self._values.items()):
+            cumulative: int = 0
+            for bound, bucket_count in zip(list(self.buckets) + ['+Inf'], counts):
+                cumulative += bucket_count
+                bucket_labels: str = _format_labels(self.labelnames, labels, 'le="' + str(bound) + '"')
+                lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Any] = {}
+
+    def register(self, metric: Any) -> Any:
+        """
+        Adds a metric, or returns the already registered metric with the same name.
+        :param metric: The Counter, Gauge, CallbackMetric or Histogram.
+        :return: The registered metric.
+        """
+        return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        """
+        :return: Every metric in the Prometheus text exposition format.
+        """
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> str:
+        """
+        :return: Every sample except the histogram buckets, which is short enough to read in chat.
+        """
+        return '\n'.join(line for line in self.render().splitlines()
+                         if not line.startswith('#') and '_bucket{' not in line)
+
+
+# The registry shared by every part of the Crabigator.
+metrics: MetricsRegistry = MetricsRegistry()
+COMMAND_DURATION: Histogram = metrics.register(Histogram('crabigator_command_duration_seconds',
+                                                         'Time spent handling a command.', ['command']))
+COMMAND_ERRORS: Counter = metrics.register(Counter('crabigator_command_errors_total',
+                                                   'Commands that raised an exception.', ['command']))
+WANIKANI_REQUESTS: Counter = metrics.register(Counter('crabigator_wanikani_requests_total',
+                                                      'Requests made to the WaniKani API.', ['resource', 'status']))
+WANIKANI_DURATION: Histogram = metrics.register(Histogram('crabigator_wanikani_request_duration_seconds',
+                                                          'Duration of requests to the WaniKani API.', ['resource']))
+MONGO_DURATION: Histogram = metrics.register(Histogram('crabigator_mongo_duration_seconds',
+                                                       'Duration of MongoDB calls, including executor queueing.',
+                                                       ['operation']))
+EVENT_LOOP_LAG: Histogram = metrics.register(Histogram('crabigator_event_loop_lag_seconds',
+                                                       'How late the event loop woke up a sleeping task.',
+                                                       buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)))
+
+
+async def monitor_event_loop_lag(interval: float = 1) -> None:
+    """
+    Measures how much later than requested the event loop resumes a sleeping task, forever.
+    :param interval: How many seconds to sleep between measurements.
+    """
+    loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+    while True:
+        start: float = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(value=max(0.0, loop.time() - start - interval))
+
+
+class MetricsServer:
+    def __init__(self, registry: MetricsRegistry, host: str = '127.0.0.1', port: int = 9180) -> None:
+        """
+        Initializes the HTTP endpoint that Prometheus can scrape at /metrics.
+        :param registry: The MetricsRegistry that should be exposed.
+        :param host: The interface to listen on. Defaults to local connections only.
+        :param port: The port to listen on.
+        """
+        self.registry: MetricsRegistry = registry
+        self.host: str = host
+        self.port: int = port
+        self._runner: web.AppRunner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render(), content_type='text/plain', charset='utf-8')
+
+    async def start(self) -> None:
+        """
+        Starts listening, unless the server is already running.
+        """
+        if self._runner is not None:
+            return
+        app: web.Application = web.Application()
+        app.router.add_get('/metrics', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self) -> None:
+        """
+        Stops listening.
+        """
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def log_event(logger: logging.Logger, event: str, sample_rate: float = 1, level: int = logging.INFO,
+              **fields: Any) -> None:
+    """
+    Logs an event as key=value pairs, so that the logs can be parsed and aggregated.
+    :param logger: The logging.Logger to log with.
+    :param event: The name of the event.
+    :param sample_rate: The fraction of events that should actually be logged, between 0 and 1.
+    :param level: The logging level.
+    :param fields: The fields of the event.
+    """
+    if sample_rate < 1 and random.random() >= sample_rate:
+        return
+    if logger.isEnabledFor(level):
+        pairs: str = ' '.join(f'{key}={str(value)!r}' for key, value in fields.items())
+        logger.log(level, f'event={event} {pairs}'.rstrip())
+
+
+def elapsed_since(start: float) -> float:
+    """
+    :param start: A time.perf_counter() value.
+    :return: The seconds elapsed since then.
+    """
+    return time.perf_counter() - start
@@ -1,15 +1,67 @@
+from .timestamps import Timestamp, format_timestamp
+from datetime import datetime
+from typing import Any, Dict, Union
+
+
 class LevelProgress:
-    def __init__(self, progress_id: int, last_update: str, level: int, passed: bool, unlocked_at: str,
-                 started_at: str, passed_at: str, completed_at: str, abandoned_at: str) -> None:
+    __slots__ = ('id', '_last_update', 'level', 'passed', '_unlocked_at', '_started_at', '_passed_at', '_completed_at',
+                 '_abandoned_at')
+    TIMESTAMPS = ('last_update', 'unlocked_at', 'started_at', 'passed_at', 'completed_at', 'abandoned_at')
+    last_update: datetime = Timestamp('_last_update')
+    unlocked_at: datetime = Timestamp('_unlocked_at')
+    started_at: datetime = Timestamp('_started_at')
+    passed_at: datetime = Timestamp('_passed_at')
+    completed_at: datetime = Timestamp('_completed_at')
+    abandoned_at: datetime = Timestamp('_abandoned_at')
+
+    def __init__(self, progress_id: int, last_update: Union[str, datetime], level: int, passed: bool,
+                 unlocked_at: Union[str, datetime], started_at: Union[str, datetime], passed_at: Union[str, datetime],
+                 completed_at: Union[str, datetime], abandoned_at: Union[str, datetime]) -> None:
         self.id: int = progress_id
-        self.last_update: str = last_update
+        # Timestamps may still be ISO 8601 strings, they are parsed when they are read.
+        self._last_update: Union[str, datetime] = last_update
         self.level: int = level
         self.passed: bool = passed
-        self.unlocked_at: str = unlocked_at
-        self.started_at: str = started_at
-        self.passed_at: str = passed_at
-        self.completed_at: str = completed_at
-        self.abandoned_at: str = abandoned_at
+        self._unlocked_at: Union[str, datetime] = unlocked_at
+        self._started_at: Union[str, datetime] = started_at
+        self._passed_at: Union[str, datetime] = passed_at
+        self._completed_at: Union[str, datetime] = completed_at
+        self._abandoned_at: Union[str, datetime] = abandoned_at
+
+    @classmethod
+    def from_api(cls, entry: Dict[str, Any]) -> 'LevelProgress':
+        """
+        Creates a LevelProgress from a single record of the level_progressions resource.
+        Its timestamps are parsed once, when they are read.
+        :param entry: The level progression record.
+        :return: The LevelProgress.
+        """
+        data: Dict[str, Any] = entry['data']
+        passed_at: str = data['passed_at']
+        return cls(entry['id'], entry['data_updated_at'], data['level'], passed_at is not None, data['unlocked_at'],
+                   data['started_at'], passed_at, data['completed_at'], data['abandoned_at'])
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> 'LevelProgress':
+        """
+        Creates a LevelProgress from what was persisted in the database.
+        :param document: The stored fields, as returned by to_document.
+        :return: The LevelProgress.
+        """
+        return cls(document['id'], document['last_update'], document['level'], document['passed'],
+                   document['unlocked_at'], document['started_at'], document['passed_at'], document['completed_at'],
+                   document['abandoned_at'])
+
+    def to_document(self) -> Dict[str, Any]:
+        """
+        :return: The fields that are persisted in the database, with the timestamps as ISO 8601 strings.
+        """
+        document: Dict[str, Any] = {'id': self.id, 'level': self.level, 'passed': self.passed}
+        for name in self.TIMESTAMPS:
+            # Timestamps that were never read are still the strings they were created from.
+            value: Union[str, datetime] = getattr(self, f'_{name}')
+            document[name] = value if isinstance(value, str) else format_timestamp(value)
+        return document
 
     def __str__(self) -> str:
         return f'Level: {self.level} - Passed: {self.passed}'
@@ -0,0 +1,61 @@
+from typing import Any, Dict, List
+
+
+class Subject:
+    __slots__ = ('id', 'subject_type', 'last_update', 'level', 'characters', 'slug', 'meanings', 'readings',
+                 'document_url', 'hidden')
+
+    def __init__(self, subject_id: int, subject_type: str, last_update: str, level: int, characters: str,
+                 slug: str, meanings: List[str], readings: List[str], document_url: str, hidden: bool) -> None:
+        self.id: int = subject_id
+        self.subject_type: str = subject_type
+        self.last_update: str = last_update
+        self.level: int = level
+        self.characters: str = characters
+        self.slug: str = slug
+        # The primary meaning and reading come first.
+        self.meanings: List[str] = meanings
+        self.readings: List[str] = readings
+        self.document_url: str = document_url
+        self.hidden: bool = hidden
+
+    @classmethod
+    def from_api(cls, entry: Dict[str, Any]) -> 'Subject':
+        """
+        Creates a Subject from a single record of the subjects resource, keeping only what the bot uses.
+        :param entry: The subject record.
+        :return: The Subject.
+        """
+        data: Dict[str, Any] = entry['data']
+        meanings: List[Dict[str, Any]] = sorted(data.get('meanings', []), key=lambda m: not m['primary'])
+        readings: List[Dict[str, Any]] = sorted(data.get('readings', []), key=lambda r: not r['primary'])
+        return cls(subject_id=entry['id'], subject_type=entry['object'], last_update=entry['data_updated_at'],
+                   level=data['level'], characters=data.get('characters'), slug=data.get('slug'),
+                   meanings=[m['meaning'] for m in meanings if m.get('accepted_answer', True)],
+                   readings=[r['reading'] for r in readings if r.get('accepted_answer', True)],
+                   document_url=data.get('document_url'), hidden=data.get('hidden_at') is not None)
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> 'Subject':
+        """
+        Creates a Subject from what was persisted in the database.
+        :param document: The stored fields, as returned by to_document.
+        :return: The Subject.
+        """
+        return cls(subject_id=document['_id'], subject_type=document['subject_type'],
+                   last_update=document['last_update'], level=document['level'],
+                   characters=document['characters'], slug=document['slug'], meanings=document['meanings'],
+                   readings=document['readings'], document_url=document['document_url'],
+                   hidden=document['hidden'])
+
+    def to_document(self) -> Dict[str, Any]:
+        """
+        :return: The fields that are persisted in the database.
+        """
+        return {'_id': self.id, 'subject_type': self.subject_type, 'last_update': self.last_update,
+                'level': self.level, 'characters': self.characters, 'slug': self.slug, 'meanings': self.meanings,
+                'readings': self.readings, 'document_url': self.document_url, 'hidden': self.hidden}
+
+    def __str__(self) -> str:
+        return f'{self.subject_type.capitalize()}: {self.characters or self.slug} - Level: {self.level}' \
+            f' - Meaning: {self.meanings[0] if self.meanings else None}'
@@ -1,17 +1,58 @@
-from typing import Any, List
+from .timestamps import Timestamp
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Union
 
 
 class Summary:
-    def __init__(self, last_update: str,
-                 available_lessons: List[Any],
-                 available_reviews: List[Any],
-                 upcoming_reviews: List[Any]) -> None:
-        self.last_update: str = last_update
-        self.available_lessons: List[Any] = available_lessons
-        self.available_reviews: List[Any] = available_reviews
-        self.upcoming_reviews: List[Any] = upcoming_reviews
+    __slots__ = ('_last_update', '_next_reviews_at', 'available_lessons', 'available_reviews', 'upcoming_reviews')
+    last_update: datetime = Timestamp('_last_update')
+    next_reviews_at: datetime = Timestamp('_next_reviews_at')
+
+    def __init__(self, last_update: Union[str, datetime],
+                 available_lessons: Iterable[int],
+                 available_reviews: Iterable[int],
+                 upcoming_reviews: Iterable[int],
+                 next_reviews_at: Union[str, datetime] = None) -> None:
+        # Timestamps may still be the strings of the API, they are parsed when they are read.
+        self._last_update: Union[str, datetime] = last_update
+        self._next_reviews_at: Union[str, datetime] = next_reviews_at
+        # Subject IDs are stored as unsigned ints, instead of a list of separate int objects.
+        # Arrays that were built by from_api are kept as they are.
+        self.available_lessons: array = available_lessons if isinstance(available_lessons, array) \
+            else array('I', available_lessons)
+        self.available_reviews: array = available_reviews if isinstance(available_reviews, array) \
+            else array('I', available_reviews)
+        self.upcoming_reviews: array = upcoming_reviews if isinstance(upcoming_reviews, array) \
+            else array('I', upcoming_reviews)
+
+    @classmethod
+    def from_api(cls, summary_data: Dict[str, Any]) -> 'Summary':
+        """
+        Creates a Summary from a response of the summary resource. Its timestamps are parsed once, when they are read.
+        :param summary_data: The JSON content of the response.
+        :return: The Summary.
+        """
+        data: Dict[str, Any] = summary_data['data']
+        reviews: List[Dict[str, Any]] = data['reviews']
+        # fromlist converts a list of ints a lot faster than the array constructor or extend.
+        available_lessons: array = array('I')
+        if data['lessons']:
+            available_lessons.fromlist(data['lessons'][0]['subject_ids'])
+        start: int = 0
+        available_reviews: array = array('I')
+        # Check if there are available reviews.
+        if reviews and summary_data['data_updated_at'] == data['next_reviews_at']:
+            start = 1
+            available_reviews.fromlist(reviews[0]['subject_ids'])
+        # Loop over all the available review times and add all of them together.
+        upcoming_reviews: array = array('I')
+        for i in range(start, len(reviews)):
+            upcoming_reviews.fromlist(reviews[i]['subject_ids'])
+        return cls(summary_data['data_updated_at'], available_lessons, available_reviews, upcoming_reviews,
+                   data['next_reviews_at'])
 
     def __str__(self) -> str:
         return f'Available lessons: {len(self.available_lessons)}' \
             f' - Available reviews: {len(self.available_reviews)}' \
-            f' - Upcoming reviews: {[len(x) for x in self.upcoming_reviews]}'
+            f' - Upcoming reviews: {len(self.upcoming_reviews)}'
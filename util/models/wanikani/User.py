@@ -1,21 +1,42 @@
-from typing import List
-from .Level_Progress import LevelProgress
+from .timestamps import Timestamp
+from datetime import datetime
+from typing import Any, Dict, Union
 
 
 class User:
-    def __init__(self, wk_id: str, username: str, profile_url: str, level: int, last_update: str, member_since: str,
-                 subscribed: bool, subscription_type: str, max_level: int, on_vacation_since: str):
+    __slots__ = ('id', 'username', 'profile_url', 'level', '_last_update', '_member_since', 'subscribed',
+                 'subscription_type', 'max_level', '_on_vacation_since')
+    last_update: datetime = Timestamp('_last_update')
+    member_since: datetime = Timestamp('_member_since')
+    on_vacation_since: datetime = Timestamp('_on_vacation_since')
+
+    def __init__(self, wk_id: str, username: str, profile_url: str, level: int, last_update: Union[str, datetime],
+                 member_since: Union[str, datetime], subscribed: bool, subscription_type: str, max_level: int,
+                 on_vacation_since: Union[str, datetime]):
         self.id: str = wk_id
         self.username: str = username
         self.profile_url: str = profile_url
         self.level: int = level
-        self.last_update: str = last_update
-        self.member_since: str = member_since
+        # Timestamps may still be the strings of the API, they are parsed when they are read.
+        self._last_update: Union[str, datetime] = last_update
+        self._member_since: Union[str, datetime] = member_since
         self.subscribed: bool = subscribed
         self.subscription_type: str = subscription_type
         self.max_level: int = max_level
-        self.on_vacation_since: str = on_vacation_since
-        self.level_progressions: List[LevelProgress] = []
+        self._on_vacation_since: Union[str, datetime] = on_vacation_since
+
+    @classmethod
+    def from_api(cls, user_data: Dict[str, Any]) -> 'User':
+        """
+        Creates a User from a response of the user resource. Its timestamps are parsed once, when they are read.
+        :param user_data: The JSON content of the response.
+        :return: The User.
+        """
+        data: Dict[str, Any] = user_data['data']
+        subscription: Dict[str, Any] = data['subscription']
+        return cls(data['id'], data['username'], data['profile_url'], data['level'], user_data['data_updated_at'],
+                   data['started_at'], subscription['active'], subscription['type'],
+                   subscription['max_level_granted'], data['current_vacation_started_at'])
 
     def __str__(self):
         return f'User: {self.username} - Level: {self.level} - URL: {self.profile_url}'
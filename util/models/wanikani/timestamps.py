@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import Any, Union
+
+
+def parse_timestamp(timestamp: str) -> datetime:
+    """
+    Parses a WaniKani API timestamp, like 2017-09-05T23:38:10.695133Z.
+    :param timestamp: The ISO 8601 timestamp in UTC.
+    :return: The timezone aware datetime, or None if there was no timestamp.
+    """
+    if not timestamp:
+        return None
+    return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+
+
+def format_timestamp(timestamp: datetime) -> str:
+    """
+    :param timestamp: The timezone aware datetime, or None.
+    :return: The ISO 8601 timestamp that parse_timestamp reads back, or None if there was no datetime.
+    """
+    return timestamp.isoformat() if timestamp else None
+
+
+class Timestamp:
+    def __init__(self, slot: str) -> None:
+        """
+        Descriptor for a timestamp of a slotted model. The model stores the timestamp string of the API in the slot,
+        and it is parsed the first time it is read. Most timestamps of a response are never looked at.
+        :param slot: The name of the slot the timestamp is stored in.
+        """
+        self.slot: str = slot
+
+    def __get__(self, instance: Any, owner: type) -> Union[datetime, 'Timestamp']:
+        if instance is None:
+            return self
+        value: Union[str, datetime] = getattr(instance, self.slot)
+        if isinstance(value, str):
+            value = parse_timestamp(value)
+            setattr(instance, self.slot, value)
+        return value
+
+    def __set__(self, instance: Any, value: Union[str, datetime]) -> None:
+        setattr(instance, self.slot, value)
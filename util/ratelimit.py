@@ -0,0 +1,160 @@
+from typing import Dict, List
+import asyncio
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int) -> None:
+        """
+        Initializes a full token bucket.
+        :param rate: How many tokens are added per second.
+        :param capacity: The maximum amount of tokens, which is the size of the allowed burst.
+        """
+        self.rate: float = rate
+        self.capacity: int = capacity
+        self.tokens: float = capacity
+        self.waiting: int = 0
+        self.acquired: int = 0
+        self.total_wait: float = 0
+        self._updated: float = time.monotonic()
+        self._paused_until: float = 0
+        # asyncio.Lock wakes its waiters in order, so queued requests are served first come, first served.
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now: float = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """
+        Waits until a token is available and takes it.
+        :return: How many seconds were spent waiting.
+        """
+        start: float = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now: float = time.monotonic()
+                    if now < self._paused_until:
+                        await asyncio.sleep(self._paused_until - now)
+                        continue
+                    self._refill()
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        break
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+        finally:
+            self.waiting -= 1
+        waited: float = time.monotonic() - start
+        self.acquired += 1
+        self.total_wait += waited
+        return waited
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stops handing out tokens for a while, for example when the server told us to back off.
+        :param seconds: How many seconds from now no tokens should be handed out.
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    def average_wait(self) -> float:
+        """
+        :return: The average amount of seconds an acquisition had to wait.
+        """
+        return self.total_wait / self.acquired if self.acquired else 0
+
+    def idle(self) -> bool:
+        """
+        :return: Whether nothing waits for the bucket and it is full again, so a new bucket would behave the same.
+        """
+        if self.waiting or time.monotonic() < self._paused_until:
+            return False
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class RateLimiter:
+    # How often buckets of API tokens that stopped making requests are dropped.
+    PRUNE_INTERVAL: float = 300
+
+    def __init__(self, requests_per_minute: int = 60, burst: int = None, processes: int = 1) -> None:
+        """
+        Initializes a rate limiter that keeps a separate token bucket per API token,
+        so that a heavy user only ever waits on their own budget.
+        :param requests_per_minute: The amount of requests a single API token is allowed to make per minute.
+        :param burst: How many requests may be made at once. Defaults to a sixth of the amount allowed per minute,
+                      since a full bucket plus its refill would otherwise allow almost twice the limit in one minute.
+        :param processes: The amount of processes that make requests with the same API tokens. Each of them gets an
+                          equal share of the budget, so that together they stay within the limit.
+        """
+        self.rate: float = requests_per_minute / 60 / processes
+        self.burst: int = burst or max(1, requests_per_minute // 6 // processes)
+        self._buckets: Dict[str, TokenBucket] = {}
+        # What the dropped buckets waited, so that the average wait still covers them.
+        self._pruned_acquired: int = 0
+        self._pruned_wait: float = 0
+        self._last_prune: float = time.monotonic()
+
+    def bucket(self, api_token: str) -> TokenBucket:
+        """
+        Gets the token bucket of an API token, creating it on first use.
+        :param api_token: The WaniKani API token.
+        :return: The TokenBucket.
+        """
+        bucket: TokenBucket = self._buckets.get(api_token)
+        if bucket is None:
+            if time.monotonic() - self._last_prune > self.PRUNE_INTERVAL:
+                self.prune()
+            bucket = TokenBucket(rate=self.rate, capacity=self.burst)
+            self._buckets[api_token] = bucket
+        return bucket
+
+    async def acquire(self, api_token: str) -> float:
+        """
+        Waits until the API token is allowed to make another request.
+        :param api_token: The WaniKani API token.
+        :return: How many seconds were spent waiting.
+        """
+        return await self.bucket(api_token=api_token).acquire()
+
+    def pause(self, api_token: str, seconds: float) -> None:
+        """
+        Stops the API token from making requests for a while.
+        :param api_token: The WaniKani API token.
+        :param seconds: How many seconds from now no requests should be made.
+        """
+        self.bucket(api_token=api_token).pause(seconds=seconds)
+
+    def prune(self) -> int:
+        """
+        Drops the buckets that are idle, otherwise every API token that was ever used keeps its bucket forever.
+        :return: The amount of buckets that were dropped.
+        """
+        idle: List[str] = [api_token for api_token, bucket in self._buckets.items() if bucket.idle()]
+        for api_token in idle:
+            bucket: TokenBucket = self._buckets.pop(api_token)
+            self._pruned_acquired += bucket.acquired
+            self._pruned_wait += bucket.total_wait
+        self._last_prune = time.monotonic()
+        return len(idle)
+
+    def queue_depth(self) -> int:
+        """
+        :return: The amount of requests currently waiting for any API token.
+        """
+        return sum(bucket.waiting for bucket in self._buckets.values())
+
+    def average_wait(self) -> float:
+        """
+        :return: The average amount of seconds an acquisition had to wait, over all API tokens.
+        """
+        acquired: int = self._pruned_acquired + sum(bucket.acquired for bucket in self._buckets.values())
+        total_wait: float = self._pruned_wait + sum(bucket.total_wait for bucket in self._buckets.values())
+        return total_wait / acquired if acquired else 0
+
+    def __str__(self) -> str:
+        return f'Rate limited tokens: {len(self._buckets)} - Queue depth: {self.queue_depth()}' \
+            f' - Average wait: {self.average_wait() * 1000:.0f}ms'
@@ -0,0 +1,120 @@
+from ..assets import AssetRegistry
+from ..cache.rendercache import RenderCache
+from .textlayout import TextLayout
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageChops, ImageFont, ImageDraw
+from typing import List, Tuple
+import asyncio
+import io
+
+# Bump whenever the way signs are drawn changes, so that cached renders are no longer used.
+RENDER_VERSION: int = 1
+# Lookup table that maps a pure white channel value to 255 and everything else to 0.
+WHITE_LUT: List[int] = [0] * 255 + [255]
+# The templates, font and layout engine of the current worker process, loaded once by initialize_worker.
+_assets: AssetRegistry = None
+_layout: TextLayout = None
+
+
+def initialize_worker() -> None:
+    """
+    Loads the sign templates and font once per worker process, instead of once per rendered sign.
+    """
+    global _assets, _layout
+    _assets = AssetRegistry()
+    _assets.load_templates()
+    # Only 3 lines of text fit on the sign.
+    _layout = TextLayout(font=_assets.font, max_width=200, max_lines=3, overflow_text='Max length exceeded!')
+
+
+def make_white_transparent(image: Image) -> Image:
+    """
+    Makes every pure white pixel of an RGBA image fully transparent, using channel operations instead of
+    looping over every pixel in Python.
+    :param image: The RGBA image, which is modified in place.
+    :return: The same image.
+    """
+    r, g, b, a = image.split()
+    white: Image = ImageChops.multiply(ImageChops.multiply(r.point(WHITE_LUT), g.point(WHITE_LUT)),
+                                       b.point(WHITE_LUT))
+    # Subtracting saturates at 0, so white pixels lose all their alpha and the rest keep theirs.
+    image.putalpha(ImageChops.subtract(a, white))
+    return image
+
+
+def render_sign(text: str) -> bytes:
+    """
+    Draws text on the Crabigator's sign. Meant to be run in a worker process.
+    :param text: The text that should be drawn.
+    :return: The rendered image encoded as PNG.
+    """
+    if _assets is None:
+        initialize_worker()
+    # Copy the templates, since they are reused for every sign.
+    bg_image: Image = _assets.sign_template.copy()
+    text_image: Image = _assets.text_template.copy()
+    draw: ImageDraw = ImageDraw.Draw(text_image)
+    font: ImageFont = _assets.font
+    # Split the text into lines based on width.
+    lines: List[Tuple[str, float]] = _layout.layout(text=text)
+    y_spacing: int = 45
+    y_val: int = 0
+    # Determine where to start drawing based on the amount of lines.
+    if len(lines) == 1:
+        y_val = 70
+    elif len(lines) == 2:
+        y_val = 40
+    elif len(lines) == 3:
+        y_val = 10
+    # Draw each line on the sign.
+    for line, line_x in lines:
+        draw.text(xy=(text_image.width - 235 - line_x / 2, y_val), text=line, font=font)
+        y_val += y_spacing
+
+    # Rotate text image before pasting it.
+    text_image = text_image.convert('RGBA')
+    text_image = text_image.rotate(angle=-12, resample=Image.NEAREST, expand=1, fillcolor='white')
+    # Replace all the white with transparent.
+    make_white_transparent(image=text_image)
+
+    bg_image.paste(text_image, (0, 0), text_image)
+
+    buffer: io.BytesIO = io.BytesIO()
+    bg_image.save(fp=buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class SignRenderer:
+    def __init__(self, workers: int = 2, cache: RenderCache = None) -> None:
+        """
+        Initializes the pool of worker processes that render signs, so rendering never blocks the event loop.
+        :param workers: The amount of worker processes.
+        :param cache: Optional cache of finished renders, so repeated texts are not drawn again.
+        """
+        self._executor: ProcessPoolExecutor = ProcessPoolExecutor(max_workers=workers, initializer=initialize_worker)
+        self.cache: RenderCache = cache
+
+    async def render(self, text: str) -> io.BytesIO:
+        """
+        Renders a sign in one of the worker processes, unless it is still cached from an earlier render.
+        :param text: The text that should be drawn.
+        :return: An in-memory buffer containing the PNG, ready to be wrapped in a Discord.File.
+        """
+        key: str = None
+        if self.cache is not None:
+            key = self.cache.make_key(kind='sign', text=text)
+            content: bytes = self.cache.get(key=key)
+            if content is not None:
+                return io.BytesIO(content)
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
+        content: bytes = await loop.run_in_executor(self._executor, render_sign, text)
+        if self.cache is not None:
+            await self.cache.put(key=key, content=content)
+        return io.BytesIO(content)
+
+    def close(self) -> None:
+        """
+        Shuts down the worker processes.
+        """
+        self._executor.shutdown(wait=False)
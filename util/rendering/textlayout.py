@@ -0,0 +1,85 @@
+from PIL import ImageFont
+from typing import Dict, List, Tuple
+
+
+class TextLayout:
+    def __init__(self, font: ImageFont, max_width: int, max_lines: int, overflow_text: str) -> None:
+        """
+        Initializes a layout engine that wraps text on whole words for a single font.
+        :param font: The font that the text will be drawn with.
+        :param max_width: The maximum width of a line in pixels.
+        :param max_lines: The maximum amount of lines that fit.
+        :param overflow_text: The text shown instead when the text does not fit in max_lines.
+        """
+        self.font: ImageFont = font
+        self.max_width: int = max_width
+        self.max_lines: int = max_lines
+        self._advances: Dict[str, float] = {}
+        self._space: float = self.advance(' ')
+        # The fallback is always the same, so it only needs to be laid out once.
+        self.overflow: List[Tuple[str, float]] = self.wrap(text=overflow_text)
+
+    def advance(self, c: str) -> float:
+        """
+        Gets the advance width of a single character, measuring it only the first time it is seen.
+        :param c: The character.
+        :return: The width in pixels.
+        """
+        width: float = self._advances.get(c)
+        if width is None:
+            # getsize was removed in Pillow 10, getlength was added in Pillow 8.
+            width = self.font.getlength(c) if hasattr(self.font, 'getlength') else self.font.getsize(c)[0]
+            self._advances[c] = width
+        return width
+
+    def measure(self, text: str) -> float:
+        """
+        :param text: The text that should be measured.
+        :return: The width of the text in pixels.
+        """
+        return sum(self.advance(c) for c in text)
+
+    def wrap(self, text: str, max_lines: int = None) -> List[Tuple[str, float]]:
+        """
+        Wraps text on whole words. Words that are wider than a line on their own are broken up.
+        :param text: The text that should be wrapped.
+        :param max_lines: Stop and return None as soon as the text needs more lines than this. None for no limit.
+        :return: Every line with its width in pixels, or None if the text needs more than max_lines.
+        """
+        lines: List[Tuple[str, float]] = []
+        line: str = ''
+        line_width: float = 0
+        for word in text.split():
+            word_width: float = self.measure(word)
+            if line and line_width + self._space + word_width <= self.max_width:
+                line = f'{line} {word}'
+                line_width += self._space + word_width
+                continue
+            if line:
+                lines.append((line, line_width))
+            line, line_width = word, word_width
+            # Break up words that do not even fit on a line of their own.
+            while line_width > self.max_width and len(line) > 1:
+                split: int = 1
+                split_width: float = self.advance(line[0])
+                while split_width + self.advance(line[split]) <= self.max_width:
+                    split_width += self.advance(line[split])
+                    split += 1
+                lines.append((line[:split], split_width))
+                line, line_width = line[split:], line_width - split_width
+            if max_lines is not None and len(lines) > max_lines:
+                return None
+        if line:
+            lines.append((line, line_width))
+        if max_lines is not None and len(lines) > max_lines:
+            return None
+        return lines
+
+    def layout(self, text: str) -> List[Tuple[str, float]]:
+        """
+        Wraps text in a single pass, falling back to the overflow text when it does not fit.
+        :param text: The text that should be wrapped.
+        :return: Every line with its width in pixels.
+        """
+        lines: List[Tuple[str, float]] = self.wrap(text=text, max_lines=self.max_lines)
+        return self.overflow if lines is None else lines
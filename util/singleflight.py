@@ -0,0 +1,45 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+
+
+class SingleFlight:
+    started: int = 0
+    shared: int = 0
+
+    def __init__(self) -> None:
+        """
+        Initializes the map of calls that are currently in flight.
+        """
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Runs the co-routine function, unless a call with the same key is already in flight.
+        In that case the result of the running call is awaited and shared instead.
+        :param key: Identifies identical calls.
+        :param func: Function creating the co-routine that needs to be awaited.
+        :return: The result of the (shared) call.
+        """
+        future: asyncio.Future = self._calls.get(key)
+        if future is not None:
+            self.shared += 1
+        else:
+            self.started += 1
+            future = asyncio.ensure_future(func())
+            self._calls[key] = future
+            future.add_done_callback(lambda f: self._done(key=key, future=f))
+        # Shielded so that one caller giving up does not cancel the call for everyone else sharing it.
+        return await asyncio.shield(future)
+
+    def _done(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        # Retrieve the exception so that it is not reported as unhandled when every caller gave up.
+        if not future.cancelled():
+            future.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def __str__(self) -> str:
+        return f'In flight: {len(self)} - Started: {self.started} - Shared: {self.shared}'
@@ -0,0 +1,332 @@
+from .models.wanikani.Subject import Subject
+from collections import deque
+from typing import Dict, Iterator, List, Set, Tuple
+import asyncio
+
+# Hepburn romanisation of every hiragana, digraphs like きゃ are handled by the small ゃ, ゅ and ょ.
+KANA_ROMAJI: Dict[str, str] = {
+    'あ': 'a', 'い': 'i', 'う': 'u', 'え': 'e', 'お': 'o', 'か': 'ka', 'き': 'ki', 'く': 'ku', 'け': 'ke', 'こ': 'ko',
+    'さ': 'sa', 'し': 'shi', 'す': 'su', 'せ': 'se', 'そ': 'so', 'た': 'ta', 'ち': 'chi', 'つ': 'tsu', 'て': 'te',
+    'と': 'to', 'な': 'na', 'に': 'ni', 'ぬ': 'nu', 'ね': 'ne', 'の': 'no', 'は': 'ha', 'ひ': 'hi', 'ふ': 'fu',
+    'へ': 'he', 'ほ': 'ho', 'ま': 'ma', 'み': 'mi', 'む': 'mu', 'め': 'me', 'も': 'mo', 'や': 'ya', 'ゆ': 'yu',
+    'よ': 'yo', 'ら': 'ra', 'り': 'ri', 'る': 'ru', 'れ': 're', 'ろ': 'ro', 'わ': 'wa', 'ゐ': 'wi', 'ゑ': 'we',
+    'を': 'wo', 'ん': 'n', 'が': 'ga', 'ぎ': 'gi', 'ぐ': 'gu', 'げ': 'ge', 'ご': 'go', 'ざ': 'za', 'じ': 'ji',
+    'ず': 'zu', 'ぜ': 'ze', 'ぞ': 'zo', 'だ': 'da', 'ぢ': 'ji', 'づ': 'zu', 'で': 'de', 'ど': 'do', 'ば': 'ba',
+    'び': 'bi', 'ぶ': 'bu', 'べ': 'be', 'ぼ': 'bo', 'ぱ': 'pa', 'ぴ': 'pi', 'ぷ': 'pu', 'ぺ': 'pe', 'ぽ': 'po',
+    'ゔ': 'vu', 'ぁ': 'a', 'ぃ': 'i', 'ぅ': 'u', 'ぇ': 'e', 'ぉ': 'o', 'ゎ': 'wa'}
+SMALL_Y: Dict[str, str] = {'ゃ': 'a', 'ゅ': 'u', 'ょ': 'o'}
+
+
+def normalize(text: str) -> str:
+    """
+    Normalizes a search term: lowercase and katakana turned into hiragana, so both kana match each other.
+    :param text: The term.
+    :return: The normalized term.
+    """
+    # Katakana ァ (U+30A1) up to ヶ (U+30F6) sit exactly 0x60 after their hiragana.
+    return ''.join(chr(ord(c) - 0x60) if 'ァ' <= c <= 'ヶ' else c for c in text.strip().lower())
+
+
+def to_romaji(kana: str) -> str:
+    """
+    Romanises a hiragana reading, for example きょう becomes kyou.
+    :param kana: The normalized reading.
+    :return: The reading in romaji, characters that are not kana are kept as they are.
+    """
+    out: List[str] = []
+    double_next: bool = False
+    for c in kana:
+        if c == 'っ':
+            double_next = True
+            continue
+        if c in SMALL_Y and out and out[-1].endswith('i') and len(out[-1]) > 1:
+            # きゃ is kya and しゃ is sha, so the i of the previous kana is replaced.
+            previous: str = out.pop()
+            romaji: str = previous[:-1] + ('' if previous[-2] in 'hj' else 'y') + SMALL_Y[c]
+        elif c == 'ー' and out:
+            romaji = out[-1][-1]
+        else:
+            romaji = KANA_ROMAJI.get(c, c)
+        if double_next:
+            romaji = romaji[0] + romaji
+            double_next = False
+        out.append(romaji)
+    return ''.join(out)
+
+
+def bounded_edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Calculates the optimal string alignment distance between two strings, giving up as soon as it exceeds
+    max_distance. Unlike plain Levenshtein distance, swapping two neighbouring characters counts as a single edit,
+    since that is the most common typo.
+    :param a: The first string.
+    :param b: The second string.
+    :param max_distance: The largest distance that is still of interest.
+    :return: The edit distance, or max_distance + 1 if it is larger than max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    before: List[int] = []
+    previous: List[int] = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        current: List[int] = [i]
+        for j, cb in enumerate(b, start=1):
+            distance: int = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                distance = min(distance, before[j - 2] + 1)
+            current.append(distance)
+        # A transposition looks back two rows, so a row may only end the search if the one before it would too.
+        if min(current) > max_distance and min(previous) > max_distance:
+            return max_distance + 1
+        before, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+def trigrams(term: str) -> Set[str]:
+    """
+    :param term: The normalized term.
+    :return: Every three character sequence of the term, padded so that short terms have some as well.
+    """
+    padded: str = f'^{term}$'
+    return {padded[i:i + 3] for i in range(max(1, len(padded) - 2))}
+
+
+class PrefixTrie:
+    def __init__(self) -> None:
+        """
+        Initializes a trie of terms that can list every term starting with a prefix.
+        """
+        # Every node is a dictionary of child nodes, the '' key marks the end of a term.
+        self._root: Dict[str, dict] = {}
+        self._size: int = 0
+
+    def insert(self, term: str) -> None:
+        node: Dict[str, dict] = self._root
+        for c in term:
+            node = node.setdefault(c, {})
+        if '' not in node:
+            node[''] = {}
+            self._size += 1
+
+    def remove(self, term: str) -> None:
+        path: List[Tuple[Dict[str, dict], str]] = []
+        node: Dict[str, dict] = self._root
+        for c in term:
+            if c not in node:
+                return
+            path.append((node, c))
+            node = node[c]
+        if node.pop('', None) is None:
+            return
+        self._size -= 1
+        # Prune the branches that no longer lead to any term.
+        for parent, c in reversed(path):
+            if parent[c]:
+                break
+            del parent[c]
+
+    def starting_with(self, prefix: str) -> Iterator[str]:
+        """
+        Lists the terms starting with a prefix, breadth first so that the shortest terms come first.
+        :param prefix: The normalized prefix.
+        :return: An iterator over the matching terms.
+        """
+        node: Dict[str, dict] = self._root
+        for c in prefix:
+            node = node.get(c)
+            if node is None:
+                return
+        queue: deque = deque([(node, prefix)])
+        while queue:
+            node, term = queue.popleft()
+            for c, child in node.items():
+                if c == '':
+                    yield term
+                else:
+                    queue.append((child, term + c))
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class SubjectIndex:
+    def __init__(self, max_fuzzy_candidates: int = 200) -> None:
+        """
+        Initializes the search indexes over the subject catalog: exact characters, a prefix trie over meanings and
+        readings in kana and romaji, and a trigram index over the same terms for matching typos.
+        :param max_fuzzy_candidates: How many terms sharing the most trigrams get their edit distance calculated.
+        """
+        self.max_fuzzy_candidates: int = max_fuzzy_candidates
+        self._subjects: Dict[int, Subject] = {}
+        self._characters: Dict[str, Set[int]] = {}
+        self._terms: Dict[str, Set[int]] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._trie: PrefixTrie = PrefixTrie()
+        self._subject_terms: Dict[int, Tuple[str, Set[str]]] = {}
+
+    @staticmethod
+    def terms_of(subject: Subject) -> Set[str]:
+        """
+        :param subject: The Subject.
+        :return: The normalized meanings and readings of the subject, the readings both in kana and in romaji.
+        """
+        terms: Set[str] = {normalize(meaning) for meaning in subject.meanings}
+        for reading in subject.readings:
+            kana: str = normalize(reading)
+            terms.add(kana)
+            terms.add(to_romaji(kana))
+        terms.discard('')
+        return terms
+
+    def update(self, subjects: List[Subject]) -> None:
+        """
+        Indexes new subjects and re-indexes changed ones, without touching the rest of the indexes.
+        :param subjects: The added or changed Subjects.
+        """
+        for subject in subjects:
+            self.remove(subject_id=subject.id)
+            # Hidden subjects were removed from WaniKani, so they should not turn up anymore.
+            if subject.hidden:
+                continue
+            self._subjects[subject.id] = subject
+            characters: str = normalize(subject.characters) if subject.characters else None
+            if characters:
+                self._characters.setdefault(characters, set()).add(subject.id)
+            terms: Set[str] = self.terms_of(subject=subject)
+            for term in terms:
+                ids: Set[int] = self._terms.get(term)
+                if ids is None:
+                    ids = self._terms[term] = set()
+                    self._trie.insert(term)
+                    for trigram in trigrams(term):
+                        self._trigrams.setdefault(trigram, set()).add(term)
+                ids.add(subject.id)
+            self._subject_terms[subject.id] = (characters, terms)
+
+    async def update_in_chunks(self, subjects: List[Subject], chunk_size: int = 100) -> None:
+        """
+        Like update, but yields to the event loop after every chunk, so that indexing the whole catalog does not
+        keep the shards from heartbeating. Every subject is indexed completely before anything else runs.
+        :param subjects: The added or changed Subjects.
+        :param chunk_size: How many subjects are indexed at once, indexing 100 takes roughly 12ms.
+        """
+        for start in range(0, len(subjects), chunk_size):
+            self.update(subjects=subjects[start:start + chunk_size])
+            await asyncio.sleep(0)
+
+    def remove(self, subject_id: int) -> None:
+        """
+        Removes a subject from every index.
+        :param subject_id: The WaniKani subject ID.
+        """
+        indexed: Tuple[str, Set[str]] = self._subject_terms.pop(subject_id, None)
+        self._subjects.pop(subject_id, None)
+        if indexed is None:
+            return
+        characters, terms = indexed
+        if characters:
+            self._discard(index=self._characters, key=characters, subject_id=subject_id)
+        for term in terms:
+            if self._discard(index=self._terms, key=term, subject_id=subject_id):
+                self._trie.remove(term)
+                for trigram in trigrams(term):
+                    self._trigrams[trigram].discard(term)
+                    if not self._trigrams[trigram]:
+                        del self._trigrams[trigram]
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[int]], key: str, subject_id: int) -> bool:
+        """
+        Removes a subject ID from an index entry.
+        :return: True if the entry became empty and was removed.
+        """
+        ids: Set[int] = index.get(key)
+        if ids is None:
+            return False
+        ids.discard(subject_id)
+        if ids:
+            return False
+        del index[key]
+        return True
+
+    def exact(self, query: str) -> List[int]:
+        """
+        :param query: The normalized query.
+        :return: The IDs of the subjects whose characters, meaning or reading is exactly the query.
+        """
+        return list(self._characters.get(query, ())) + list(self._terms.get(query, ()))
+
+    def prefix(self, query: str, limit: int) -> List[int]:
+        """
+        :param query: The normalized query.
+        :param limit: The maximum amount of subject IDs.
+        :return: The IDs of the subjects with a meaning or reading starting with the query, shortest terms first.
+        """
+        found: List[int] = []
+        for term in self._trie.starting_with(prefix=query):
+            found.extend(self._terms[term])
+            if len(found) >= limit:
+                break
+        return found
+
+    def fuzzy(self, query: str, limit: int) -> List[int]:
+        """
+        Finds the terms within a small edit distance of the query, among the terms that share the most trigrams.
+        :param query: The normalized query.
+        :param limit: The maximum amount of subject IDs.
+        :return: The IDs of the subjects with a similar meaning or reading, closest terms first.
+        """
+        # One typo per four characters, but never more than two.
+        max_distance: int = min(2, max(1, len(query) // 4))
+        shared: Dict[str, int] = {}
+        for trigram in trigrams(query):
+            for term in self._trigrams.get(trigram, ()):
+                shared[term] = shared.get(term, 0) + 1
+        candidates: List[str] = sorted(shared, key=shared.get, reverse=True)[:self.max_fuzzy_candidates]
+        # Swapping two letters of a short word leaves it hardly any trigrams in common with the intended word,
+        # so every swap of the query is looked up directly as well.
+        for i in range(len(query) - 1):
+            swapped: str = query[:i] + query[i + 1] + query[i] + query[i + 2:]
+            if swapped in self._terms and swapped not in shared:
+                candidates.append(swapped)
+        scored: List[Tuple[int, str]] = []
+        for term in candidates:
+            distance: int = bounded_edit_distance(query, term, max_distance=max_distance)
+            if distance <= max_distance:
+                scored.append((distance, term))
+        found: List[int] = []
+        for _, term in sorted(scored):
+            found.extend(self._terms[term])
+            if len(found) >= limit:
+                break
+        return found
+
+    def search(self, query: str, limit: int = 5) -> List[Subject]:
+        """
+        Searches the subjects, exact matches first, then the ones starting with the query, then similar ones.
+        :param query: What the user typed: characters, a meaning, or a reading in kana or romaji.
+        :param limit: The maximum amount of results.
+        :return: The matching Subjects, best matches first.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+        results: List[int] = []
+        seen: Set[int] = set()
+        # Fuzzy matching is the slowest, so it only runs when the cheaper indexes do not find enough.
+        for stage in (lambda: self.exact(query), lambda: self.prefix(query, limit=limit),
+                      lambda: self.fuzzy(query, limit=limit)):
+            # Within a stage, lower levels are more likely to be what the user is looking for.
+            for subject_id in sorted(stage(), key=lambda i: self._subjects[i].level):
+                if subject_id not in seen:
+                    seen.add(subject_id)
+                    results.append(subject_id)
+            if len(results) >= limit:
+                break
+        return [self._subjects[subject_id] for subject_id in results[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._subjects)
+
+    def __str__(self) -> str:
+        return f'Indexed subjects: {len(self)} - Terms: {len(self._terms)} - Trigrams: {len(self._trigrams)}'
@@ -0,0 +1,129 @@
+from .database.datastorage import DataStorage
+from .datafetcher import DataFetcher, WaniKaniRequestError
+from .metrics import log_event
+from .models.wanikani.Subject import Subject
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import logging
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class SubjectCatalog:
+    loaded: bool = False
+    last_sync: str = None
+
+    def __init__(self, data_fetcher: DataFetcher, data_storage: DataStorage) -> None:
+        """
+        Initializes the catalog of WaniKani subjects, which is the same for every user and thus shared by all of them.
+        :param data_fetcher: The DataFetcher used to request subject updates.
+        :param data_storage: The DataStorage the catalog is persisted in.
+        """
+        self._dataFetcher: DataFetcher = data_fetcher
+        self._dataStorage: DataStorage = data_storage
+        self._subjects: Dict[int, Subject] = {}
+        self._listeners: List[Callable[[List[Subject], bool], Awaitable[None]]] = []
+
+    def add_listener(self, listener: Callable[[List[Subject], bool], Awaitable[None]]) -> None:
+        """
+        Registers a co-routine function that is called with every Subject that was loaded, added or changed,
+        so that whatever is derived from the catalog only needs to update those subjects.
+        :param listener: The co-routine function, which is also told whether the subjects are the whole catalog.
+        """
+        self._listeners.append(listener)
+
+    async def _notify(self, subjects: List[Subject], complete: bool = False) -> None:
+        for listener in self._listeners:
+            await listener(subjects, complete)
+
+    async def load(self) -> None:
+        """
+        Loads the persisted catalog from the database into memory.
+        """
+        last_sync, documents = await self._dataStorage.load_subjects()
+        self._subjects = {document['_id']: Subject.from_document(document=document) for document in documents}
+        self.last_sync = last_sync
+        self.loaded = True
+        await self._notify(subjects=list(self._subjects.values()), complete=True)
+
+    async def reload(self) -> List[Subject]:
+        """
+        Loads the subjects that another process refreshed since the last load from the database,
+        for processes that do not refresh the catalog themselves.
+        :return: Every Subject that was added or changed.
+        """
+        last_sync, documents = await self._dataStorage.load_subjects(updated_after=self.last_sync)
+        changed: List[Subject] = [Subject.from_document(document=document) for document in documents]
+        for subject in changed:
+            self._subjects[subject.id] = subject
+        self.last_sync = last_sync
+        self.loaded = True
+        if changed:
+            await self._notify(subjects=changed)
+        return changed
+
+    async def refresh(self) -> List[Subject]:
+        """
+        Fetches the subjects updated since the last sync, using the API token of any registered user,
+        and persists them page by page.
+        :return: Every Subject that was added or changed.
+        """
+        api_token: str = self._dataStorage.user_registry.any_token(exclude=self._dataFetcher.unauthorized_tokens)
+        if api_token is None:
+            return []
+
+        changed: List[Subject] = []
+        last_sync: str = self.last_sync
+        params: Dict[str, str] = {'updated_after': self.last_sync} if self.last_sync else {}
+        try:
+            # Subject pages are large and only requested here, so they would only push everything else out of the cache.
+            async for subjects_data in self._dataFetcher.iterate_wanikani_pages(api_token=api_token,
+                                                                                resource='subjects', params=params,
+                                                                                cache=False):
+                page: List[Subject] = [Subject.from_api(entry=entry) for entry in subjects_data['data']]
+                await self._dataStorage.bulk_upsert_subjects(documents=[subject.to_document() for subject in page])
+                for subject in page:
+                    self._subjects[subject.id] = subject
+                changed.extend(page)
+                await self._notify(subjects=page)
+                if subjects_data['data_updated_at'] \
+                        and (not last_sync or subjects_data['data_updated_at'] > last_sync):
+                    last_sync = subjects_data['data_updated_at']
+        except WaniKaniRequestError as ex:
+            # Pages are ordered by ID, so the sync point may only move once every page has been applied.
+            log_event(logger, 'subject_sync_failed', level=logging.WARNING, error=ex)
+            return changed
+
+        if last_sync != self.last_sync:
+            await self._dataStorage.update_subjects_sync(last_sync=last_sync)
+            self.last_sync = last_sync
+        if changed:
+            print(f'Updated {len(changed)} WaniKani subjects.')
+        return changed
+
+    def get(self, subject_id: int) -> Optional[Subject]:
+        """
+        :param subject_id: The WaniKani subject ID.
+        :return: The Subject, or None if it is not in the catalog.
+        """
+        return self._subjects.get(subject_id)
+
+    def resolve(self, subject_ids: List[int]) -> List[Subject]:
+        """
+        Resolves subject IDs, like the ones in a Summary, skipping the ones that are not in the catalog.
+        :param subject_ids: The WaniKani subject IDs.
+        :return: The Subjects in the same order.
+        """
+        subjects: List[Any] = [self._subjects.get(subject_id) for subject_id in subject_ids]
+        return [subject for subject in subjects if subject is not None]
+
+    def subjects(self) -> List[Subject]:
+        """
+        :return: Every Subject in the catalog.
+        """
+        return list(self._subjects.values())
+
+    def __len__(self) -> int:
+        return len(self._subjects)
+
+    def __str__(self) -> str:
+        return f'Subjects: {len(self)} - Last sync: {self.last_sync}'
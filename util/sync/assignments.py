@@ -0,0 +1,75 @@
+from typing import Any, Dict, List
+import sys
+
+
+class AssignmentState:
+    SUBJECT_TYPES: List[str] = ['radical', 'kanji', 'vocabulary']
+
+    def __init__(self, user_id: int, last_sync: str = None, assignments: Dict[str, List[Any]] = None,
+                 counts: Dict[str, int] = None) -> None:
+        """
+        Initializes the synchronised assignment state of a single WaniKani user.
+        :param user_id: The Discord.User.id of the WaniKani user.
+        :param last_sync: The data_updated_at of the last applied assignments delta. None if never synced.
+        :param assignments: Dictionary mapping assignment IDs (as strings) to [subject_type, burned].
+        :param counts: The running counters for every subject type and the burned items.
+        """
+        self.user_id: int = user_id
+        self.last_sync: str = last_sync
+        self.assignments: Dict[str, List[Any]] = assignments or {}
+        self.counts: Dict[str, int] = counts or {key: 0 for key in self.SUBJECT_TYPES + ['burned']}
+
+    @classmethod
+    def from_document(cls, user_id: int, document: Dict[str, Any]) -> 'AssignmentState':
+        """
+        Creates the state from what was persisted in the database.
+        :param user_id: The Discord.User.id of the WaniKani user.
+        :param document: The stored document, or None if the user was never synced.
+        :return: The AssignmentState.
+        """
+        if not document:
+            return cls(user_id=user_id)
+        return cls(user_id=user_id, last_sync=document.get('last_sync'),
+                   assignments=document.get('assignments'), counts=document.get('counts'))
+
+    def _count(self, record: List[Any], amount: int) -> None:
+        if record[0] in self.counts:
+            self.counts[record[0]] += amount
+        if record[1]:
+            self.counts['burned'] += amount
+
+    def apply(self, entries: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+        """
+        Applies a page of assignments from the WaniKani API, replacing older versions of the same assignments.
+        :param entries: The 'data' list of an assignments collection response.
+        :return: The changed assignment records, keyed by assignment ID.
+        """
+        changed: Dict[str, List[Any]] = {}
+        for entry in entries:
+            key: str = str(entry['id'])
+            record: List[Any] = [entry['data']['subject_type'], entry['data']['srs_stage_name'] == 'Burned']
+            previous: List[Any] = self.assignments.get(key)
+            if previous == record:
+                continue
+            if previous is not None:
+                self._count(record=previous, amount=-1)
+            self._count(record=record, amount=1)
+            self.assignments[key] = record
+            changed[key] = record
+        return changed
+
+    def estimate_size(self) -> int:
+        """
+        :return: The estimated memory the state takes, including every assignment record.
+        """
+        return sys.getsizeof(self) + sys.getsizeof(self.assignments) + sys.getsizeof(self.counts) + \
+            sum(sys.getsizeof(key) + sys.getsizeof(record) for key, record in self.assignments.items())
+
+    def item_counts(self) -> List[int]:
+        """
+        :return: The amount of radicals, kanji, vocabulary and burned items, in that order.
+        """
+        return [self.counts['radical'], self.counts['kanji'], self.counts['vocabulary'], self.counts['burned']]
+
+    def __str__(self) -> str:
+        return f'Assignments: {len(self.assignments)} - Last sync: {self.last_sync} - Counts: {self.counts}'
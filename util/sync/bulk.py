@@ -0,0 +1,168 @@
+from ..database.datastorage import DataStorage
+from ..datafetcher import DataFetcher
+from ..cache.usercache import UserCache
+from ..metrics import elapsed_since, log_event
+from ..models.wanikani.Summary import Summary
+from ..models.wanikani.User import User
+from .assignments import AssignmentState
+from typing import Any, Dict, List, Tuple
+import asyncio
+import logging
+import time
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class BulkSyncReport:
+    def __init__(self, total: int) -> None:
+        """
+        Initializes the progress of a single bulk sync.
+        :param total: The amount of users that are going to be synced.
+        """
+        self.total: int = total
+        self.synced: int = 0
+        self.failed: int = 0
+        self.invalid: int = 0
+        self.started: float = time.perf_counter()
+        self.duration: float = 0
+
+    @property
+    def processed(self) -> int:
+        return self.synced + self.failed + self.invalid
+
+    def throughput(self) -> float:
+        """
+        :return: The amount of processed users per second.
+        """
+        elapsed: float = self.duration or elapsed_since(start=self.started)
+        return self.processed / elapsed if elapsed else 0
+
+    def __str__(self) -> str:
+        return f'Bulk sync: {self.processed}/{self.total} users - Synced: {self.synced} - Failed: {self.failed}' \
+            f' - Invalid tokens: {self.invalid} - {self.throughput():.2f} users/s'
+
+
+class BulkSync:
+    def __init__(self, data_fetcher: DataFetcher, data_storage: DataStorage, workers: int = 10,
+                 batch_size: int = 100, progress_interval: int = 100) -> None:
+        """
+        Initializes the sync of the user, summary and assignments of every registered WaniKani user.
+        :param data_fetcher: The DataFetcher whose rate limiter and caches are shared with the commands.
+        :param data_storage: The DataStorage the results are written back to.
+        :param workers: The amount of users that are synced concurrently.
+        :param batch_size: The amount of users whose results are written back to the database at once.
+        :param progress_interval: After how many users the progress is reported.
+        """
+        self._dataFetcher: DataFetcher = data_fetcher
+        self._dataStorage: DataStorage = data_storage
+        self.workers: int = workers
+        self.batch_size: int = batch_size
+        self.progress_interval: int = progress_interval
+        self.last_report: BulkSyncReport = None
+        self._user_updates: Dict[int, Dict[str, Any]] = {}
+        self._assignment_deltas: List[Tuple[int, str, Dict[str, List[Any]], Dict[str, int]]] = []
+
+    async def run(self) -> BulkSyncReport:
+        """
+        Streams every registered user from the database into a bounded pool of workers and syncs them.
+        The amount of concurrent requests per token stays limited by the DataFetcher's rate limiter.
+        :return: The BulkSyncReport of this sync.
+        """
+        report: BulkSyncReport = BulkSyncReport(total=await self._dataStorage.count_api_users())
+        self.last_report = report
+        print(f'Starting the bulk sync of {report.total} WaniKani users.')
+        # A bounded queue keeps the cursor from being read much further ahead than the workers can keep up with.
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+        workers: List[asyncio.Future] = [asyncio.ensure_future(self._work(queue=queue, report=report))
+                                         for _ in range(self.workers)]
+        try:
+            async for user in self._dataStorage.iterate_api_users(batch_size=self.batch_size):
+                await queue.put(user)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await self._flush()
+
+        report.duration = elapsed_since(start=report.started)
+        print(report)
+        log_event(logger, 'bulk_sync', total=report.total, synced=report.synced, failed=report.failed,
+                  invalid=report.invalid, duration=f'{report.duration:.1f}', throughput=f'{report.throughput():.2f}')
+        return report
+
+    async def _work(self, queue: asyncio.Queue, report: BulkSyncReport) -> None:
+        """
+        Syncs users from the queue until it receives None.
+        :param queue: The queue of (user_id, api_token) tuples.
+        :param report: The BulkSyncReport of this sync.
+        """
+        while True:
+            user: Tuple[int, str] = await queue.get()
+            if user is None:
+                return
+            try:
+                await self._sync_user(user_id=user[0], api_token=user[1], report=report)
+            except Exception:
+                report.failed += 1
+                logger.exception(f'event=bulk_sync_failed user={user[0]!r}')
+
+            if report.processed % self.progress_interval == 0:
+                print(report)
+            if len(self._user_updates) + len(self._assignment_deltas) >= self.batch_size:
+                await self._flush()
+
+    async def _sync_user(self, user_id: int, api_token: str, report: BulkSyncReport) -> None:
+        """
+        Fetches the user, summary and assignments delta of a single user and queues the results for writing.
+        :param user_id: The Discord.User.id of the WaniKani user.
+        :param api_token: The WaniKani API token of the user.
+        :param report: The BulkSyncReport of this sync.
+        """
+        # Nothing asks for these responses again before they expire, so they would only push others out of the caches.
+        user_data: Dict[str, Any] = await self._dataFetcher.request_wanikani_data(api_token=api_token,
+                                                                                  resource='user', cache=False)
+        if user_data is None:
+            if api_token in self._dataFetcher.unauthorized_tokens:
+                # Revoked tokens are skipped by every following sync, until the user registers again.
+                self._user_updates[user_id] = {'INVALID_TOKEN': True}
+                report.invalid += 1
+            else:
+                report.failed += 1
+            return
+
+        summary_data: Dict[str, Any] = await self._dataFetcher.request_wanikani_data(api_token=api_token,
+                                                                                     resource='summary', cache=False)
+        # Only keep the states of users that were already active in memory afterwards.
+        state: AssignmentState = await self._dataFetcher.load_assignment_state(user_id=user_id, keep=False)
+        changed: Dict[str, List[Any]] = await self._dataFetcher.pull_assignment_delta(state=state,
+                                                                                      api_token=api_token,
+                                                                                      cache=False)
+        if changed is not None:
+            self._assignment_deltas.append((user_id, state.last_sync, changed, dict(state.counts)))
+
+        # Users that are active in memory see the synced data right away.
+        user_cache: UserCache = self._dataFetcher.user_cache
+        user_cache.refresh(user_id=user_id, kind=UserCache.USER_DATA, model=User.from_api(user_data=user_data))
+        update: Dict[str, Any] = {'USER_DATA': user_data['data'], 'LAST_BULK_SYNC': user_data['data_updated_at']}
+        if summary_data is not None:
+            summary: Summary = Summary.from_api(summary_data=summary_data)
+            user_cache.refresh(user_id=user_id, kind=UserCache.SUMMARY, model=summary)
+            # Only the amounts are worth storing, instead of all of the subject IDs.
+            update['SUMMARY'] = {'lessons': len(summary.available_lessons),
+                                 'reviews': len(summary.available_reviews),
+                                 'next_reviews_at': summary_data['data']['next_reviews_at'],
+                                 'updated_at': summary_data['data_updated_at']}
+        self._user_updates[user_id] = update
+        report.synced += 1
+
+    async def _flush(self) -> None:
+        """
+        Writes the queued results back to the database with one bulk write per collection.
+        """
+        # Swap the buffers before writing, so that workers can keep queueing results in the meantime.
+        user_updates, self._user_updates = self._user_updates, {}
+        assignment_deltas, self._assignment_deltas = self._assignment_deltas, []
+        await self._dataStorage.bulk_update_api_users(updates=user_updates)
+        await self._dataStorage.bulk_update_assignment_states(deltas=assignment_deltas)
@@ -0,0 +1,131 @@
+from ..models.wanikani.Level_Progress import LevelProgress
+from datetime import datetime, timedelta
+from statistics import median
+from typing import Any, Dict, List, Tuple
+import sys
+
+
+class LevelingStats:
+    MAX_LEVEL: int = 60
+
+    def __init__(self, progressions: List[LevelProgress]) -> None:
+        """
+        Precomputes the leveling statistics, so that they only change when the progressions do.
+        When a level was reset and done again, only its most recent progression counts.
+        :param progressions: Every LevelProgress of a user.
+        """
+        latest: Dict[int, LevelProgress] = {}
+        for progress in progressions:
+            if progress.abandoned_at:
+                continue
+            previous: LevelProgress = latest.get(progress.level)
+            if previous is None or previous.unlocked_at is None:
+                latest[progress.level] = progress
+            elif progress.unlocked_at and progress.unlocked_at > previous.unlocked_at:
+                latest[progress.level] = progress
+
+        # Seconds between unlocking and passing every passed level.
+        self.durations: Dict[int, float] = {}
+        for level, progress in sorted(latest.items()):
+            if progress.unlocked_at and progress.passed_at:
+                self.durations[level] = (progress.passed_at - progress.unlocked_at).total_seconds()
+
+        self.current_level: int = max(latest) if latest else None
+        self.current_unlocked_at: datetime = latest[self.current_level].unlocked_at if latest else None
+        values: List[float] = list(self.durations.values())
+        self.median: float = median(values) if values else None
+        self.average: float = sum(values) / len(values) if values else None
+        self.fastest: Tuple[int, float] = min(self.durations.items(), key=lambda d: d[1]) if values else None
+        self.slowest: Tuple[int, float] = max(self.durations.items(), key=lambda d: d[1]) if values else None
+
+    def time_on_current_level(self, now: datetime) -> float:
+        """
+        :param now: The current timezone aware datetime.
+        :return: Seconds since the current level was unlocked, or None if that is unknown.
+        """
+        if self.current_unlocked_at is None:
+            return None
+        return (now - self.current_unlocked_at).total_seconds()
+
+    def projected_max_level(self, now: datetime) -> datetime:
+        """
+        Projects when level 60 is reached when every remaining level takes the median duration.
+        A current level that already took longer than the median is assumed to be passed right now.
+        :param now: The current timezone aware datetime.
+        :return: The projected datetime, or None if there is not enough data yet.
+        """
+        if self.current_level is None or self.current_unlocked_at is None:
+            return None
+        if self.current_level >= self.MAX_LEVEL:
+            return self.current_unlocked_at
+        if self.median is None:
+            return None
+        current_passed: datetime = max(now, self.current_unlocked_at + timedelta(seconds=self.median))
+        return current_passed + timedelta(seconds=self.median * (self.MAX_LEVEL - self.current_level - 1))
+
+
+class LevelingState:
+    def __init__(self, user_id: int, last_sync: str = None,
+                 progressions: Dict[str, Dict[str, Any]] = None) -> None:
+        """
+        Initializes the synchronised level progressions of a single WaniKani user.
+        :param user_id: The Discord.User.id of the WaniKani user.
+        :param last_sync: The data_updated_at of the last applied level progressions delta. None if never synced.
+        :param progressions: Dictionary mapping level progression IDs (as strings) to their stored fields.
+        """
+        self.user_id: int = user_id
+        self.last_sync: str = last_sync
+        self.progressions: Dict[str, LevelProgress] = {key: LevelProgress.from_document(document=document)
+                                                        for key, document in (progressions or {}).items()}
+        self._stats: LevelingStats = None
+
+    @classmethod
+    def from_document(cls, user_id: int, document: Dict[str, Any]) -> 'LevelingState':
+        """
+        Creates the state from what was persisted in the database.
+        :param user_id: The Discord.User.id of the WaniKani user.
+        :param document: The stored document, or None if the user was never synced.
+        :return: The LevelingState.
+        """
+        if not document:
+            return cls(user_id=user_id)
+        return cls(user_id=user_id, last_sync=document.get('last_sync'), progressions=document.get('progressions'))
+
+    def apply(self, entries: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Applies a page of level progressions from the WaniKani API, replacing older versions of the same progressions.
+        :param entries: The 'data' list of a level_progressions collection response.
+        :return: The stored fields of the changed level progressions, keyed by level progression ID.
+        """
+        changed: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            progress: LevelProgress = LevelProgress.from_api(entry=entry)
+            key: str = str(progress.id)
+            previous: LevelProgress = self.progressions.get(key)
+            if previous is not None and previous.last_update == progress.last_update:
+                continue
+            self.progressions[key] = progress
+            changed[key] = progress.to_document()
+        if changed:
+            self._stats = None
+        return changed
+
+    def statistics(self) -> LevelingStats:
+        """
+        :return: The LevelingStats, which are only computed again after the progressions changed.
+        """
+        if self._stats is None:
+            self._stats = LevelingStats(progressions=list(self.progressions.values()))
+        return self._stats
+
+    def estimate_size(self) -> int:
+        """
+        :return: The estimated memory the state takes, including every level progression.
+        """
+        return sys.getsizeof(self) + sys.getsizeof(self.progressions) + \
+            sum(sys.getsizeof(key) + sys.getsizeof(progress) +
+                sum(sys.getsizeof(getattr(progress, slot, None)) for slot in progress.__slots__)
+                for key, progress in self.progressions.items())
+
+    def __str__(self) -> str:
+        return f'Level progressions: {len(self.progressions)} - Last sync: {self.last_sync}'
@@ -0,0 +1,48 @@
+from typing import Any, Awaitable, Dict
+import asyncio
+import time
+
+
+class StageTimer:
+    def __init__(self, name: str, timeout: float = 10) -> None:
+        """
+        Initializes a timer that measures the separate stages of handling a single command.
+        :param name: The name of what is being timed, usually the command.
+        :param timeout: How many seconds a single stage may take before it is given up on.
+        """
+        self.name: str = name
+        self.timeout: float = timeout
+        self.timings: Dict[str, float] = {}
+        self.failures: Dict[str, str] = {}
+        self._start: float = time.perf_counter()
+
+    async def run(self, stage: str, coro: Awaitable[Any]) -> Any:
+        """
+        Awaits a stage, recording how long it took. A stage that fails or times out does not raise,
+        so that independent stages running concurrently can still be used when one of them is down.
+        :param stage: The name of the stage.
+        :param coro: The co-routine that needs to be awaited.
+        :return: The result of the co-routine, or None if it failed or timed out.
+        """
+        start: float = time.perf_counter()
+        try:
+            return await asyncio.wait_for(coro, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.failures[stage] = 'timed out'
+        except Exception as ex:
+            self.failures[stage] = repr(ex)
+        finally:
+            self.timings[stage] = time.perf_counter() - start
+        return None
+
+    def elapsed(self) -> float:
+        """
+        :return: Seconds since the timer was created.
+        """
+        return time.perf_counter() - self._start
+
+    def __str__(self) -> str:
+        stages: str = ', '.join(f'{stage}={duration * 1000:.0f}ms'
+                                f'{" (" + self.failures[stage] + ")" if stage in self.failures else ""}'
+                                for stage, duration in self.timings.items())
+        return f'{self.name} took {self.elapsed() * 1000:.0f}ms: {stages}'